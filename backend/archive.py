@@ -0,0 +1,422 @@
+"""Finished-game archive: append-only segment files plus a fixed-width index.
+
+    <dir>/seg-000001.dat   records: [u32 length][u32 crc32][zlib(JSON)]
+    <dir>/index.dat        one INDEX entry per game; entry n is game id n
+    <dir>/players.txt      player names, one per line; line n is player id n
+
+A record holds the board (as [q, r, resource, number] rows), every action
+taken (GameManager.actions) and a final summary per player. Segments roll
+over at SEGMENT_SIZE and are never rewritten.
+
+The index entry is written last, so a game exists once its entry does. On
+open a torn index tail is dropped and the current segment is cut back to
+the end of the last indexed record, which throws away a half-written
+append, as is a torn last line of players.txt. The index is loaded into per-player and per-winner id lists, so
+history queries only touch the games they return. Records are read through
+mmap and decompressed straight from the mapped pages.
+
+Streaming export (one row group per batch, never the whole archive):
+
+    python -m backend.archive export games.parquet --dir archive
+    python -m backend.archive export games.csv --format csv
+
+Parquet needs pyarrow, which is optional and only imported for the export.
+"""
+import os
+import csv
+import sys
+import json
+import mmap
+import zlib
+import time
+import bisect
+import struct
+import argparse
+import threading
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+# segment, offset, length, finished_at, winner seat (-1 = none), seats, player ids
+INDEX = struct.Struct("<IQIdbB6H")
+MAX_SEATS = 6
+NO_PLAYER = 0xFFFF
+RECORD_HEADER = struct.Struct("<II")
+SEGMENT_SIZE = 64 * 1024 * 1024
+
+DEFAULT_PAGE = 20
+MAX_PAGE = 200
+
+
+def game_record(game_manager, room_id=None, players=None) -> Dict:
+    """Archive record for a finished (or abandoned) game.
+
+    `players` names the seats in turn order; without accounts the colors
+    stand in for names.
+    """
+    gm = game_manager
+    colors = [c.value for c in gm.state.players]
+    winner = gm.winner()
+    return {
+        "room": room_id,
+        "started_at": gm.started_at,
+        "finished_at": gm.finished_at or time.time(),
+        "radius": gm.board.radius,
+        "rules": gm.rules.name,
+        "board": [[h.q, h.r, h.resource.value, h.number] for h in gm.board.hexes],
+        "colors": colors,
+        "players": list(players) if players else colors,
+        "winner": winner.value if winner is not None else None,
+        "actions": gm.actions,
+        "final": {
+            color.value: {
+                "points": gm.victory_points(color),
+                "settlements": gm.building_count[color],
+                "cities": gm.city_count[color],
+                "roads": gm.road_count[color],
+                "hand": {res.value: n for res, n in gm.state.inventories[color].items()},
+            }
+            for color in gm.state.players
+        },
+    }
+
+
+class GameArchive:
+    def __init__(self, path: str, segment_size: int = SEGMENT_SIZE, fsync: bool = True):
+        self.path = path
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._opened = False
+        # Segment maps; remapped under _map_lock (reads run on several threads)
+        self._map_lock = threading.Lock()
+        self._maps: Dict[int, mmap.mmap] = {}
+        # Replaced maps that readers may still hold views of
+        self._retired: List[mmap.mmap] = []
+
+    # --- Opening ---------------------------------------------------------
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _segment_path(self, segment: int):
+        return self._file(f"seg-{segment:06d}.dat")
+
+    def _open(self):
+        if self._opened:
+            return
+        with self._lock:
+            if self._opened:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            self.names: List[str] = []
+            names_path = self._file("players.txt")
+            if os.path.exists(names_path):
+                with open(names_path, "r+b") as f:
+                    data = f.read()
+                    whole = data.rfind(b"\n") + 1
+                    if whole != len(data):
+                        f.truncate(whole)  # torn name from a crash mid-append
+                self.names = data[:whole].decode("utf-8").split("\n")[:-1]
+            self.player_ids = {name: i for i, name in enumerate(self.names)}
+
+            self.entries = []
+            index_path = self._file("index.dat")
+            if os.path.exists(index_path):
+                with open(index_path, "rb") as f:
+                    data = f.read()
+                whole = len(data) - len(data) % INDEX.size
+                if whole != len(data):
+                    with open(index_path, "r+b") as f:
+                        f.truncate(whole)  # torn entry from a crash mid-append
+                self.entries = list(INDEX.iter_unpack(data[:whole]))
+
+            # In-memory postings; ids are appended in order so every list is sorted
+            self.finished: List[float] = []
+            self.by_player: Dict[int, array] = {}
+            self.by_winner: Dict[int, array] = {}
+            for game_id, entry in enumerate(self.entries):
+                self._add_postings(game_id, entry)
+
+            if self.entries:
+                segment, offset, length = self.entries[-1][:3]
+                self.segment, self.segment_end = segment, offset + length
+            else:
+                self.segment, self.segment_end = 1, 0
+            with open(self._segment_path(self.segment), "ab") as f:
+                if f.tell() > self.segment_end:
+                    f.truncate(self.segment_end)  # unindexed tail of a failed append
+            self._index = open(index_path, "ab")
+            self._names = open(self._file("players.txt"), "a", encoding="utf-8")
+            self._opened = True
+
+    def _add_postings(self, game_id, entry):
+        _segment, _offset, _length, finished_at, winner, seats, *players = entry
+        self.finished.append(finished_at)
+        for pid in players[:seats]:
+            self.by_player.setdefault(pid, array("I")).append(game_id)
+        if winner >= 0:
+            self.by_winner.setdefault(players[winner], array("I")).append(game_id)
+
+    def close(self):
+        with self._lock:
+            if not self._opened:
+                return
+            with self._map_lock:
+                for m in [*self._maps.values(), *self._retired]:
+                    m.close()
+                self._maps.clear()
+                self._retired.clear()
+            self._index.close()
+            self._names.close()
+            self._opened = False
+
+    def __len__(self):
+        self._open()
+        return len(self.entries)
+
+    # --- Writing ---------------------------------------------------------
+
+    def _player_id(self, name: str) -> int:
+        name = name.replace("\n", " ")
+        pid = self.player_ids.get(name)
+        if pid is None:
+            pid = self.player_ids[name] = len(self.names)
+            self.names.append(name)
+            self._names.write(name + "\n")
+        return pid
+
+    def append(self, record: Dict) -> int:
+        """Store one game and return its id. Blocking; run it off the event loop."""
+        self._open()
+        players = record["players"]
+        if len(players) > MAX_SEATS:
+            raise ValueError(f"at most {MAX_SEATS} players per game")
+        payload = zlib.compress(json.dumps(record, separators=(",", ":")).encode(), 6)
+        data = RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+        with self._lock:
+            mode = "ab"
+            if self.segment_end and self.segment_end + len(data) > self.segment_size:
+                self.segment, self.segment_end = self.segment + 1, 0
+                mode = "wb"  # a failed append may have left a partial next segment
+            with open(self._segment_path(self.segment), mode) as f:
+                f.write(data)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+
+            ids = [self._player_id(name) for name in players]
+            self._names.flush()
+            winner = record["colors"].index(record["winner"]) if record.get("winner") else -1
+            # Keep index dates non-decreasing (clock steps back) so date ranges can bisect
+            finished_at = max(record["finished_at"], self.finished[-1] if self.finished else 0.0)
+            entry = (self.segment, self.segment_end, len(data), finished_at, winner, len(ids),
+                     *ids, *[NO_PLAYER] * (MAX_SEATS - len(ids)))
+            self._index.write(INDEX.pack(*entry))
+            self._index.flush()
+            if self.fsync:
+                os.fsync(self._index.fileno())
+
+            game_id = len(self.entries)
+            self.segment_end += len(data)
+            self.entries.append(entry)
+            self._add_postings(game_id, entry)
+            return game_id
+
+    # --- Reading ---------------------------------------------------------
+
+    def _view(self, segment: int, offset: int, length: int) -> memoryview:
+        with self._map_lock:
+            m = self._maps.get(segment)
+            if m is None or len(m) < offset + length:
+                # Mapped before this record was appended; map the segment again.
+                # Another reader may still be decompressing from the old map.
+                if m is not None:
+                    self._retired.append(m)
+                with open(self._segment_path(segment), "rb") as f:
+                    m = self._maps[segment] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._close_retired()
+            return memoryview(m)[offset:offset + length]
+
+    def _close_retired(self):
+        # close() refuses (BufferError) while views are exported; views are
+        # only taken under _map_lock, so a map that closes here had no readers
+        busy = []
+        for m in self._retired:
+            try:
+                m.close()
+            except BufferError:
+                busy.append(m)
+        self._retired = busy
+
+    def read(self, game_id: int) -> Optional[Dict]:
+        self._open()
+        if not 0 <= game_id < len(self.entries):
+            return None
+        segment, offset, length = self.entries[game_id][:3]
+        view = self._view(segment, offset, length)
+        size, crc = RECORD_HEADER.unpack(view[:RECORD_HEADER.size])
+        payload = view[RECORD_HEADER.size:RECORD_HEADER.size + size]
+        if zlib.crc32(payload) != crc:
+            raise ValueError(f"archived game {game_id} is corrupt")
+        record = json.loads(zlib.decompress(payload))
+        record["id"] = game_id
+        return record
+
+    def summary(self, game_id: int) -> Dict:
+        """Index-only view of a game (no segment read)."""
+        _segment, _offset, _length, finished_at, winner, seats, *players = self.entries[game_id]
+        names = [self.names[pid] for pid in players[:seats]]
+        return {
+            "id": game_id,
+            "finished_at": finished_at,
+            "players": names,
+            "winner": names[winner] if winner >= 0 else None,
+        }
+
+    def query(self, player: str = None, winner: str = None, since: float = None, until: float = None,
+              before: int = None, limit: int = DEFAULT_PAGE) -> Dict:
+        """Newest-first page of game summaries.
+
+        `before` is the cursor: pass the previous page's `next` to continue.
+        """
+        self._open()
+        limit = max(1, min(limit, MAX_PAGE))
+        candidates = None  # None = every game
+        for name, postings in ((player, self.by_player), (winner, self.by_winner)):
+            if name is None:
+                continue
+            ids = postings.get(self.player_ids.get(name), ())
+            if candidates is None or len(ids) < len(candidates):
+                candidates = ids
+        # Ids are in date order, so the date range is an id range
+        lo = bisect.bisect_left(self.finished, since) if since is not None else 0
+        hi = bisect.bisect_right(self.finished, until) if until is not None else len(self.entries)
+        if before is not None:
+            hi = min(hi, before)
+
+        games = []
+        if candidates is None:
+            ids = range(hi - 1, lo - 1, -1)
+        else:
+            start, stop = bisect.bisect_left(candidates, lo), bisect.bisect_left(candidates, hi)
+            ids = (candidates[i] for i in range(stop - 1, start - 1, -1))
+        for game_id in ids:
+            summary = self.summary(game_id)
+            # The shortest posting list was walked; check the other filter here
+            if player is not None and player not in summary["players"]:
+                continue
+            if winner is not None and summary["winner"] != winner:
+                continue
+            games.append(summary)
+            if len(games) > limit:
+                break
+        more = len(games) > limit
+        games = games[:limit]
+        return {"games": games, "next": games[-1]["id"] if more else None}
+
+    def scan(self, start: int = 0) -> Iterator[Dict]:
+        """Every record from `start` on, in id order."""
+        self._open()
+        for game_id in range(start, len(self.entries)):
+            yield self.read(game_id)
+
+
+# --- Export ----------------------------------------------------------------
+
+COLUMNS = ["id", "room", "started_at", "finished_at", "radius", "winner", "players", "colors",
+           "points", "actions", "board", "log"]
+
+
+def export_row(record: Dict) -> Dict:
+    final = record["final"]
+    return {
+        "id": record["id"],
+        "room": record["room"],
+        "started_at": record["started_at"],
+        "finished_at": record["finished_at"],
+        "radius": record["radius"],
+        "winner": record["winner"],
+        "players": record["players"],
+        "colors": record["colors"],
+        "points": [final[c]["points"] for c in record["colors"]],
+        "actions": len(record["actions"]),
+        "board": json.dumps(record["board"]),
+        "log": json.dumps(record["actions"]),
+    }
+
+
+def export_batches(archive: GameArchive, batch_size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for record in archive.scan():
+        batch.append(export_row(record))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_parquet(archive: GameArchive, out: str, batch_size: int = 10000) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("parquet export needs pyarrow (pip install pyarrow), or use --format csv")
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("room", pa.string()),
+        ("started_at", pa.float64()),
+        ("finished_at", pa.float64()),
+        ("radius", pa.int8()),
+        ("winner", pa.string()),
+        ("players", pa.list_(pa.string())),
+        ("colors", pa.list_(pa.string())),
+        ("points", pa.list_(pa.int16())),
+        ("actions", pa.int32()),
+        ("board", pa.string()),
+        ("log", pa.string()),
+    ])
+    rows = 0
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        for batch in export_batches(archive, batch_size):
+            # One row group per batch; memory is bounded by batch_size
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            rows += len(batch)
+    return rows
+
+
+def export_csv(archive: GameArchive, out: str, batch_size: int = 10000) -> int:
+    rows = 0
+    with open(out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, COLUMNS)
+        writer.writeheader()
+        for batch in export_batches(archive, batch_size):
+            for row in batch:
+                for key in ("players", "colors", "points"):
+                    row[key] = json.dumps(row[key])
+            writer.writerows(batch)
+            rows += len(batch)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write every archived game to a columnar file")
+    export.add_argument("out")
+    export.add_argument("--dir", default=os.environ.get("CATAN_ARCHIVE_DIR", "archive"))
+    export.add_argument("--format", choices=["parquet", "csv"], default=None,
+                        help="default: from the file extension")
+    export.add_argument("--batch-size", type=int, default=10000, help="rows per row group")
+    args = parser.parse_args()
+
+    archive = GameArchive(args.dir)
+    fmt = args.format or ("csv" if args.out.endswith(".csv") else "parquet")
+    start = time.perf_counter()
+    rows = (export_csv if fmt == "csv" else export_parquet)(archive, args.out, args.batch_size)
+    print(f"{rows} games -> {args.out} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
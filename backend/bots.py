@@ -0,0 +1,152 @@
+"""Computer players that drive a GameManager through its public actions.
+
+A bot is created per seat per game and only ever acts on its own turn:
+`place_initial` during the snake draft (settlement + road), `play_turn`
+afterwards (roll, build, end turn). Bots must take all randomness from the
+`rng` they are given so tournament games are reproducible.
+
+Bots are referred to by name (see BOTS) or as "package.module:ClassName".
+"""
+import importlib
+from typing import Dict, Type
+
+from .game_logic import GameManager
+from .rules import ROAD, SETTLEMENT, CITY
+
+
+def pips(number) -> int:
+    """Number of 36 dice outcomes that produce `number`."""
+    return 0 if number is None else 6 - abs(7 - number)
+
+
+class Bot:
+    name = "bot"
+
+    def __init__(self, color, rng):
+        self.color = color
+        self.rng = rng
+
+    # Helpers shared by the bots below
+
+    def is_open(self, gm: GameManager, v) -> bool:
+        """The distance rule allows a settlement at `v`."""
+        return v not in gm.building_at and not any(a in gm.building_at for a in gm.topology.vertex_adjacent[v])
+
+    def free_vertices(self, gm: GameManager):
+        return [v for v in gm.topology.vertices if self.is_open(gm, v)]
+
+    def settlement_spots(self, gm: GameManager):
+        """Open vertices at the end of one of our roads (where a settlement is legal)."""
+        spots = set()
+        for e, road in gm.road_at.items():
+            if road.owner == self.color:
+                spots.update(v for v in gm.topology.edge_vertices[e] if self.is_open(gm, v))
+        return sorted(spots)
+
+    def road_options(self, gm: GameManager):
+        """Free edges touching our network."""
+        topo = gm.topology
+        options = set()
+        for e, road in gm.road_at.items():
+            if road.owner != self.color:
+                continue
+            for v in topo.edge_vertices[e]:
+                for ie in topo.vertex_edges[v]:
+                    if ie not in gm.road_at:
+                        options.add(ie)
+        return sorted(options)
+
+    def can_afford(self, gm: GameManager, build: int) -> bool:
+        # Under the game's rule set, which may not be the standard costs
+        return gm.rules.can_afford(gm.state.inventories[self.color], build)
+
+    def road_from(self, gm: GameManager, v) -> bool:
+        edges = [e for e in gm.topology.vertex_edges[v] if e not in gm.road_at]
+        self.rng.shuffle(edges)
+        return any(gm.build_road(*e) for e in edges)
+
+    def place_initial(self, gm: GameManager) -> bool:
+        raise NotImplementedError
+
+    def play_turn(self, gm: GameManager):
+        raise NotImplementedError
+
+
+class RandomBot(Bot):
+    """Random legal moves; the baseline every other bot should beat."""
+    name = "random"
+
+    def place_initial(self, gm):
+        free = self.free_vertices(gm)
+        if not free:
+            return False
+        v = self.rng.choice(free)
+        return gm.build_settlement(*v) and self.road_from(gm, v)
+
+    def play_turn(self, gm):
+        gm.roll_dice()
+        moves = ["city", "settlement", "road"]
+        self.rng.shuffle(moves)
+        for move in moves:
+            if move == "city" and self.can_afford(gm, CITY):
+                mine = [v for v, b in gm.building_at.items() if b.owner == self.color and b.type == "settlement"]
+                if mine:
+                    gm.build_city(*self.rng.choice(mine))
+            elif move == "settlement" and self.can_afford(gm, SETTLEMENT):
+                spots = self.settlement_spots(gm)
+                if spots:
+                    gm.build_settlement(*self.rng.choice(spots))
+            elif move == "road" and self.can_afford(gm, ROAD):
+                options = self.road_options(gm)
+                if options:
+                    gm.build_road(*self.rng.choice(options))
+        gm.end_turn()
+
+
+class GreedyBot(Bot):
+    """Settles on the most productive spots and always upgrades first."""
+    name = "greedy"
+
+    def value(self, gm, v) -> int:
+        return sum(pips(gm.hex_at[h].number) for h in gm.topology.vertex_hexes[v])
+
+    def place_initial(self, gm):
+        free = self.free_vertices(gm)
+        if not free:
+            return False
+        best = max(self.value(gm, v) for v in free)
+        v = self.rng.choice([v for v in free if self.value(gm, v) == best])
+        return gm.build_settlement(*v) and self.road_from(gm, v)
+
+    def play_turn(self, gm):
+        gm.roll_dice()
+
+        mine = [v for v, b in gm.building_at.items() if b.owner == self.color and b.type == "settlement"]
+        for v in sorted(mine, key=lambda v: -self.value(gm, v)):
+            if not self.can_afford(gm, CITY) or not gm.build_city(*v):
+                break
+
+        while self.can_afford(gm, SETTLEMENT):
+            spots = self.settlement_spots(gm)
+            if not spots or not gm.build_settlement(*max(spots, key=lambda v: self.value(gm, v))):
+                break
+
+        # Save for a settlement once there's somewhere to put it
+        if not self.settlement_spots(gm):
+            options = self.road_options(gm)
+            if options and self.can_afford(gm, ROAD):
+                gm.build_road(*self.rng.choice(options))
+        gm.end_turn()
+
+
+BOTS: Dict[str, Type[Bot]] = {cls.name: cls for cls in (RandomBot, GreedyBot)}
+
+
+def load_bot(spec: str) -> Type[Bot]:
+    """Bot class from a registered name or "package.module:ClassName"."""
+    if spec in BOTS:
+        return BOTS[spec]
+    module, sep, attr = spec.partition(":")
+    if not sep:
+        raise ValueError(f"unknown bot {spec!r} (known: {', '.join(sorted(BOTS))})")
+    return getattr(importlib.import_module(module), attr)
@@ -0,0 +1,195 @@
+import os
+import time
+import asyncio
+import weakref
+from collections import deque
+from . import metrics
+
+SPECTATOR_ROOM = "spectators"
+
+# A client with more than HIGH_WATER packets still sitting in Engine.IO's
+# queue is "behind": further frames wait in our outbox instead, where state
+# frames collapse to the latest and other messages are capped at MAX_DEPTH.
+HIGH_WATER = 4
+MAX_DEPTH = int(os.environ.get("CATAN_CLIENT_QUEUE", "64"))
+
+
+class ClientOutbox:
+    __slots__ = ("state", "messages", "task")
+
+    def __init__(self, depth: int):
+        self.state = {}  # key -> latest frame
+        self.messages = deque(maxlen=depth)
+        self.task = None
+
+
+class ClientQueues:
+    """Per-client emit queues with backpressure.
+
+    Frames go straight to Engine.IO while a client keeps up. Once it falls
+    behind, they are held in an outbox that is handed over in one batch each
+    time the transport has taken everything queued before. Frames sent with a
+    `key` (full state snapshots) replace any pending frame with the same key,
+    so a slow client skips intermediate states; keyless frames (logs) are
+    kept in order up to `max_depth`, oldest dropped first.
+    """
+
+    def __init__(self, sio, max_depth: int = MAX_DEPTH, high_water: int = HIGH_WATER):
+        self.sio = sio
+        self.max_depth = max_depth
+        self.high_water = high_water
+        self.outboxes = {}  # eio sid -> ClientOutbox, only for clients that are behind
+        self.dropped = 0
+        self.coalesced = 0
+
+    def _socket(self, eio_sid):
+        return self.sio.eio.sockets.get(eio_sid)
+
+    async def send(self, eio_sid, frame, key=None):
+        outbox = self.outboxes.get(eio_sid)
+        if outbox is None:
+            sock = self._socket(eio_sid)
+            if sock is None or sock.closed:
+                return
+            if sock.queue.qsize() < self.high_water:
+                await self.sio.eio.send_packet(eio_sid, frame)
+                return
+            outbox = self.outboxes[eio_sid] = ClientOutbox(self.max_depth)
+
+        if key is not None:
+            if key in outbox.state:
+                self.coalesced += 1
+                metrics.count("catan_frames_coalesced_total", key=key)
+            outbox.state[key] = frame
+        else:
+            if len(outbox.messages) == outbox.messages.maxlen:
+                self.dropped += 1
+                metrics.count("catan_frames_dropped_total")
+            outbox.messages.append(frame)
+
+        if outbox.task is None:
+            outbox.task = asyncio.create_task(self._drain(eio_sid, outbox))
+
+    async def _drain(self, eio_sid, outbox):
+        try:
+            while outbox.state or outbox.messages:
+                sock = self._socket(eio_sid)
+                if sock is None or sock.closed:
+                    break
+                # Wait for the transport to pick up everything queued so far
+                await sock.queue.join()
+                frames = [*outbox.state.values(), *outbox.messages]
+                outbox.state.clear()
+                outbox.messages.clear()
+                for frame in frames:
+                    await self.sio.eio.send_packet(eio_sid, frame)
+        finally:
+            if self.outboxes.get(eio_sid) is outbox:
+                del self.outboxes[eio_sid]
+
+    def forget(self, eio_sid):
+        outbox = self.outboxes.pop(eio_sid, None)
+        if outbox is not None and outbox.task is not None:
+            outbox.task.cancel()
+
+
+_queues = weakref.WeakKeyDictionary()
+
+
+def client_queues(sio) -> ClientQueues:
+    """The ClientQueues used for every frame sent through `sio`."""
+    queues = _queues.get(sio)
+    if queues is None:
+        queues = _queues[sio] = ClientQueues(sio)
+    return queues
+
+
+def room_members(sio, room, namespace="/"):
+    """Engine.IO sids of everyone in a Socket.IO room."""
+    return [eio_sid for _, eio_sid in sio.manager.get_participants(namespace, room)]
+
+
+async def send_frame(sio, frame, eio_sids, key=None):
+    """Queue an already-encoded frame (see views.encode_event) to each client.
+
+    Pass `key` for frames that supersede earlier ones with the same key
+    (state snapshots), so they can be coalesced for slow clients.
+    """
+    queues = client_queues(sio)
+    for eio_sid in eio_sids:
+        await queues.send(eio_sid, frame, key)
+    return len(eio_sids)
+
+
+async def send_frame_to(sio, frame, sid, key=None, namespace="/"):
+    eio_sid = sio.manager.eio_sid_from_sid(sid, namespace)
+    if eio_sid is not None:
+        await client_queues(sio).send(eio_sid, frame, key)
+
+
+class SpectatorFanout:
+    """Pushes game state to a read-only room of spectators.
+
+    Spectators receive the public view from StateViews, which is encoded once
+    per state version and shared with seated players. Updates are coalesced
+    so spectators get at most `max_rate` frames per second; when several
+    versions land inside one window only the latest is sent.
+    """
+
+    def __init__(self, sio, max_rate: float = 10.0, room: str = SPECTATOR_ROOM):
+        self.sio = sio
+        self.room = room
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.members = set()
+
+        self._views = None
+        self._last_sent = 0.0
+        # (game, version) last sent; versions start over with each new game
+        self._sent = None
+        self._flush_task = None
+
+    def is_spectator(self, sid) -> bool:
+        return sid in self.members
+
+    async def add(self, sid, views):
+        self.members.add(sid)
+        await self.sio.enter_room(sid, self.room)
+        await send_frame_to(self.sio, views.public_frame(), sid, key="game_state")
+
+    async def remove(self, sid):
+        self.members.discard(sid)
+
+    async def publish(self, views):
+        """Called after every state change. Sends now or schedules a coalesced flush."""
+        self._views = views
+        if not self.members or self._flush_task is not None:
+            return
+
+        wait = self._last_sent + self.interval - time.monotonic()
+        if wait <= 0:
+            await self.flush()
+        else:
+            self._flush_task = asyncio.create_task(self._delayed_flush(wait))
+
+    async def _delayed_flush(self, delay):
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        views = self._views
+        # GameManager compares by identity, so this is "same game, same version"
+        if views is None or self._sent == (views.game_manager, views.version):
+            return
+        self._sent = (views.game_manager, views.version)
+        self._last_sent = time.monotonic()
+
+        members = room_members(self.sio, self.room)
+        if not members:
+            return
+        frame = views.public_frame()
+        with metrics.timer("catan_emit_seconds", event="spectator_state"):
+            await send_frame(self.sio, frame, members, key="game_state")
+        metrics.count("catan_emit_total", len(members), event="spectator_state")
@@ -0,0 +1,231 @@
+"""Room sharding across several uvicorn worker processes.
+
+Each worker hosts the rooms that a consistent hash ring assigns to it. A thin
+router answers "which worker owns room X?" so clients connect straight to the
+owner; workers also refuse connections for rooms they don't own and point the
+client at the right one. When workers join or leave, rooms whose owner changed
+are handed over through a pluggable MessageBus (see bus.py).
+
+Run a cluster on one machine:
+
+    python -m backend.cluster --workers 4 --port 8000
+
+This starts the router on :8000 and workers on :8001..:8004, talking over
+Unix sockets in --bus-dir.
+"""
+import os
+import sys
+import hmac
+import argparse
+import subprocess
+from typing import Dict, Optional
+
+from .sharding import HashRing, moved_rooms, parse_workers
+from .bus import MessageBus, UnixSocketBus
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_BUS_DIR = "/tmp/catan-bus"
+# Worker IDs name the bus socket files, so keep them to plain characters
+WORKER_ID = r"^[A-Za-z0-9_-]{1,64}$"
+
+
+class ClusterNode:
+    """One worker's view of the cluster."""
+
+    def __init__(self, worker_id: str, workers: Dict[str, str], bus: MessageBus, registry, sio):
+        self.worker_id = worker_id
+        self.workers = dict(workers)  # worker id -> public URL
+        self.ring = HashRing(self.workers)
+        self.bus = bus
+        self.registry = registry
+        self.sio = sio
+
+    @classmethod
+    def from_env(cls, registry, sio) -> Optional["ClusterNode"]:
+        """CATAN_WORKER_ID / CATAN_CLUSTER / CATAN_BUS_DIR, or None when not clustered."""
+        worker_id = os.environ.get("CATAN_WORKER_ID")
+        if not worker_id:
+            return None
+        workers = parse_workers(os.environ.get("CATAN_CLUSTER", ""))
+        bus = UnixSocketBus(worker_id, os.environ.get("CATAN_BUS_DIR", DEFAULT_BUS_DIR))
+        return cls(worker_id, workers, bus, registry, sio)
+
+    async def start(self):
+        await self.bus.start(self.handle)
+
+    async def stop(self):
+        await self.bus.close()
+
+    def owner(self, room_id: str) -> str:
+        return self.ring.owner(room_id)
+
+    def owns(self, room_id: str) -> bool:
+        return self.ring.owner(room_id) == self.worker_id
+
+    def url_for(self, room_id: str) -> str:
+        return self.workers[self.ring.owner(room_id)]
+
+    async def handle(self, message: dict):
+        kind = message.get("type")
+        if kind == "join":
+            await self.set_workers({**self.workers, message["worker"]: message["url"]})
+        elif kind == "leave":
+            await self.set_workers({w: u for w, u in self.workers.items() if w != message["worker"]})
+        elif kind == "room_transfer":
+            from .game_logic import GameManager
+            self.registry.adopt(message["room"], GameManager.from_snapshot(message["snapshot"]))
+            logger.info("adopted room %s", message["room"])
+        else:
+            logger.warning("unknown bus message %r", kind)
+
+    async def set_workers(self, workers: Dict[str, str]):
+        """Apply a membership change and hand over rooms we no longer own.
+
+        If a hand-over fails the previous membership is put back (rooms
+        already handed over stay with their new owner) and the error is
+        raised, so whoever sent the change can roll it back."""
+        before_workers, before = self.workers, self.ring
+        self.workers = dict(workers)
+        self.ring = HashRing(self.workers)
+        try:
+            for room_id, new_owner in moved_rooms(before, self.ring, list(self.registry.rooms)).items():
+                # Rooms adopted ahead of our own ring update already belong here
+                if new_owner != self.worker_id:
+                    await self.hand_over(room_id, new_owner)
+        except Exception:
+            self.workers, self.ring = before_workers, before
+            raise
+
+    async def hand_over(self, room_id: str, new_owner: str):
+        # Out of the registry first: its clients' actions are ignored from here
+        # on, so the snapshot can't miss a move made while it is in flight
+        room = self.registry.drop(room_id)
+        if room is None:
+            return
+        snapshot = room.game.snapshot()
+        try:
+            # The new owner has the game before any client is told to reconnect
+            await self.bus.send(new_owner, {"type": "room_transfer", "room": room_id, "snapshot": snapshot})
+        except Exception:
+            self.registry.restore(room)
+            logger.exception("handing room %s to %s failed; keeping it", room_id, new_owner)
+            raise
+        await self.sio.emit("room_moved", {"room": room_id, "url": self.workers[new_owner]}, to=room.all)
+        for sid in list(room.members):
+            await self.sio.disconnect(sid)
+        logger.info("handed room %s to %s", room_id, new_owner)
+
+def create_router(workers: Dict[str, str], bus: MessageBus, admin_token: Optional[str] = None):
+    """FastAPI app that tells clients where a room lives and manages membership.
+
+    Changing membership needs "Authorization: Bearer <admin_token>" (default
+    CATAN_ADMIN_TOKEN) and is disabled when there is no token."""
+    from fastapi import Depends, FastAPI, HTTPException, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    from pydantic import BaseModel, Field
+
+    if admin_token is None:
+        admin_token = os.environ.get("CATAN_ADMIN_TOKEN", "")
+    router = FastAPI()
+    router.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+    members = dict(workers)
+    ring = HashRing(members)
+
+    class Worker(BaseModel):
+        # Becomes part of the worker's bus socket path
+        id: str = Field(pattern=WORKER_ID)
+        url: str
+
+    def require_admin(request: Request):
+        if not admin_token:
+            raise HTTPException(status_code=404)
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), admin_token.encode()):
+            raise HTTPException(status_code=401, detail="admin token required")
+
+    async def notify(targets, message, undo, undo_also=()):
+        """Send `message` to each target in turn; if one fails, send `undo`
+        to `undo_also` and the ones that already took it, and answer 502."""
+        done = []
+        for w in targets:
+            try:
+                await bus.send(w, message)
+            except Exception:
+                logger.exception("worker %s failed %s; rolling back", w, message["type"])
+                for u in [*undo_also, *reversed(done)]:
+                    try:
+                        await bus.send(u, undo)
+                    except Exception:
+                        logger.exception("rolling back %s on %s failed", undo["type"], u)
+                raise HTTPException(status_code=502, detail=f"worker {w!r} failed; membership unchanged")
+            done.append(w)
+
+    @router.get("/api/rooms/{room_id}/route")
+    async def route(room_id: str):
+        worker = ring.owner(room_id)
+        return {"room": room_id, "worker": worker, "url": members[worker]}
+
+    @router.get("/api/cluster")
+    async def cluster():
+        return {"workers": members}
+
+    @router.post("/api/cluster/workers", dependencies=[Depends(require_admin)])
+    async def add_worker(worker: Worker):
+        if worker.id in members:
+            raise HTTPException(status_code=409, detail="worker already in the cluster")
+        # Existing workers hand over rooms to the newcomer, which must already be
+        # running; on failure it hands back whatever it got
+        await notify([*members], {"type": "join", "worker": worker.id, "url": worker.url},
+                     undo={"type": "leave", "worker": worker.id}, undo_also=[worker.id])
+        members[worker.id] = worker.url
+        ring.add(worker.id)
+        return {"workers": members}
+
+    @router.delete("/api/cluster/workers/{worker_id}", dependencies=[Depends(require_admin)])
+    async def remove_worker(worker_id: str):
+        if worker_id not in members:
+            raise HTTPException(status_code=404, detail="unknown worker")
+        # The leaving worker moves its rooms out, the others just update their ring
+        await notify([worker_id, *(w for w in members if w != worker_id)], {"type": "leave", "worker": worker_id},
+                     undo={"type": "join", "worker": worker_id, "url": members[worker_id]})
+        members.pop(worker_id)
+        ring.remove(worker_id)
+        return {"workers": members}
+
+    return router
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="router port; workers use the following ports")
+    parser.add_argument("--bus-dir", default=DEFAULT_BUS_DIR)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    workers = {f"w{i}": f"http://{args.host}:{args.port + 1 + i}" for i in range(args.workers)}
+    spec = ",".join(f"{w}={url}" for w, url in workers.items())
+
+    procs = []
+    for i, worker_id in enumerate(workers):
+        env = dict(os.environ, CATAN_WORKER_ID=worker_id, CATAN_CLUSTER=spec, CATAN_BUS_DIR=args.bus_dir)
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", args.host, "--port", str(args.port + 1 + i)],
+            env=env,
+        ))
+
+    try:
+        uvicorn.run(create_router(workers, UnixSocketBus("router", args.bus_dir)), host=args.host, port=args.port)
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+
+
+if __name__ == "__main__":
+    main()
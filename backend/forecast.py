@@ -0,0 +1,171 @@
+"""Expected income and build affordability, computed exactly from the dice odds.
+
+For each player a production table says which cards each dice total pays
+out (from the hex numbers and the player's settlements/cities). From that:
+
+- expected cards per roll: sum over totals of P(total) * payout
+- P(can afford X within k turns): a DP over the player's resource counts,
+  one step per roll. Only the resources X needs matter, and counts are
+  capped at what X costs, so the state space is tiny (a city is 3 x 4
+  states) and every step is a table lookup per (state, distinct payout).
+
+Everyone's roll pays everyone, so "k turns" means k rounds of the table
+(k * players rolls). Hands only grow (no robber yet), so affording X at the
+end of a round means it was affordable at some point.
+"""
+from functools import lru_cache
+from typing import Dict, List
+
+from .game_logic import ROAD_COST, SETTLEMENT_COST, CITY_COST
+from .models import ResourceType
+
+# P(sum of two dice == n)
+DICE_PROB = {n: (6 - abs(7 - n)) / 36 for n in range(2, 13)}
+
+# Standard costs; games with other rules get models from models_for()
+BUILDS = {"road": ROAD_COST, "settlement": SETTLEMENT_COST, "city": CITY_COST}
+RESOURCES = [r.value for r in ResourceType if r != ResourceType.DESERT]
+
+DEFAULT_TURNS = 3
+MAX_TURNS = 10
+
+
+class AffordabilityModel:
+    """Transition tables for one build cost, reusable for any player and hand."""
+
+    def __init__(self, cost: Dict[str, int]):
+        self.resources = list(cost)
+        self.caps = [cost[r] for r in self.resources]
+        # Mixed-radix state index over capped counts
+        self.strides = []
+        stride = 1
+        for cap in self.caps:
+            self.strides.append(stride)
+            stride *= cap + 1
+        self.size = stride
+        # counts for every state index
+        self.states = [
+            [(i // s) % (cap + 1) for s, cap in zip(self.strides, self.caps)]
+            for i in range(self.size)
+        ]
+        self.goal = self.index(self.caps)
+        self._tables = {}
+
+    def table_for(self, gain) -> List[int]:
+        table = self._tables.get(gain)
+        if table is None:
+            table = self._tables[gain] = self.step_table(gain)
+        return table
+
+    def index(self, counts) -> int:
+        return sum(min(c, cap) * s for c, cap, s in zip(counts, self.caps, self.strides))
+
+    def step_table(self, gain) -> List[int]:
+        """Next state for every state after receiving `gain` (per resource of this cost)."""
+        return [self.index([c + g for c, g in zip(state, gain)]) for state in self.states]
+
+    def curve(self, hand: Dict[str, int], payouts: List[tuple], rolls_per_turn: int, turns: int) -> List[float]:
+        """P(affordable) after each of `turns` rounds, starting from `hand`.
+
+        `payouts` is [(probability, {resource: cards})] for one roll.
+        """
+        # Merge dice totals that pay the same cards for these resources
+        merged = {}
+        for prob, gains in payouts:
+            key = tuple(gains.get(r, 0) for r in self.resources)
+            merged[key] = merged.get(key, 0.0) + prob
+        steps = [(prob, self.table_for(gain)) for gain, prob in merged.items()]
+
+        dist = [0.0] * self.size
+        dist[self.index([hand.get(r, 0) for r in self.resources])] = 1.0
+        curve = []
+        for _ in range(turns):
+            for _ in range(rolls_per_turn):
+                nxt = [0.0] * self.size
+                for prob, table in steps:
+                    for s, p in enumerate(dist):
+                        if p:
+                            nxt[table[s]] += p * prob
+                dist = nxt
+            curve.append(dist[self.goal])
+        return curve
+
+
+MODELS = {name: AffordabilityModel(cost) for name, cost in BUILDS.items()}
+
+
+def models_for(rules) -> Dict[str, AffordabilityModel]:
+    """Models for a rule set's costs, shared by every RuleSet with the same costs."""
+    if rules.cost_dicts == BUILDS:
+        return MODELS
+    return _models_for_costs(tuple((name, tuple(sorted(cost.items()))) for name, cost in rules.cost_dicts.items()))
+
+
+@lru_cache(maxsize=64)
+def _models_for_costs(costs) -> Dict[str, AffordabilityModel]:
+    # Keyed by the costs themselves, so new RuleSet objects don't pile up here
+    return {name: AffordabilityModel(dict(cost)) for name, cost in costs}
+
+class Forecaster:
+    """Per-game forecasts, cached per state version like StateViews."""
+
+    def __init__(self, game_manager):
+        self.game_manager = game_manager
+        self._version = None
+        self._payouts = None
+        self._cache = {}
+
+    def _check_version(self):
+        if self._version != self.game_manager.version:
+            self._cache.clear()
+            self._payouts = None
+            self._version = self.game_manager.version
+
+    def payouts(self) -> Dict[str, Dict[int, Dict[str, int]]]:
+        """color -> dice total -> {resource: cards}, from the production index."""
+        self._check_version()
+        if self._payouts is None:
+            gm = self.game_manager
+            table = {color.value: {} for color in gm.state.players}
+            for number, spots in gm.production.items():
+                for v, h in spots:
+                    b = gm.building_at[v]
+                    gains = table[b.owner.value].setdefault(number, {})
+                    res = h.resource.value
+                    gains[res] = gains.get(res, 0) + (2 if b.type == "city" else 1)
+            self._payouts = table
+        return self._payouts
+
+    def forecast(self, color: str, turns: int = DEFAULT_TURNS) -> Dict:
+        self._check_version()
+        key = (color, turns)
+        result = self._cache.get(key)
+        if result is None:
+            result = self._cache[key] = self._forecast(color, turns)
+        return result
+
+    def _forecast(self, color: str, turns: int) -> Dict:
+        gm = self.game_manager
+        by_number = self.payouts()[color]
+        payouts = [(DICE_PROB[n], by_number.get(n, {})) for n in DICE_PROB]
+
+        per_roll = {r: 0.0 for r in RESOURCES}
+        for prob, gains in payouts:
+            for res, cards in gains.items():
+                per_roll[res] += prob * cards
+
+        rolls = len(gm.state.players)
+        # ResourceType is a str enum, so plain resource names look up fine
+        hand = gm.state.inventories[color]
+        return {
+            "color": color,
+            "version": gm.version,
+            "turns": turns,
+            "income_per_roll": per_roll,
+            "income_per_turn": {r: v * rolls for r, v in per_roll.items()},
+            "payouts": {n: gains for n, gains in by_number.items()},
+            "afford": {
+                name: model.curve(hand, payouts, rolls, turns)
+                for name, model in models_for(gm.rules).items()
+            },
+        }
@@ -1,40 +1,60 @@
+import os
 import random
+import functools
+from collections import deque
 from typing import List
 from .models import Board, Hex, ResourceType
+from .metrics import timed
+from .log import get_logger
+from .topology import get_topology, hex_coords, hex_count
+from .rules import RuleSet, STANDARD, BUILDS, RESOURCES, ROAD, SETTLEMENT, CITY, default_rules
+from . import zobrist
 
-def generate_board() -> Board:
-    # Resources for 18 hexes (excluding center Desert)
-    # 4 Lumber, 4 Wool, 4 Grain, 3 Brick, 3 Ore
-    resources = (
-        [ResourceType.LUMBER] * 4 +
-        [ResourceType.WOOL] * 4 +
-        [ResourceType.GRAIN] * 4 +
-        [ResourceType.BRICK] * 3 +
-        [ResourceType.ORE] * 3
-    )
-    random.shuffle(resources)
-
-    # Number tokens for 18 hexes
-    # 2, 12 (1 each)
-    # 3, 4, 5, 6, 8, 9, 10, 11 (2 each)
-    numbers = [2, 12] + [3, 4, 5, 6, 8, 9, 10, 11] * 2
-    random.shuffle(numbers)
+logger = get_logger(__name__)
+
+# Pools for the standard 19-hex board (18 producing hexes + center Desert).
+# Listed round-robin by kind so any prefix is still a balanced mix; larger
+# boards repeat the pool and take a prefix for the remainder.
+# 4 Lumber, 4 Wool, 4 Grain, 3 Brick, 3 Ore
+BASE_RESOURCES = (
+    [ResourceType.LUMBER, ResourceType.WOOL, ResourceType.GRAIN, ResourceType.BRICK, ResourceType.ORE] * 3 +
+    [ResourceType.LUMBER, ResourceType.WOOL, ResourceType.GRAIN]
+)
+# 2, 12 (1 each)
+# 3, 4, 5, 6, 8, 9, 10, 11 (2 each)
+BASE_NUMBERS = [2, 12] + [3, 4, 5, 6, 8, 9, 10, 11] * 2
+
+def scaled_pool(base, count):
+    """`count` items drawn from `base` in the same proportions."""
+    copies, rest = divmod(count, len(base))
+    return base * copies + base[:rest]
+
+def desert_count(radius: int) -> int:
+    # 1 on the 19-hex board, 2 on the 5-6 player (37-hex) board, and so on
+    return max(1, round(hex_count(radius) / 19))
+
+@timed("catan_game_action_seconds", action="generate_board")
+def generate_board(radius: int = 2, rng=None) -> Board:
+    """Random board; pass a seeded `random.Random` as `rng` for a reproducible one."""
+    rng = rng if rng is not None else random
+    coords = hex_coords(radius)
+
+    # Center is always Desert; bigger boards scatter the extra ones
+    others = [c for c in coords if c != (0, 0)]
+    deserts = {(0, 0)} | set(rng.sample(others, desert_count(radius) - 1))
+    producing = len(coords) - len(deserts)
+
+    resources = scaled_pool(BASE_RESOURCES, producing)
+    rng.shuffle(resources)
+
+    numbers = scaled_pool(BASE_NUMBERS, producing)
+    rng.shuffle(numbers)
 
     generated_hexes: List[Hex] = []
-    
-    # Axial coordinates for a hex grid with radius 2
-    coords = []
-    for q in range(-2, 3):
-        for r in range(-2, 3):
-            if -2 <= q + r <= 2:
-                coords.append((q, r))
-    
     res_idx = 0
-    num_idx = 0
-    
+
     for i, (q, r) in enumerate(coords):
-        if q == 0 and r == 0:
-            # Center is Desert
+        if (q, r) in deserts:
             generated_hexes.append(Hex(
                 id=i,
                 resource=ResourceType.DESERT,
@@ -43,20 +63,16 @@ def generate_board() -> Board:
                 r=r
             ))
         else:
-            res = resources[res_idx]
-            res_idx += 1
-            num = numbers[num_idx]
-            num_idx += 1
-            
             generated_hexes.append(Hex(
                 id=i, 
-                resource=res, 
-                number=num,
+                resource=resources[res_idx], 
+                number=numbers[res_idx],
                 q=q,
                 r=r
             ))
+            res_idx += 1
         
-    return Board(hexes=generated_hexes)
+    return Board(hexes=generated_hexes, radius=radius)
 
 # Coordinate normalization logic
 # Hex neighbors for q,r in order 0..5
@@ -405,20 +421,20 @@ def get_vertex_aliases(q, r, c):
     # A vertex touches 3 hexes in a honeycomb.
     # We add the adjacent hex mappings.
     if c == 0: 
-        matches.append((q, r-1, 4))
-        matches.append((q+1, r-1, 2))
+        matches.append((q, r-1, 2))
+        matches.append((q+1, r-1, 4))
     elif c == 1: 
         matches.append((q+1, r-1, 3))
         matches.append((q+1, r, 5))
     elif c == 2: 
-        matches.append((q+1, r, 0))
-        matches.append((q, r+1, 4))
+        matches.append((q+1, r, 4))
+        matches.append((q, r+1, 0))
     elif c == 3: 
-        matches.append((q, r+1, 1))
-        matches.append((q-1, r+1, 5))
+        matches.append((q, r+1, 5))
+        matches.append((q-1, r+1, 1))
     elif c == 4: 
-        matches.append((q-1, r+1, 2))
-        matches.append((q-1, r, 0))
+        matches.append((q-1, r+1, 0))
+        matches.append((q-1, r, 2))
     elif c == 5: 
         matches.append((q-1, r, 1))
         matches.append((q, r-1, 3))
@@ -456,19 +472,70 @@ def get_adjacent_vertices(q, r, c):
     return list(adj_verts)
 
 # --- Game Constants ---
-# --- Game Constants ---
-ROAD_COST = {"lumber": 1, "brick": 1}
-SETTLEMENT_COST = {"lumber": 1, "brick": 1, "wool": 1, "grain": 1}
-CITY_COST = {"grain": 2, "ore": 3}
+MAX_LOGS = 50
+MIN_PLAYERS = 2
+
+# Standard rules; a game's actual rules are `GameManager.rules` (see rules.py)
+VICTORY_POINTS = STANDARD["victory_points"]
+ROAD_COST = STANDARD["costs"]["road"]
+SETTLEMENT_COST = STANDARD["costs"]["settlement"]
+CITY_COST = STANDARD["costs"]["city"]
+
+# apply_actions: action type -> payload keys passed to the GameManager method, in order
+BATCH_ACTIONS = {
+    "build_settlement": ("q", "r", "corner"),
+    "build_road": ("q", "r", "edge"),
+    "build_city": ("q", "r", "corner"),
+    "roll_dice": (),
+    "end_turn": (),
+    "bank_trade": ("give", "get"),
+}
+MAX_BATCH = 32
+# Actions whose outcome is random. Rolling back a batch can't take back a roll
+# (the RNG has moved on), so they may only come last: a batch that reaches
+# one has nothing left to fail and is never undone, otherwise a client could
+# retry [roll_dice, build_city] until the dice came out right.
+COMMIT_ACTIONS = {"roll_dice"}
 
 from .models import ResourceType, GameLog
 import time
 
+def bumps_version(fn):
+    """Marks a GameManager action as state-changing.
+
+    A truthy result bumps `version` and is recorded in `actions`
+    ([name, args] plus the result when it isn't just True, e.g. the dice
+    total). Once the game is over every such action is refused.
+    """
+    name = fn.__name__
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if self.state.phase == "GAME_OVER":
+            return False
+        result = fn(self, *args, **kwargs)
+        if result:
+            self.version += 1
+            self.actions.append([name, list(args)] if result is True else [name, list(args), result])
+            self._check_winner()
+        if zobrist.VERIFY:
+            self.verify_hash(name)
+        return result
+    return wrapper
+
 class GameManager:
-    def __init__(self):
-        self.board = generate_board()
+    def __init__(self, radius: int = 2, num_players: int = 4, board: Board = None, rng=None, rules: RuleSet = None):
         from .models import GameState, PlayerColor, ResourceType, TradeOffer
-        self.state = GameState(players=[PlayerColor.RED, PlayerColor.BLUE, PlayerColor.ORANGE, PlayerColor.WHITE])
+        if not MIN_PLAYERS <= num_players <= len(PlayerColor):
+            raise ValueError(f"num_players must be between {MIN_PLAYERS} and {len(PlayerColor)}")
+
+        # Dice and automatic moves; a seeded random.Random makes a game replayable
+        self.rng = rng if rng is not None else random
+        # Costs, piece limits, VP target and trade ratios (CATAN_RULES or standard)
+        self.rules = rules if rules is not None else default_rules()
+        self.board = board if board is not None else generate_board(radius, self.rng)
+        self.topology = get_topology(self.board.radius)
+        self.hex_at = {(h.q, h.r): h for h in self.board.hexes}
+        self.state = GameState(players=list(PlayerColor)[:num_players])
         
         # Initialize inventories
         self.state.inventories = {
@@ -478,60 +545,217 @@ class GameManager:
         
         self.state.phase = "INITIAL_PLACEMENT_1"
         self.state.current_turn_index = 0
+        # Small ints for Zobrist keys (see zobrist.py)
+        self.seat = {p: i for i, p in enumerate(self.state.players)}
+        self.resource_index = {r: i for i, r in enumerate(RESOURCES)}
+
+        # Incremented on every successful action; used as a cache key for
+        # encoded state frames.
+        self.version = 0
+        # Every successful action, for the archive (see bumps_version)
+        self.actions = []
+        self.started_at = time.time()
+        self.finished_at = None
+
+        # Game-visible logs live outside GameState so they are not re-sent
+        # with every state broadcast. `logs` keeps the last MAX_LOGS for
+        # (re)connecting clients, `pending_logs` holds entries not yet sent.
+        self.logs = deque(maxlen=MAX_LOGS)
+        self.pending_logs = deque(maxlen=MAX_LOGS)
+
+        self._reset_indexes()
+
+    def _reset_indexes(self):
+        # Lookup indexes mirroring state.buildings / state.roads, so rule
+        # checks don't scan every piece on the board. Keys are normalized
+        # (q, r, c) / (q, r, e) tuples; values are the same model objects.
+        self.building_at = {}
+        self.road_at = {}
+        self.building_count = {p: 0 for p in self.state.players} # settlements + cities
+        self.city_count = {p: 0 for p in self.state.players}
+        self.road_count = {p: 0 for p in self.state.players}
+        # number -> [(vertex, hex)] for every building touching a hex with that number
+        self.production = {}
+        # Zobrist hashes of the pieces (kept up to date by _place_* and
+        # build_city) and of the hands (_add_cards); `zobrist` adds the turn
+        self.zhash = 0
+        self.zhands = 0
+
+    def _load_state(self, state):
+        """Adopt `state` wholesale and rebuild the lookup indexes from it."""
+        buildings, roads = state.buildings, state.roads
+        state.buildings, state.roads = [], []
+        self.state = state
+        self._reset_indexes()
+        for b in buildings:
+            self._place_building(b)
+            if b.type == "city":
+                self.city_count[b.owner] += 1
+        for road in roads:
+            self._place_road(road)
+        for color, inventory in state.inventories.items():
+            for res, count in inventory.items():
+                if res in self.resource_index:
+                    self.zhands ^= zobrist.cards_key(self.seat[color], self.resource_index[res], count)
+
+    @property
+    def zobrist(self) -> int:
+        """64-bit hash of the position: pieces, hands and whose turn / which phase."""
+        return self.zhash ^ self.zhands ^ zobrist.turn_key(self.state)
+
+    @property
+    def public_zobrist(self) -> int:
+        """Same without the hands, so it gives nothing away to other players."""
+        return self.zhash ^ zobrist.turn_key(self.state)
+
+    def verify_hash(self, after="check"):
+        """Recompute the hash from scratch and fail loudly if the incremental one drifted."""
+        expected = zobrist.position_hash(self)
+        if self.zobrist != expected or self.zhash != zobrist.pieces_hash(self.state, self.seat):
+            raise AssertionError(f"zobrist hash drifted after {after}: {self.zobrist:016x} != {expected:016x}")
+
+    def _add_cards(self, color, res, delta):
+        """The only way cards enter or leave a hand, so the hash follows along."""
+        inventory = self.state.inventories[color]
+        old = inventory[res]
+        inventory[res] = old + delta
+        i = self.resource_index.get(res)
+        if i is not None:
+            seat = self.seat[color]
+            self.zhands ^= zobrist.cards_key(seat, i, old) ^ zobrist.cards_key(seat, i, old + delta)
+
+    def _pay(self, color, build: int):
+        for res, n in self.rules.cost_items[build]:
+            self._add_cards(color, res, -n)
+
+    def snapshot(self) -> dict:
+        """JSON-ready copy of everything needed to rebuild this game elsewhere."""
+        return {
+            "board": self.board.model_dump(mode="json"),
+            "state": self.state.model_dump(mode="json"),
+            "version": self.version,
+            "logs": [log.model_dump(mode="json") for log in self.logs],
+            "actions": self.actions,
+            "rules": self.rules.config,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: dict) -> "GameManager":
+        from .models import GameState
+        state = GameState.model_validate(data["state"])
+        rules = RuleSet(data["rules"]) if "rules" in data else None
+        gm = cls(num_players=len(state.players), board=Board.model_validate(data["board"]), rules=rules)
+        gm._load_state(state)
+        gm.version = data.get("version", 0)
+        gm.logs.extend(GameLog.model_validate(log) for log in data.get("logs", ()))
+        gm.actions = list(data.get("actions", ()))
+        gm.started_at = data.get("started_at", gm.started_at)
+        gm.finished_at = data.get("finished_at")
+        return gm
+
+    def victory_points(self, color) -> int:
+        # Settlement 1, city 2 (no cards, longest road or largest army yet)
+        return self.building_count[color] + self.city_count[color]
+
+    def winner(self):
+        """Color of the player who reached the rules' victory points, if any."""
+        for color in self.state.players:
+            if self.victory_points(color) >= self.rules.victory_points:
+                return color
+        return None
+
+    def can_afford_all(self, player) -> dict:
+        """{build type: whether `player`'s hand covers it}, checked in one pass."""
+        mask = self.rules.affordable(self.state.inventories[player])
+        return {build: bool(mask >> b & 1) for b, build in enumerate(BUILDS)}
+
+    def _check_winner(self):
+        if self.state.phase != "GAME_LOOP":
+            return
+        winner = self.winner()
+        if winner is not None:
+            self.state.phase = "GAME_OVER"
+            self.state.turn_sub_phase = None
+            self.finished_at = time.time()
+            self.add_log(f"wins with {self.victory_points(winner)} points!", player_color=winner)
 
     def add_log(self, message: str, player_color=None):
         log = GameLog(message=message, player_color=player_color, timestamp=time.time())
-        self.state.logs.append(log)
-        # Keep last 50
-        if len(self.state.logs) > 50:
-            self.state.logs.pop(0)
+        self.logs.append(log)
+        self.pending_logs.append(log)
 
+    def drain_logs(self):
+        """Returns log entries added since the last call."""
+        entries = list(self.pending_logs)
+        self.pending_logs.clear()
+        return entries
+
+    def _place_building(self, building):
+        loc = building.location
+        v = (loc.q, loc.r, loc.corner)
+        self.state.buildings.append(building)
+        self.building_at[v] = building
+        self.building_count[building.owner] += 1
+        self.zhash ^= zobrist.building_key(v, self.seat[building.owner], building.type)
+        for coord in self.topology.vertex_hexes[v]:
+            h = self.hex_at[coord]
+            if h.number is not None and h.resource != ResourceType.DESERT:
+                self.production.setdefault(h.number, []).append((v, h))
+
+    def _place_road(self, road):
+        loc = road.location
+        self.state.roads.append(road)
+        self.road_at[(loc.q, loc.r, loc.edge)] = road
+        self.road_count[road.owner] += 1
+        self.zhash ^= zobrist.road_key((loc.q, loc.r, loc.edge), self.seat[road.owner])
+
+    @timed("catan_game_action_seconds", action="build_settlement")
+    @bumps_version
     def build_settlement(self, q, r, c):
         # 1. Check phase restrictions
         if self.state.phase == "GAME_LOOP":
             if self.state.turn_sub_phase != "BUILD_TRADE":
                 return False # Cannot build until dice are rolled (and trade phase starts)
         
-        nq, nr, nc = normalize_vertex(q, r, c)
+        v = normalize_vertex(q, r, c)
+        nq, nr, nc = v
+        if v not in self.topology.vertices:
+            return False # Off the board
         
         # Check if occupied
-        for b in self.state.buildings:
-            if b.location.q == nq and b.location.r == nr and b.location.corner == nc:
-                return False # Occupied
+        if v in self.building_at:
+            return False # Occupied
 
         # Phase Limits Check
         current_p_color = self.state.players[self.state.current_turn_index]
-        existing_sets = [b for b in self.state.buildings if b.owner == current_p_color]
+        existing_sets = self.building_count[current_p_color]
         
         if self.state.phase == "INITIAL_PLACEMENT_1":
-            if len(existing_sets) >= 1: return False
+            if existing_sets >= 1: return False
         elif self.state.phase == "INITIAL_PLACEMENT_2":
-            if len(existing_sets) >= 2: return False
+            if existing_sets >= 2: return False
+        elif self.rules.at_limit(SETTLEMENT, existing_sets - self.city_count[current_p_color]):
+            self.add_log(f"Max {self.rules.limits[SETTLEMENT]} settlements reached!", player_color=current_p_color)
+            return False
 
         # DISTANCE RULE (2 spots away)
         # Check all adjacent vertices. If any has a building, fail.
-        adj_verts = get_adjacent_vertices(nq, nr, nc)
-        for av in adj_verts:
-            # Check if occupied
-            # av is (q,r,c) ID.
-            for b in self.state.buildings:
-                if b.location.q == av[0] and b.location.r == av[1] and b.location.corner == av[2]:
-                    self.add_log("Too close to another building!", player_color=current_p_color)
-                    return False
+        for av in self.topology.vertex_adjacent[v]:
+            if av in self.building_at:
+                self.add_log("Too close to another building!", player_color=current_p_color)
+                return False
 
         # CONNECTION RULE
         # Must connect to own road (except in Initial Phase)
         if self.state.phase == "GAME_LOOP":
-            incident_edges = get_incident_edges(nq, nr, nc)
             has_connection = False
-            for ie in incident_edges:
-                # ie is (q,r,e)
-                for r_obj in self.state.roads:
-                    if r_obj.owner == current_p_color:
-                        if r_obj.location.q == ie[0] and r_obj.location.r == ie[1] and r_obj.location.edge == ie[2]:
-                            has_connection = True
-                            break
-                if has_connection: break
+            for ie in self.topology.vertex_edges[v]:
+                road = self.road_at.get(ie)
+                if road is not None and road.owner == current_p_color:
+                    has_connection = True
+                    break
             
             if not has_connection:
                 self.add_log("Must connect to your road!", player_color=current_p_color)
@@ -540,20 +764,15 @@ class GameManager:
         # COST CHECK & CONSUMPTION
         if self.state.phase == "GAME_LOOP":
             inventory = self.state.inventories[current_p_color]
-            # Check
-            for res, amount in SETTLEMENT_COST.items():
-                if inventory.get(res, 0) < amount:
-                    return False # Insufficient resources
-            
-            # Consume
-            for res, amount in SETTLEMENT_COST.items():
-                inventory[res] -= amount
+            if not self.rules.can_afford(inventory, SETTLEMENT):
+                return False # Insufficient resources
+            self._pay(current_p_color, SETTLEMENT)
         
         player = self.state.players[self.state.current_turn_index]
         from .models import Building, VertexID
         
         new_b = Building(owner=player, type="settlement", location=VertexID(q=nq, r=nr, corner=nc))
-        self.state.buildings.append(new_b)
+        self._place_building(new_b)
         
         self.add_log(f"built a settlement at {nq},{nr},{nc}", player_color=player)
         
@@ -561,80 +780,60 @@ class GameManager:
         self.advance_turn_if_needed("settlement")
         return True
 
+    @timed("catan_game_action_seconds", action="build_road")
+    @bumps_version
     def build_road(self, q, r, e):
         # 1. Check phase restrictions
         if self.state.phase == "GAME_LOOP":
             if self.state.turn_sub_phase != "BUILD_TRADE":
                 return False # Cannot build until dice are rolled
         
-        nq, nr, ne = normalize_edge(q, r, e)
+        edge = normalize_edge(q, r, e)
+        nq, nr, ne = edge
+        if edge not in self.topology.edges:
+            return False # Off the board
         
         # Check occupied
-        for road in self.state.roads:
-            if road.location.q == nq and road.location.r == nr and road.location.edge == ne:
-                return False
+        if edge in self.road_at:
+            return False
 
         current_p_color = self.state.players[self.state.current_turn_index]
-        existing_roads = [r for r in self.state.roads if r.owner == current_p_color]
+        existing_roads = self.road_count[current_p_color]
         
-        # LIMIT CHECK (Max 15 roads)
-        if len(existing_roads) >= 15:
+        # LIMIT CHECK (15 roads in standard rules)
+        if self.rules.at_limit(ROAD, existing_roads):
              if self.state.phase == "GAME_LOOP":
                  return False
 
         if self.state.phase == "INITIAL_PLACEMENT_1":
-            if len(existing_roads) >= 1: return False
+            if existing_roads >= 1: return False
         elif self.state.phase == "INITIAL_PLACEMENT_2":
-            if len(existing_roads) >= 2: return False
+            if existing_roads >= 2: return False
 
         # CONNECTION RULE
         # Must connect to own road or own building at either endpoint.
-        # Incident vertices of this edge:
-        # V1 = (nq, nr, ne) normalized
-        # V2 = (nq, nr, ne+1) normalized
-        # Start with liberal check:
-        # Check V1: Is there a building there owned by me? OR Is there another road incident to V1 owned by me?
-        # Check V2: Similar.
-        
-        # We need a helper for "Roads incident to Vertex".
-        # conveniently, get_incident_edges(v) checks all edges at v.
-        # So:
-        # 1. Get V1, V2.
-        # 2. For each V:
+        # For each endpoint V:
         #    a. Check if I have a building at V. If yes, Connected.
         #    b. Check incident edges of V (excluding THIS edge).
         #       If any owner == me, Connected.
-        
-        # Wait, I need `get_incident_edges`. I implemented it but didn't expose it to `build_road` scope? 
-        # It's at global scope in file.
-        
-        v1 = normalize_vertex(nq, nr, ne)
-        v2 = normalize_vertex(nq, nr, ne + 1)
-        
         has_connection = False
         
         # Check endpoints
-        for v in [v1, v2]:
+        for v in self.topology.edge_vertices[edge]:
             # Building check
-            for b in self.state.buildings:
-                if b.owner == current_p_color:
-                    if b.location.q == v[0] and b.location.r == v[1] and b.location.corner == v[2]:
-                        has_connection = True
-                        break
-            if has_connection: break
+            b = self.building_at.get(v)
+            if b is not None and b.owner == current_p_color:
+                has_connection = True
+                break
             
             # Road check
-            inc_edges = get_incident_edges(v[0], v[1], v[2])
-            for ie in inc_edges:
+            for ie in self.topology.vertex_edges[v]:
                 # Skip self (nq, nr, ne)
-                if ie == (nq, nr, ne): continue
-                
-                for r_obj in self.state.roads:
-                    if r_obj.owner == current_p_color:
-                        if r_obj.location.q == ie[0] and r_obj.location.r == ie[1] and r_obj.location.edge == ie[2]:
-                            has_connection = True
-                            break
-                if has_connection: break
+                if ie == edge: continue
+                road = self.road_at.get(ie)
+                if road is not None and road.owner == current_p_color:
+                    has_connection = True
+                    break
             if has_connection: break
 
         # If Initial Phase, we relax? No, Standard Catan rules say Initial Road must attach to the Settlement just placed.
@@ -654,41 +853,35 @@ class GameManager:
         # COST CHECK & CONSUMPTION
         if self.state.phase == "GAME_LOOP":
             inventory = self.state.inventories[current_p_color]
-            for res, amount in ROAD_COST.items():
-                if inventory.get(res, 0) < amount:
-                    return False
-            
-            for res, amount in ROAD_COST.items():
-                inventory[res] -= amount
+            if not self.rules.can_afford(inventory, ROAD):
+                return False
+            self._pay(current_p_color, ROAD)
 
         player = self.state.players[self.state.current_turn_index]
         from .models import Road, EdgeID
         new_r = Road(owner=player, location=EdgeID(q=nq, r=nr, edge=ne))
-        self.state.roads.append(new_r)
+        self._place_road(new_r)
         
         self.add_log(f"built a road at {nq},{nr},{ne}", player_color=player)
 
         self.advance_turn_if_needed("road")
         return True
 
+    @timed("catan_game_action_seconds", action="build_city")
+    @bumps_version
     def build_city(self, nq, nr, nc):
         if self.state.phase != "GAME_LOOP": return False
         
         current_p_color = self.state.players[self.state.current_turn_index]
         
-        # 1. Check Limits (Max 4 Cities)
-        existing_cities = [b for b in self.state.buildings if b.owner == current_p_color and b.type == "city"]
-        if len(existing_cities) >= 4:
-            self.add_log("Max 4 cities reached!", player_color=current_p_color)
+        # 1. Check Limits (4 cities in standard rules)
+        if self.rules.at_limit(CITY, self.city_count[current_p_color]):
+            self.add_log(f"Max {self.rules.limits[CITY]} cities reached!", player_color=current_p_color)
             return False
 
         # 2. Check Valid Target (Must have own Settlement at location)
         # Verify ownership and type
-        target_building = None
-        for b in self.state.buildings:
-            if b.location.q == nq and b.location.r == nr and b.location.corner == nc:
-                target_building = b
-                break
+        target_building = self.building_at.get((nq, nr, nc))
         
         if not target_building:
             self.add_log("No building selection!", player_color=current_p_color)
@@ -704,16 +897,17 @@ class GameManager:
 
         # 3. Check Cost
         inventory = self.state.inventories[current_p_color]
-        for res, amount in CITY_COST.items():
-            if inventory.get(res, 0) < amount:
-                return False
+        if not self.rules.can_afford(inventory, CITY):
+            return False
         
         # 4. Consume
-        for res, amount in CITY_COST.items():
-            inventory[res] -= amount
+        self._pay(current_p_color, CITY)
             
         # 5. Upgrade
         target_building.type = "city"
+        seat = self.seat[current_p_color]
+        self.zhash ^= zobrist.building_key((nq, nr, nc), seat, "settlement") ^ zobrist.building_key((nq, nr, nc), seat, "city")
+        self.city_count[current_p_color] += 1
         self.add_log(f"upgraded to a City at {nq},{nr},{nc}", player_color=current_p_color)
         
         return True
@@ -722,34 +916,34 @@ class GameManager:
         current_p_color = self.state.players[self.state.current_turn_index]
         
         # Count what this player has built
-        settlements = [b for b in self.state.buildings if b.owner == current_p_color]
-        roads = [r for r in self.state.roads if r.owner == current_p_color]
+        settlements = self.building_count[current_p_color]
+        roads = self.road_count[current_p_color]
         
         # Phase Logic
         if self.state.phase == "INITIAL_PLACEMENT_1":
             # Requirement: 1 Settlement, 1 Road
-            if len(settlements) >= 1 and len(roads) >= 1:
+            if settlements >= 1 and roads >= 1:
                 # Turn Complete
                 self.handle_turn_end()
                 
         elif self.state.phase == "INITIAL_PLACEMENT_2":
             # Requirement: 2 Settlements, 2 Roads (Total key)
-            if len(settlements) >= 2 and len(roads) >= 2:
+            if settlements >= 2 and roads >= 2:
                 self.handle_turn_end()
         
         # Game Loop logic (not strictly enforced for MVP yet, standard is roll dice -> trade -> build -> end turn manually)
         
     def handle_turn_end(self):
+        last_index = len(self.state.players) - 1
         # Snake draft logic
         if self.state.phase == "INITIAL_PLACEMENT_1":
-            if self.state.current_turn_index < 3:
+            if self.state.current_turn_index < last_index:
                 self.state.current_turn_index += 1
             else:
                 self.state.phase = "INITIAL_PLACEMENT_2"
-                # Player 3 (index 3) goes again first in Phase 2? 
+                # The last player goes again first in Phase 2.
                 # Snake draft: 0,1,2,3 -> 3,2,1,0
-                # So if we just finished 3's turn in Phase 1, it becomes 3's turn in Phase 2.
-                # Currently index is 3. We keep it 3.
+                # So if we just finished the last player's turn in Phase 1, it stays their turn in Phase 2.
                 pass 
         elif self.state.phase == "INITIAL_PLACEMENT_2":
             if self.state.current_turn_index > 0:
@@ -758,17 +952,18 @@ class GameManager:
                 self.state.phase = "GAME_LOOP"
                 self.state.current_turn_index = 0
         else:
-             self.state.current_turn_index = (self.state.current_turn_index + 1) % 4
+             self.state.current_turn_index = (self.state.current_turn_index + 1) % len(self.state.players)
 
         # Reset sub-phase if in Game Loop
         if self.state.phase == "GAME_LOOP":
             self.state.turn_sub_phase = "ROLL_DICE"
 
+    @timed("catan_game_action_seconds", action="roll_dice")
+    @bumps_version
     def roll_dice(self):
-        import random
         # 2 dice 1-6
-        d1 = random.randint(1, 6)
-        d2 = random.randint(1, 6)
+        d1 = self.rng.randint(1, 6)
+        d2 = self.rng.randint(1, 6)
         total = d1 + d2
         
         self.state.last_dice_result = total
@@ -778,6 +973,8 @@ class GameManager:
         self.state.turn_sub_phase = "BUILD_TRADE"
         return total
 
+    @timed("catan_game_action_seconds", action="end_turn")
+    @bumps_version
     def end_turn(self):
         # Advance to next player
         self.state.current_turn_index = (self.state.current_turn_index + 1) % len(self.state.players)
@@ -785,42 +982,147 @@ class GameManager:
         # Reset turn state
         self.state.turn_sub_phase = "ROLL_DICE"
         self.state.last_dice_result = None # Clear dice result for next player
-        print(f"Turn advanced to {self.state.players[self.state.current_turn_index]}")
+        logger.debug("Turn advanced to %s", self.state.players[self.state.current_turn_index])
+        return True
+
+    @timed("catan_game_action_seconds", action="apply_actions")
+    def apply_actions(self, actions):
+        """Apply a list of actions all-or-nothing.
+
+        Each action is a dict like {"type": "build_road", "q": 0, "r": 0, "edge": 1}
+        (see BATCH_ACTIONS). They run in order through the normal action
+        methods; if one is unknown, malformed or rejected, everything done by
+        the batch is undone, including its log entries. A dice roll may only
+        be the last action (COMMIT_ACTIONS).
+
+        Returns (ok, results) where results holds the return value of each
+        action that ran (the last one is the failure when ok is False).
+        """
+        if not 0 < len(actions) <= MAX_BATCH:
+            return False, []
+        for action in actions[:-1]:
+            if isinstance(action, dict) and action.get("type") in COMMIT_ACTIONS:
+                return False, []
+
+        saved_state = self.state.model_copy(deep=True)
+        saved_version = self.version
+        saved_actions = len(self.actions)
+        saved_logs = list(self.logs), list(self.pending_logs)
+
+        results = []
+        for action in actions:
+            try:
+                kind = action["type"]
+                args = [action[k] for k in BATCH_ACTIONS[kind]]
+                result = getattr(self, kind)(*args)
+            except (KeyError, TypeError, ValueError):
+                result = False
+            results.append(result)
+            if not result:
+                break
+            if self.state.phase == "GAME_OVER":
+                return True, results  # the batch won the game; the rest can't apply
+        else:
+            return True, results
+
+        # Roll back. The restored state is identical to the one at
+        # saved_version, so cached frames for that version are still valid.
+        player = saved_state.players[saved_state.current_turn_index]
+        failed = action.get("type") if isinstance(action, dict) else None
+        self._load_state(saved_state)
+        self.version = saved_version
+        del self.actions[saved_actions:]
+        self.logs.clear()
+        self.logs.extend(saved_logs[0])
+        self.pending_logs.clear()
+        self.pending_logs.extend(saved_logs[1])
+        self.add_log(f"batch rejected: action {len(results)} ({failed}) failed", player_color=player)
+        return False, results
+
+    @timed("catan_game_action_seconds", action="default_action")
+    def default_action(self):
+        """What happens when the current player's turn timer runs out.
+
+        Rolls for them, ends their turn, or (during the initial draft) drops
+        a settlement and road on a random legal spot. Returns True if the
+        state changed.
+        """
+        player = self.state.players[self.state.current_turn_index]
+        if self.state.phase == "GAME_OVER":
+            return False
+        if self.state.phase == "GAME_LOOP":
+            if self.state.turn_sub_phase == "ROLL_DICE":
+                self.add_log("ran out of time, rolling automatically", player_color=player)
+                self.roll_dice()
+                return True
+            self.add_log("ran out of time, turn ended", player_color=player)
+            self.state.active_trade = None
+            return self.end_turn()
+
+        self.add_log("ran out of time, placing automatically", player_color=player)
+        return self._auto_place(player)
+
+    def _auto_place(self, player):
+        needed = 1 if self.state.phase == "INITIAL_PLACEMENT_1" else 2
+        changed = False
+        if self.building_count[player] < needed:
+            free = [
+                v for v in self.topology.vertices
+                if v not in self.building_at
+                and not any(a in self.building_at for a in self.topology.vertex_adjacent[v])
+            ]
+            if not free or not self.build_settlement(*self.rng.choice(free)):
+                return False
+            changed = True
+        if self.road_count[player] < needed:
+            # Next to the settlement just placed (the newest one of ours)
+            last = next(b for b in reversed(self.state.buildings) if b.owner == player).location
+            free = [e for e in self.topology.vertex_edges[(last.q, last.r, last.corner)] if e not in self.road_at]
+            if free and self.build_road(*self.rng.choice(free)):
+                changed = True
+        return changed
+
+    @timed("catan_game_action_seconds", action="expire_trade_offer")
+    @bumps_version
+    def expire_trade_offer(self):
+        trade = self.state.active_trade
+        if trade is None:
+            return False
+        self.state.active_trade = None
+        self.add_log("Trade offer expired", player_color=trade.offerer)
         return True
 
+    @timed("catan_game_action_seconds", action="distribute_resources")
     def distribute_resources(self, number: int):
         if number == 7:
             # Robber - not implemented yet
             return
 
-        # Find hexes with this number
-        target_hexes = [h for h in self.board.hexes if h.number == number]
-        
-        for h in target_hexes:
-            if h.resource == "desert": 
-                continue # Should not happen if number logic is correct (Desert has no number) but safe guard
-            
-            # Check all 6 corners for settlements
-            # We need to reconstruct the vertices for this hex and check if any building is there.
-            # Building location is normalized.
-            # We must normalize the 6 corners of this hex and match against buildings.
+        # Only buildings touching a hex with this number are visited, so the
+        # cost depends on pieces in play, not on board size.
+        for v, h in self.production.get(number, ()):
+            building = self.building_at[v]
+            # Grant resource
+            # Settlement = 1 card. City = 2 cards
+            count = 2 if building.type == "city" else 1
             
-            for c in range(6):
-                nq, nr, nc = normalize_vertex(h.q, h.r, c)
-                
-                # Check if there is a building at (nq, nr, nc)
-                building = next((b for b in self.state.buildings 
-                                 if b.location.q == nq and b.location.r == nr and b.location.corner == nc), None)
-                
-                if building:
-                    # Grant resource
-                    # Settlement = 1 card. City = 2 cards
-                    count = 2 if building.type == "city" else 1
-                    
-                    self.state.inventories[building.owner][h.resource] += count
-                    self.add_log(f"got {count} {h.resource}", player_color=building.owner)
-                    print(f"Distributed {count} {h.resource} to {building.owner} from Hex {h.id}")
+            self._add_cards(building.owner, h.resource, count)
+            self.add_log(f"got {count} {h.resource}", player_color=building.owner)
+            logger.debug("Distributed %d %s to %s from Hex %d", count, h.resource, building.owner, h.id)
 
+    @timed("catan_game_action_seconds", action="cheat_resources")
+    @bumps_version
+    def cheat_resources(self, amount: int = 5):
+        """Debug helper for the 'test resources' button: gives the current player `amount` of everything."""
+        player = self.state.players[self.state.current_turn_index]
+        for res in ResourceType:
+            if res != ResourceType.DESERT:
+                self._add_cards(player, res, amount)
+        self.add_log(f"received {amount} of each resource (test)", player_color=player)
+        return True
+
+    @timed("catan_game_action_seconds", action="bank_trade")
+    @bumps_version
     def bank_trade(self, give_res: str, get_res: str):
         if self.state.phase != "GAME_LOOP": return False
         
@@ -828,17 +1130,22 @@ class GameManager:
         inventory = self.state.inventories[current_p_color]
         
         # Validation
-        if inventory.get(give_res, 0) < 4:
-            self.add_log(f"Not enough {give_res} to trade (need 4)", player_color=current_p_color)
+        ratio = self.rules.ratio(give_res)
+        if ratio is None:
+            return False # Not a resource
+        if inventory.get(give_res, 0) < ratio:
+            self.add_log(f"Not enough {give_res} to trade (need {ratio})", player_color=current_p_color)
             return False
             
         # Execute Trade
-        inventory[give_res] -= 4
-        inventory[get_res] += 1
+        self._add_cards(current_p_color, give_res, -ratio)
+        self._add_cards(current_p_color, get_res, 1)
         
-        self.add_log(f"traded 4 {give_res} for 1 {get_res}", player_color=current_p_color)
+        self.add_log(f"traded {ratio} {give_res} for 1 {get_res}", player_color=current_p_color)
         return True
 
+    @timed("catan_game_action_seconds", action="create_trade_offer")
+    @bumps_version
     def create_trade_offer(self, give: dict, get: dict):
         current_p = self.state.players[self.state.current_turn_index]
         from .models import TradeOffer
@@ -859,6 +1166,8 @@ class GameManager:
         self.add_log(f"proposes a trade...", player_color=current_p)
         return True
 
+    @timed("catan_game_action_seconds", action="cancel_trade_offer")
+    @bumps_version
     def cancel_trade_offer(self):
         current_p = self.state.players[self.state.current_turn_index]
         if self.state.active_trade and self.state.active_trade.offerer == current_p:
@@ -867,6 +1176,8 @@ class GameManager:
             return True
         return False
 
+    @timed("catan_game_action_seconds", action="respond_to_offer")
+    @bumps_version
     def respond_to_offer(self, responder_color: str, accept: bool):
         if not self.state.active_trade: return False
         
@@ -884,6 +1195,8 @@ class GameManager:
                 # Typo in log fixed in mind, but for code "accepted"
         return True
 
+    @timed("catan_game_action_seconds", action="confirm_trade")
+    @bumps_version
     def confirm_trade(self, target_player: str):
         trade = self.state.active_trade
         if not trade: return False
@@ -897,18 +1210,22 @@ class GameManager:
         # Deduct from offerer, Add to target
         for res, count in trade.give.items():
             if inv_offerer.get(res, 0) < count: return False
-            inv_offerer[res] -= count
-            inv_target[res] += count
+            self._add_cards(offerer, res, -count)
+            self._add_cards(target_player, res, count)
             
         # Deduct from target, Add to offerer
         for res, count in trade.get.items():
             if inv_target.get(res, 0) < count: return False
-            inv_target[res] -= count
-            inv_offerer[res] += count
+            self._add_cards(target_player, res, -count)
+            self._add_cards(offerer, res, count)
             
         self.add_log(f"Trade completed with {target_player}", player_color=offerer)
         self.state.active_trade = None
         return True
 
+# CATAN_BOARD_RADIUS / CATAN_PLAYERS configure new tables (default: standard 4-player board)
+BOARD_RADIUS = int(os.environ.get("CATAN_BOARD_RADIUS", "2"))
+PLAYERS = int(os.environ.get("CATAN_PLAYERS", "4"))
+
 # Global Manager
-game_manager = GameManager()
+game_manager = GameManager(radius=BOARD_RADIUS, num_players=PLAYERS)
@@ -0,0 +1,45 @@
+import os
+import sys
+import atexit
+import logging
+import logging.handlers
+import queue
+
+# Server diagnostics go through a queue so the event loop never blocks on
+# stdout/stderr. Records are formatted and written by a background thread.
+LOG_LEVEL = os.environ.get("CATAN_LOG_LEVEL", "INFO").upper()
+
+_listener = None
+
+
+def setup_logging(level: str = LOG_LEVEL):
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+
+    sink = logging.StreamHandler(sys.stderr)
+    sink.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger("catan")
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, sink, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Loggers live under the 'catan' namespace, e.g. catan.game_logic."""
+    setup_logging()
+    return logging.getLogger("catan." + name.rsplit(".", 1)[-1])
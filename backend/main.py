@@ -1,9 +1,48 @@
-from fastapi import FastAPI
+import os
+import hmac
+import asyncio
+import functools
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs
+from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, RedirectResponse, Response, FileResponse
 import socketio
-from .game_logic import generate_board
+from .game_logic import BOARD_RADIUS, PLAYERS
+from . import metrics
+from .metrics import timed
+from .log import get_logger
+from .broadcast import room_members, send_frame, send_frame_to, client_queues
+from .views import encode_event, etag_matches
+from .ratelimit import RateLimiter
+from .forecast import DEFAULT_TURNS, MAX_TURNS
+from .rooms import RoomRegistry, DEFAULT_ROOM, prepare_game
+from .cluster import ClusterNode
+from .timers import TimerService
+from .pool import GamePool
+from .archive import GameArchive, game_record, DEFAULT_PAGE
+from .profiling import Profiler, DEFAULT_INTERVAL
 
-app = FastAPI()
+logger = get_logger(__name__)
+
+@asynccontextmanager
+async def lifespan(_app):
+    timers.start()
+    if ROOM_IDLE_TIMEOUT > 0:
+        sweep_rooms()
+    if pool is not None:
+        pool.start()
+    if cluster is not None:
+        await cluster.start()
+    yield
+    if cluster is not None:
+        await cluster.stop()
+    await timers.stop()
+    profiler.stop()
+    if pool is not None:
+        await asyncio.to_thread(pool.stop)
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS configuration
 origins = [
@@ -32,66 +71,427 @@ sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
 fastapi_app = app
 app = socketio.ASGIApp(sio, other_asgi_app=fastapi_app)
 
+# Client roles:
+#   table     - the local hot-seat screen; sees every hand. Only in hot-seat
+#               rooms (CATAN_HOTSEAT=1) or with the admin token, otherwise
+#               the client is demoted to spectator
+#   player    - seated as one color; public state + own hand only
+#   spectator - default; read-only, public state, rate limited
+HOTSEAT = os.environ.get("CATAN_HOTSEAT", "").lower() in ("1", "true", "yes")
+
+# Max spectator frames per second, 0 sends every update
+SPECTATOR_RATE = float(os.environ.get("CATAN_SPECTATOR_RATE", "10"))
+
+# New rooms take a pre-built game from a pool that a background thread keeps
+# filled (see pool.py). CATAN_GAME_POOL is the most games kept ready, 0 disables.
+POOL_MAX = int(os.environ.get("CATAN_GAME_POOL", "256"))
+pool = GamePool(functools.partial(prepare_game, radius=BOARD_RADIUS, num_players=PLAYERS),
+                max_size=POOL_MAX) if POOL_MAX > 0 else None
+
+# Rooms left empty this many seconds are dropped, game and all (0 keeps them
+# forever). One client address may have at most CATAN_MAX_ROOMS_PER_CLIENT
+# rooms open (0 = no cap).
+ROOM_IDLE_TIMEOUT = float(os.environ.get("CATAN_ROOM_IDLE_TIMEOUT", "600"))
+MAX_ROOMS_PER_CLIENT = int(os.environ.get("CATAN_MAX_ROOMS_PER_CLIENT", "8"))
+
+# Games hosted by this process, keyed by room ID (?room=..., default "default")
+rooms = RoomRegistry(sio, spectator_rate=SPECTATOR_RATE, pool=pool, hotseat=HOTSEAT,
+                     max_rooms_per_client=MAX_ROOMS_PER_CLIENT)
+
+# Set when running as one worker of a sharded deployment (see cluster.py)
+cluster = ClusterNode.from_env(rooms, sio)
+
+# Seconds a player may idle before the default action is taken for them
+# (auto-roll / auto-end-turn / auto-place), and how long a trade offer stays
+# open. 0 disables. Every room shares one timing wheel (see timers.py).
+TURN_TIMEOUT = float(os.environ.get("CATAN_TURN_TIMEOUT", "0"))
+TRADE_TIMEOUT = float(os.environ.get("CATAN_TRADE_TIMEOUT", "0"))
+timers = TimerService()
+
+# Token buckets per connection and event (see ratelimit.py). CATAN_RATE_LIMIT=0 disables.
+limiter = RateLimiter()
+
+# Finished games are written here (see archive.py)
+archive = GameArchive(os.environ.get("CATAN_ARCHIVE_DIR", "archive"))
+
+# Admin endpoints (/admin/...) need "Authorization: Bearer <CATAN_ADMIN_TOKEN>"
+# and don't exist when it's unset.
+ADMIN_TOKEN = os.environ.get("CATAN_ADMIN_TOKEN", "")
+
+def _room_id_of(sid):
+    room = rooms.room_of(sid)
+    return room.id if room is not None else None
+
+# Profile captures on demand (see profiling.py); nothing runs until one starts
+profiler = Profiler(os.environ.get("CATAN_PROFILE_DIR", "profiles"),
+                    handlers=lambda: sio.handlers.get("/", {}), room_of=_room_id_of)
+
 @fastapi_app.get("/")
 async def root():
     return {"message": "Catan Backend is running. Access /api/board for game data."}
 
 @fastapi_app.get("/api/board")
-async def get_board():
-    return generate_board()
+async def get_board(request: Request, room: str = DEFAULT_ROOM):
+    """The room's board with render geometry. Built once per board; clients
+    revalidate with If-None-Match and get a 304 while the game lasts."""
+    if cluster is not None and not cluster.owns(room):
+        return RedirectResponse(f"{cluster.url_for(room)}{request.url.path}?{request.url.query}")
+    hosted = rooms.get_or_create(room) if room == DEFAULT_ROOM else rooms.get(room)
+    if hosted is None:
+        raise HTTPException(status_code=404, detail="no such room")
+    body, gzipped, etag = hosted.board_view.http()
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(gzipped, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(body, media_type="application/json", headers=headers)
+
+@fastapi_app.get("/api/history")
+async def get_history(player: str = None, winner: str = None, since: float = None, until: float = None,
+                      before: int = None, limit: int = DEFAULT_PAGE):
+    # Newest first; pass `next` back as `before` for the following page
+    return await asyncio.to_thread(archive.query, player=player, winner=winner, since=since, until=until,
+                                   before=before, limit=limit)
+
+@fastapi_app.get("/api/history/{game_id}")
+async def get_history_game(game_id: int):
+    record = await asyncio.to_thread(archive.read, game_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="no such game")
+    return record
+
+def require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404)
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="admin token required")
+
+@fastapi_app.post("/admin/profile", dependencies=[Depends(require_admin)], status_code=202)
+async def start_profile(mode: str = "sample", seconds: float = 10, room: str = None,
+                        interval_ms: float = DEFAULT_INTERVAL * 1000, memory: bool = False):
+    try:
+        capture = profiler.start(mode, seconds, room=room, interval=interval_ms / 1000, memory=memory)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return capture.status()
+
+@fastapi_app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_status():
+    return {
+        "current": profiler.current.status() if profiler.current else None,
+        "last": profiler.last.status() if profiler.last else None,
+    }
+
+@fastapi_app.delete("/admin/profile", dependencies=[Depends(require_admin)])
+async def cancel_profile():
+    profiler.stop()
+    return {"cancelled": profiler.current is not None}
+
+@fastapi_app.get("/admin/profile/files/{name}", dependencies=[Depends(require_admin)])
+async def profile_file(name: str):
+    path = profiler.file(name)
+    if path is None:
+        raise HTTPException(status_code=404)
+    return FileResponse(path, filename=name)
+
+@fastapi_app.get("/metrics")
+async def get_metrics():
+    # Prometheus scrape endpoint. Empty unless CATAN_METRICS=1.
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+async def push_state(room):
+    """Send the current version to every audience. Each frame is encoded once."""
+    views = room.views
+    with metrics.timer("catan_emit_seconds", event="game_state"):
+        table = room_members(sio, room.table)
+        if table:
+            await send_frame(sio, views.full_frame(), table, key="game_state")
+
+        players = room_members(sio, room.players)
+        if players:
+            await send_frame(sio, views.public_frame(), players, key="game_state")
+            for color, sids in room.seats.items():
+                private = views.private_frame(color)
+                for sid in sids:
+                    await send_frame_to(sio, private, sid, key="private_state")
+    metrics.count("catan_emit_total", len(table) + len(players), event="game_state")
+    await room.spectators.publish(views)
+
+async def broadcast(room, changed=True):
+    """Send the new state (if it changed) and any log entries produced by the action."""
+    if changed:
+        schedule_timeouts(room)
+        await push_state(room)
+    entries = room.game.drain_logs()
+    if entries:
+        # Through the client queues too, so slow clients can't pile up logs forever
+        frame, _ = encode_event('game_log', [e.model_dump(mode="json") for e in entries])
+        await send_frame(sio, frame, room_members(sio, room.all))
+    if changed and room.game.state.phase == "GAME_OVER" and room.archive_id is None:
+        await archive_game(room)
+        await next_game(room)
+
+async def archive_game(room):
+    room.archive_id = -1  # claimed, so a second broadcast doesn't archive it again
+    try:
+        room.archive_id = await asyncio.to_thread(archive.append, game_record(room.game, room.id))
+    except OSError:
+        logger.exception("could not archive the game in room %s", room.id)
+
+async def next_game(room):
+    """A finished game refuses every action, so the room moves on to a new
+    one (the final state and the winner's log line have already gone out)."""
+    rooms.next_game(room)
+    logger.info("new game in room %s", room.id)
+    await send_frame(sio, room.board_view.frame(), room_members(sio, room.all), key="board_state")
+    # Queued behind the old game's last log entries, so clients reset after them
+    frame, _ = encode_event('log_history', [e.model_dump(mode="json") for e in room.game.logs])
+    await send_frame(sio, frame, room_members(sio, room.all))
+    schedule_timeouts(room)
+    await push_state(room)
+
+def schedule_timeouts(room):
+    """(Re)start the room's clocks; called after every state change."""
+    if room.game.state.phase == "GAME_OVER":
+        cancel_timeouts(room)
+        return
+    if TURN_TIMEOUT > 0:
+        timers.arm((room.id, "turn"), TURN_TIMEOUT, functools.partial(on_turn_timeout, room))
+    if TRADE_TIMEOUT > 0:
+        key = (room.id, "trade")
+        if room.game.state.active_trade is None:
+            timers.cancel(key)
+        elif key not in timers:
+            timers.arm(key, TRADE_TIMEOUT, functools.partial(on_trade_timeout, room))
+
+def cancel_timeouts(room):
+    timers.cancel((room.id, "turn"))
+    timers.cancel((room.id, "trade"))
+
+def sweep_rooms():
+    """Drop idle rooms, then check again in half the timeout."""
+    for room in rooms.evict_idle(ROOM_IDLE_TIMEOUT):
+        cancel_timeouts(room)
+        logger.info("evicted idle room %s", room.id)
+    timers.arm("room-sweep", ROOM_IDLE_TIMEOUT / 2, sweep_rooms)
+
+def room_is_live(room):
+    # Rooms handed to another worker or left empty don't play themselves
+    return rooms.get(room.id) is room and bool(room.members)
+
+async def on_turn_timeout(room):
+    if room_is_live(room):
+        metrics.count("catan_timeouts_total", kind="turn")
+        await broadcast(room, room.game.default_action())
+
+async def on_trade_timeout(room):
+    if room_is_live(room):
+        metrics.count("catan_timeouts_total", kind="trade")
+        await broadcast(room, room.game.expire_trade_offer())
+
+def requested_role(environ, auth):
+    """Returns (room, role, color, token) from the socket.io auth payload or the query string.
+
+    io(url, { auth: { room: 'abc', role: 'player', color: 'red' } })
+    or ?room=abc&role=player&color=red
+    """
+    if isinstance(auth, dict) and auth.get("role"):
+        return auth.get("room") or DEFAULT_ROOM, auth["role"], auth.get("color"), auth.get("token")
+    query = parse_qs(environ.get("QUERY_STRING", ""))
+    return (
+        query.get("room", [DEFAULT_ROOM])[0],
+        query.get("role", ["spectator"])[0],
+        query.get("color", [None])[0],
+        query.get("token", [None])[0],
+    )
+
+def may_see_table(room, token) -> bool:
+    """Every hand is visible at the table: hot-seat rooms, or admins."""
+    if room.hotseat:
+        return True
+    return bool(ADMIN_TOKEN) and isinstance(token, str) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+def players_only(handler):
+    """Ignore game actions sent by spectators (or sids without a room), and
+    actions over the connection's rate limit for that event."""
+    event = handler.__name__
+    @functools.wraps(handler)
+    async def wrapper(sid, *args):
+        room = rooms.room_of(sid)
+        if room is None or room.spectators.is_spectator(sid):
+            return
+        if not limiter.allow(sid, event):
+            logger.debug("rate limited %s %s", sid, event)
+            return
+        return await handler(sid, *args)
+    return wrapper
 
 @sio.event
-async def connect(sid, environ):
-    print("connect ", sid)
+@timed("catan_socket_handler_seconds", event="connect")
+async def connect(sid, environ, auth=None):
+    room_id, role, color, token = requested_role(environ, auth)
+    if cluster is not None and not cluster.owns(room_id):
+        # Wrong worker: tell the client where the room lives
+        raise socketio.exceptions.ConnectionRefusedError("room is hosted elsewhere", {"redirect": cluster.url_for(room_id)})
+
+    room = rooms.get_or_create(room_id, client=environ.get("REMOTE_ADDR"))
+    if room is None:
+        raise socketio.exceptions.ConnectionRefusedError("too many rooms opened from this address")
+    game_manager = room.game
+    if role == "player" and color not in game_manager.state.players:
+        raise socketio.exceptions.ConnectionRefusedError(f"unknown seat: {color}")
+    requested = role
+    if role not in ("player", "table") or (role == "table" and not may_see_table(room, token)):
+        role = "spectator"  # hands stay hidden unless the table is allowed
+    logger.info("connect %s (%s %s %s)", sid, room_id, role, color or "")
+
     # Send State
-    from .game_logic import game_manager
-    await sio.emit('board_state', game_manager.board.model_dump(), to=sid)
-    await sio.emit('game_state', game_manager.state.model_dump(), to=sid)
+    views = room.views
+    rooms.join(sid, room, color if role == "player" else None)
+    if (room.id, "turn") not in timers:
+        schedule_timeouts(room)  # first client in: start the clock
+    await sio.enter_room(sid, room.all)
+    # The role actually granted, so a demoted client can say why it sees no hands
+    await sio.emit('role', {"role": role, "requested": requested, "color": color if role == "player" else None}, to=sid)
+    await send_frame_to(sio, room.board_view.frame(), sid, key="board_state")
+    if role == "spectator":
+        await room.spectators.add(sid, views)
+    elif role == "player":
+        await sio.enter_room(sid, room.players)
+        await send_frame_to(sio, views.public_frame(), sid, key="game_state")
+        await send_frame_to(sio, views.private_frame(color), sid, key="private_state")
+    else:
+        await sio.enter_room(sid, room.table)
+        await send_frame_to(sio, views.full_frame(), sid, key="game_state")
+    # Full log backlog once; afterwards clients receive only new entries
+    await sio.emit('log_history', [e.model_dump() for e in game_manager.logs], to=sid)
 
 @sio.event
+@timed("catan_socket_handler_seconds", event="build_settlement")
+@players_only
 async def build_settlement(sid, data):
-    from .game_logic import game_manager
+    room = rooms.room_of(sid)
+    game_manager = room.game
     # data: { q, r, corner }
     success = game_manager.build_settlement(data['q'], data['r'], data['corner'])
-    if success:
-        await sio.emit('game_state', game_manager.state.model_dump())
+    await broadcast(room, success)
 
 @sio.event
+@timed("catan_socket_handler_seconds", event="build_road")
+@players_only
 async def build_road(sid, data):
-    from .game_logic import game_manager
+    room = rooms.room_of(sid)
+    game_manager = room.game
     # data: { q, r, edge }
     success = game_manager.build_road(data['q'], data['r'], data['edge'])
-    if success:
-        await sio.emit('game_state', game_manager.state.model_dump())
+    await broadcast(room, success)
 
 @sio.event
+@timed("catan_socket_handler_seconds", event="build_city")
+@players_only
 async def build_city(sid, data):
-    from .game_logic import game_manager
+    room = rooms.room_of(sid)
+    game_manager = room.game
     # Expects {'q': q, 'r': r, 'corner': c}
     success = game_manager.build_city(data['q'], data['r'], data['corner'])
-    if success:
-        await sio.emit('game_state', game_manager.state.model_dump())
+    await broadcast(room, success)
 
 @sio.event
+@timed("catan_socket_handler_seconds", event="roll_dice")
+@players_only
 async def roll_dice(sid):
-    from .game_logic import game_manager
+    room = rooms.room_of(sid)
+    game_manager = room.game
     # Check if it is the current player's turn? (Skipping strict validation for MVP speed, but should exist)
     total = game_manager.roll_dice()
-    print(f"Rolled {total}")
-    await sio.emit('game_state', game_manager.state.model_dump())
+    logger.debug("Rolled %s", total)
+    await broadcast(room)
 
 @sio.event
+@timed("catan_socket_handler_seconds", event="end_turn")
+@players_only
 async def end_turn(sid):
-    from .game_logic import game_manager
+    room = rooms.room_of(sid)
+    game_manager = room.game
     game_manager.end_turn()
-    await sio.emit('game_state', game_manager.state.model_dump())
+    await broadcast(room)
+
+@sio.event
+@timed("catan_socket_handler_seconds", event="apply_actions")
+@players_only
+async def apply_actions(sid, data):
+    room = rooms.room_of(sid)
+    game_manager = room.game
+    # data: { actions: [{ type: 'build_settlement', q, r, corner }, { type: 'build_road', q, r, edge }, ...] }
+    actions = data.get('actions') if isinstance(data, dict) else None
+    ok, results = game_manager.apply_actions(actions if isinstance(actions, list) else [])
+    # One state push for the whole batch (nothing changed if it was rolled back)
+    await broadcast(room, ok)
+    # Acknowledgement for emitWithAck / call(): which action failed, if any
+    return {"ok": ok, "results": results}
+
+@sio.event
+@timed("catan_socket_handler_seconds", event="forecast")
+async def forecast(sid, data=None):
+    # data: { color?, turns? } -> ack with income per roll/turn and P(afford road/settlement/city) per turn.
+    # Forecasts depend on the hand, so players only get their own and spectators none.
+    room = rooms.room_of(sid)
+    if room is None or room.spectators.is_spectator(sid):
+        return {"error": "not available to spectators"}
+    if not limiter.allow(sid, "forecast"):
+        return {"error": "rate limited"}
+    data = data if isinstance(data, dict) else {}
+    state = room.game.state
+    seat = rooms.seat_of.get(sid)
+    color = data.get("color") or seat or state.players[state.current_turn_index].value
+    if seat is not None and color != seat:
+        return {"error": "players can only forecast their own hand"}
+    if color not in state.players:
+        return {"error": f"unknown color: {color}"}
+    try:
+        turns = min(max(1, int(data.get("turns", DEFAULT_TURNS))), MAX_TURNS)
+    except (TypeError, ValueError):
+        turns = DEFAULT_TURNS
+    return room.forecaster.forecast(color, turns)
+
+@sio.event
+@timed("catan_socket_handler_seconds", event="state_hash")
+async def state_hash(sid):
+    # Cheap desync check: ack with the version and the position hash the
+    # client's last game_state should carry (no hands unless it's the table)
+    room = rooms.room_of(sid)
+    if room is None:
+        return {"error": "not in a room"}
+    if not limiter.allow(sid, "state_hash"):
+        return {"error": "rate limited"}
+    game_manager = room.game
+    table = not room.spectators.is_spectator(sid) and rooms.seat_of.get(sid) is None
+    value = game_manager.zobrist if table else game_manager.public_zobrist
+    return {"version": game_manager.version, "hash": f"{value:016x}"}
 
 @sio.event
+@timed("catan_socket_handler_seconds", event="test_resources")
+@players_only
 async def test_resources(sid):
-    from .game_logic import game_manager
+    room = rooms.room_of(sid)
+    game_manager = room.game
     game_manager.cheat_resources()
-    await sio.emit('game_state', game_manager.state.model_dump())
+    await broadcast(room)
 
 @sio.event
+@timed("catan_socket_handler_seconds", event="disconnect")
 async def disconnect(sid):
-    print("disconnect ", sid)
+    logger.info("disconnect %s", sid)
+    limiter.forget(sid)
+    eio_sid = sio.manager.eio_sid_from_sid(sid, "/")
+    if eio_sid is not None:
+        client_queues(sio).forget(eio_sid)
+    room = rooms.leave(sid)
+    if room is not None:
+        await room.spectators.remove(sid)
+        if not room.members:
+            cancel_timeouts(room)
@@ -0,0 +1,203 @@
+import os
+import time
+import asyncio
+import functools
+import contextlib
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+# Metrics are opt-in. When CATAN_METRICS is not set the decorators below return
+# the original function untouched, so the hot path pays nothing at all.
+ENABLED = os.environ.get("CATAN_METRICS", "0").lower() not in ("", "0", "false", "no")
+
+# Latency buckets in seconds: 1us .. ~16s, doubling each step.
+# Fixed buckets keep `observe` to a bisect + two adds, no sorting or sample lists.
+BUCKETS = [1e-6 * (2 ** i) for i in range(25)]
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside the matching bucket."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * ((rank - seen) / c)
+            seen += c
+        return BUCKETS[-1]
+
+
+class Registry:
+    def __init__(self):
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.help: Dict[str, str] = {}
+
+    def histogram(self, family: str, labels: LabelKey) -> Histogram:
+        series = self.histograms.setdefault(family, {})
+        h = series.get(labels)
+        if h is None:
+            h = series[labels] = Histogram()
+        return h
+
+    def inc(self, family: str, labels: LabelKey, amount: float = 1):
+        series = self.counters.setdefault(family, {})
+        series[labels] = series.get(labels, 0) + amount
+
+    def describe(self, family: str, text: str):
+        self.help[family] = text
+
+    def reset(self):
+        self.histograms.clear()
+        self.counters.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for family, series in sorted(self.counters.items()):
+            if family in self.help:
+                lines.append(f"# HELP {family} {self.help[family]}")
+            lines.append(f"# TYPE {family} counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{family}{_fmt_labels(labels)} {_fmt_value(value)}")
+
+        for family, series in sorted(self.histograms.items()):
+            if family in self.help:
+                lines.append(f"# HELP {family} {self.help[family]}")
+            lines.append(f"# TYPE {family} histogram")
+            for labels, h in sorted(series.items()):
+                cumulative = 0
+                for bound, c in zip(BUCKETS, h.counts):
+                    cumulative += c
+                    lines.append(f"{family}_bucket{_fmt_labels(labels + (('le', _fmt_value(bound)),))} {cumulative}")
+                lines.append(f"{family}_bucket{_fmt_labels(labels + (('le', '+Inf'),))} {h.count}")
+                lines.append(f"{family}_sum{_fmt_labels(labels)} {_fmt_value(h.total)}")
+                lines.append(f"{family}_count{_fmt_labels(labels)} {h.count}")
+
+            # Pre-computed percentiles so dashboards don't need histogram_quantile()
+            quantile_family = f"{family}_quantile"
+            lines.append(f"# TYPE {quantile_family} gauge")
+            for labels, h in sorted(series.items()):
+                for q in QUANTILES:
+                    lines.append(f"{quantile_family}{_fmt_labels(labels + (('quantile', str(q)),))} {_fmt_value(h.quantile(q))}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _fmt_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + inner + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+# Global registry used by the game server
+registry = Registry()
+registry.describe("catan_game_action_seconds", "Time spent inside GameManager actions.")
+registry.describe("catan_socket_handler_seconds", "Time spent inside Socket.IO event handlers.")
+registry.describe("catan_serialize_seconds", "Time spent serializing state for emits.")
+registry.describe("catan_emit_seconds", "Time spent handing payloads to Socket.IO.")
+registry.describe("catan_emit_total", "Number of payloads emitted.")
+registry.describe("catan_emit_bytes_total", "Serialized bytes emitted (before transport framing).")
+registry.describe("catan_rate_limited_total", "Client events rejected by the per-connection rate limiter.")
+registry.describe("catan_frames_coalesced_total", "State frames replaced by a newer one before a slow client received them.")
+registry.describe("catan_frames_dropped_total", "Frames dropped because a slow client's queue was full.")
+registry.describe("catan_game_pool_total", "Games taken from the pre-built pool (result=hit) or built inline (result=miss).")
+registry.describe("catan_timeouts_total", "Turn / trade timers that expired and triggered a default action.")
+
+
+def timed(family: str, **labels):
+    """Decorator recording the wall time of every call into a histogram.
+
+    Works for both plain and async functions. Returns `fn` unchanged when
+    metrics are disabled.
+    """
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        hist = registry.histogram(family, _label_key(labels))
+        clock = time.perf_counter
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = clock()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    hist.observe(clock() - start)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe(clock() - start)
+        return wrapper
+
+    return decorator
+
+
+class _Timer:
+    __slots__ = ("hist", "start")
+
+    def __init__(self, hist: Histogram):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start)
+        return False
+
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+def timer(family: str, **labels):
+    """Context manager version of `timed` for timing a block of code."""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(registry.histogram(family, _label_key(labels)))
+
+
+def count(family: str, amount: float = 1, **labels):
+    if ENABLED:
+        registry.inc(family, _label_key(labels), amount)
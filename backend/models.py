@@ -15,6 +15,9 @@ class PlayerColor(str, Enum):
     BLUE = "blue"
     ORANGE = "orange"
     WHITE = "white"
+    # 5-6 player extension
+    GREEN = "green"
+    BROWN = "brown"
 
 class Hex(BaseModel):
     id: int
@@ -53,6 +56,7 @@ class Road(BaseModel):
 
 class Board(BaseModel):
     hexes: List[Hex]
+    radius: int = 2
 
 class GameLog(BaseModel):
     message: str
@@ -69,7 +73,7 @@ class TradeOffer(BaseModel):
 class GameState(BaseModel):
     players: List[PlayerColor]
     current_turn_index: int = 0
-    phase: str = "INITIAL_PLACEMENT_1" # INITIAL_PLACEMENT_1, INITIAL_PLACEMENT_2, GAME_LOOP
+    phase: str = "INITIAL_PLACEMENT_1" # INITIAL_PLACEMENT_1, INITIAL_PLACEMENT_2, GAME_LOOP, GAME_OVER
     buildings: List[Building] = []
     roads: List[Road] = []
     
@@ -77,7 +81,7 @@ class GameState(BaseModel):
     inventories: Dict[PlayerColor, Dict[ResourceType, int]] = {}
     last_dice_result: Optional[int] = None
     turn_sub_phase: Optional[str] = None # ROLL_DICE, BUILD_TRADE
-    logs: List[GameLog] = [] # New logs field
+    # Logs are kept by GameManager and sent incrementally ('game_log' event)
     
     # Trading
     active_trade: Optional[TradeOffer] = None
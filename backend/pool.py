@@ -0,0 +1,112 @@
+"""Ready-to-play games built ahead of demand.
+
+Building a game (generate_board, the GameState model with its inventories,
+lookup indexes) and what a room serves from it (the encoded board, the
+forecaster's tables) is the slow part of creating a room. GamePool keeps a
+deque of whatever `factory` builds (rooms.prepare_game in the server) that a
+background thread tops up, so `take()` is a popleft. When the pool runs dry a game is built inline, so `take()` never
+waits on the thread.
+
+The target size follows demand: the thread keeps an exponentially weighted
+take rate and holds `lead` seconds of it (between min_size and max_size).
+A quiet server holds min_size games; a burst of room creation grows the
+pool within a refill interval, and once demand falls off the surplus is
+dropped.
+"""
+import math
+import time
+import threading
+from collections import deque
+from typing import Callable
+
+from . import metrics
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+class GamePool:
+    def __init__(self, factory: Callable, min_size: int = 2, max_size: int = 256, lead: float = 2.0,
+                 interval: float = 0.5, smoothing: float = 0.3):
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.lead = lead  # seconds of demand to keep ready
+        self.interval = interval
+        self.smoothing = smoothing
+        self.ready = deque()
+        self.rate = 0.0  # games taken per second (EWMA)
+        self.target = min_size
+        self.taken = 0
+        self.misses = 0
+        self._counted = 0
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def take(self):
+        """A fresh game, from the pool if one is ready."""
+        self.taken += 1
+        try:
+            game = self.ready.popleft()
+        except IndexError:
+            game = None
+        if len(self.ready) < self.target // 2:
+            self._wake.set()  # running low, don't wait for the next interval
+        if game is None:
+            self.misses += 1
+            metrics.count("catan_game_pool_total", result="miss")
+            return self.factory()
+        metrics.count("catan_game_pool_total", result="hit")
+        return game
+
+    def __len__(self):
+        return len(self.ready)
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="game-pool", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping = True
+            self._wake.set()
+            thread.join()
+
+    def _update_target(self, elapsed: float):
+        taken, self._counted = self.taken - self._counted, self.taken
+        if elapsed > 0:
+            self.rate += self.smoothing * (taken / elapsed - self.rate)
+        self.target = max(self.min_size, min(self.max_size, math.ceil(self.rate * self.lead)))
+
+    def fill(self):
+        """Build games until the pool reaches its target (or stop() is called)."""
+        while len(self.ready) < self.target and not self._stopping:
+            self.ready.append(self.factory())
+
+    def trim(self):
+        # Demand fell off; don't hold a burst's worth of games forever
+        while len(self.ready) > 2 * self.target:
+            try:
+                self.ready.pop()
+            except IndexError:
+                break
+
+    def _run(self):
+        last = time.monotonic()
+        while not self._stopping:
+            self._wake.clear()
+            now = time.monotonic()
+            # Early wake-ups only refill; the rate is measured over whole intervals
+            if now - last >= self.interval:
+                self._update_target(now - last)
+                self.trim()
+                last = now
+            try:
+                self.fill()
+            except Exception:
+                logger.exception("game pool refill failed")
+            self._wake.wait(self.interval)
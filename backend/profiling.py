@@ -0,0 +1,306 @@
+"""On-demand profiling of the live server, for admins.
+
+Nothing here is hooked in until a capture starts, so there is no cost while
+idle. A capture runs for a bounded window and writes its results to
+CATAN_PROFILE_DIR:
+
+- mode "sample" (default): the event loop thread's stack is sampled every
+  `interval` seconds of CPU time (SIGPROF; see make_sampler for the
+  fallback). Stacks are cut at the Socket.IO handler they run
+  under (build_road, roll_dice, ...) and written as collapsed stacks
+  (`<id>.folded`, one "handler;frame;frame count" per line), ready for
+  flamegraph.pl or speedscope. With `room` set, only handler calls from that
+  room's clients are kept.
+- mode "cprofile": deterministic profiling of the event loop thread with
+  cProfile, dumped as `<id>.pstats` (snakeviz, pstats). Per-handler totals
+  come from the handler functions' entries. Every call pays for this, so
+  keep the window short; `room` is ignored.
+- memory=True: tracemalloc snapshots at the start and end of the window.
+  The top growth by line goes to `<id>.memory.txt` and the end snapshot to
+  `<id>.tracemalloc` for offline digging.
+
+Handlers are recognised by their code objects (found by unwrapping the
+functions registered with Socket.IO), so the handlers themselves carry no
+profiling code.
+"""
+import os
+import sys
+import time
+import asyncio
+import signal
+import inspect
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+MODES = ("sample", "cprofile")
+MAX_SECONDS = 300
+DEFAULT_INTERVAL = 0.001
+MEMORY_TOP = 50
+
+
+def frame_label(code) -> str:
+    # Parent directory too, so backend/main.py and pydantic/main.py differ
+    path = code.co_filename
+    short = os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+    return f"{short}:{code.co_qualname}"
+
+
+class StackFolder:
+    """Folds sampled stacks into "handler;frame;frame" -> count."""
+
+    def __init__(self, handler_codes: Dict, room_of: Callable, room=None):
+        self.handler_codes = handler_codes  # code object -> event name
+        self.room_of = room_of
+        self.room = room
+        self.stacks = Counter()
+        self.samples = 0
+
+    def sample(self, frame):
+        labels = []
+        handler = None
+        while frame is not None:
+            event = self.handler_codes.get(frame.f_code)
+            if event is not None:
+                handler = (event, frame.f_locals.get("sid"))
+                break
+            labels.append(frame_label(frame.f_code))
+            frame = frame.f_back
+        self.samples += 1
+        if handler is not None:
+            event, sid = handler
+            if self.room is not None and self.room_of(sid) != self.room:
+                return
+            labels.append(event)
+        elif self.room is not None:
+            return
+        elif labels and "/selectors.py:" in labels[0]:
+            labels = ["(idle)"]
+        else:
+            labels.append("(other)")
+        self.stacks[";".join(reversed(labels))] += 1
+
+
+class SignalSampler(StackFolder):
+    """SIGPROF every `interval` seconds of CPU time; the handler runs on the
+    main thread and samples its own stack, so it has to be the loop thread.
+    Idle time (waiting in select) isn't CPU time and mostly isn't sampled."""
+
+    def __init__(self, interval: float, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interval = interval
+        self._previous = None
+
+    def _handler(self, _signum, frame):
+        self.sample(frame)
+
+    def start(self):
+        self._previous = signal.signal(signal.SIGPROF, self._handler)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous or signal.SIG_DFL)
+
+
+class ThreadSampler(StackFolder):
+    """Fallback when the loop isn't on the main thread (or there's no SIGPROF):
+    a thread reads the loop thread's stack. It can only look while the loop
+    thread has released the GIL, so this overcounts (idle) heavily."""
+
+    def __init__(self, thread_id: int, interval: float, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.thread_id = thread_id
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.sample(frame)
+            del frame
+
+
+def make_sampler(interval: float, handler_codes: Dict, room_of: Callable, room=None) -> StackFolder:
+    """Sampler for the calling (event loop) thread."""
+    if hasattr(signal, "SIGPROF") and threading.current_thread() is threading.main_thread():
+        return SignalSampler(interval, handler_codes, room_of, room)
+    return ThreadSampler(threading.get_ident(), interval, handler_codes, room_of, room)
+
+
+class Capture:
+    def __init__(self, capture_id: str, mode: str, seconds: float, room=None, interval=DEFAULT_INTERVAL,
+                 memory=False):
+        self.id = capture_id
+        self.mode = mode
+        self.seconds = seconds
+        self.room = room
+        self.interval = interval
+        self.memory = memory
+        self.started = time.time()
+        self.result: Optional[Dict] = None
+
+    def status(self) -> Dict:
+        status = {
+            "id": self.id,
+            "mode": self.mode,
+            "seconds": self.seconds,
+            "room": self.room,
+            "memory": self.memory,
+            "started": self.started,
+        }
+        if self.result is None:
+            status["running"] = True
+        else:
+            status.update(self.result)
+        return status
+
+
+class Profiler:
+    """At most one capture at a time; `start` is called on the event loop."""
+
+    def __init__(self, out_dir: str, handlers: Callable[[], Dict[str, Callable]], room_of: Callable):
+        self.out_dir = out_dir
+        self.handlers = handlers  # -> {event: registered handler}
+        self.room_of = room_of  # sid -> room id
+        self.current: Optional[Capture] = None
+        self.last: Optional[Capture] = None
+        self.count = 0
+        self._task = None
+
+    def handler_codes(self) -> Dict:
+        codes = {}
+        for event, fn in self.handlers().items():
+            fn = inspect.unwrap(fn)
+            if hasattr(fn, "__code__"):
+                codes[fn.__code__] = event
+        return codes
+
+    def start(self, mode="sample", seconds=10.0, room=None, interval=DEFAULT_INTERVAL, memory=False) -> Capture:
+        if self.current is not None:
+            raise RuntimeError("a capture is already running")
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if not 0 < seconds <= MAX_SECONDS:
+            raise ValueError(f"seconds must be in (0, {MAX_SECONDS}]")
+        self.count += 1
+        capture = Capture(f"{time.strftime('%Y%m%d-%H%M%S')}-{self.count}", mode, seconds, room, max(interval, 0.0001), memory)
+        self.current = capture
+        self._task = asyncio.get_running_loop().create_task(self._run(capture))
+        return capture
+
+    def _path(self, capture, suffix):
+        return os.path.join(self.out_dir, capture.id + suffix)
+
+    async def _run(self, capture: Capture):
+        sampler = profile = None
+        started_tracing = False
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            if capture.memory:
+                started_tracing = not tracemalloc.is_tracing()
+                if started_tracing:
+                    tracemalloc.start(25)
+                before = tracemalloc.take_snapshot()
+            if capture.mode == "sample":
+                sampler = make_sampler(capture.interval, self.handler_codes(), self.room_of, capture.room)
+                sampler.start()
+            else:
+                # Enabled from the loop thread, so it profiles the loop thread
+                profile = cProfile.Profile()
+                profile.enable()
+
+            await asyncio.sleep(capture.seconds)
+
+            result = {"files": []}
+            if profile is not None:
+                profile.disable()
+                result.update(self._write_pstats(capture, profile))
+                profile = None
+            if sampler is not None:
+                sampler.stop()
+                result.update(self._write_folded(capture, sampler))
+                sampler = None
+            if capture.memory:
+                after = tracemalloc.take_snapshot()
+                result["files"] += self._write_memory(capture, before, after)
+            capture.result = result
+        except Exception as exc:
+            logger.exception("profile capture %s failed", capture.id)
+            capture.result = {"error": str(exc)}
+        finally:
+            # Cancelled or failed: leave nothing running
+            if profile is not None:
+                profile.disable()
+            if sampler is not None:
+                sampler.stop()
+            if started_tracing:
+                tracemalloc.stop()
+            if capture.result is None:
+                capture.result = {"error": "cancelled"}
+            self.current = None
+            self.last = capture
+
+    def _write_folded(self, capture, sampler: StackFolder) -> Dict:
+        path = self._path(capture, ".folded")
+        with open(path, "w") as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        handlers = Counter()
+        for stack, count in sampler.stacks.items():
+            handlers[stack.split(";", 1)[0]] += count
+        return {
+            "samples": sampler.samples,
+            "handlers": dict(handlers.most_common()),
+            "files": [os.path.basename(path)],
+        }
+
+    def _write_pstats(self, capture, profile) -> Dict:
+        path = self._path(capture, ".pstats")
+        profile.dump_stats(path)
+        stats = pstats.Stats(profile).stats
+        codes = self.handler_codes()
+        handlers = {}
+        for (filename, line, name), (_cc, calls, _tt, cumtime, _callers) in stats.items():
+            for code, event in codes.items():
+                if code.co_filename == filename and code.co_firstlineno == line and code.co_name == name:
+                    handlers[event] = {"calls": calls, "seconds": cumtime}
+        return {"handlers": handlers, "files": [os.path.basename(path)]}
+
+    def _write_memory(self, capture, before, after):
+        path = self._path(capture, ".memory.txt")
+        with open(path, "w") as f:
+            f.write(f"top {MEMORY_TOP} allocation changes by line over {capture.seconds}s\n")
+            for stat in after.compare_to(before, "lineno")[:MEMORY_TOP]:
+                f.write(f"{stat}\n")
+        dump = self._path(capture, ".tracemalloc")
+        after.dump(dump)
+        return [os.path.basename(path), os.path.basename(dump)]
+
+    def stop(self):
+        """Cancel a running capture (results so far are discarded)."""
+        if self._task is not None:
+            self._task.cancel()
+
+    def file(self, name: str) -> Optional[str]:
+        """Path of a capture output, refusing anything outside out_dir."""
+        if os.path.basename(name) != name or name.startswith("."):
+            return None
+        path = os.path.join(self.out_dir, name)
+        return path if os.path.isfile(path) else None
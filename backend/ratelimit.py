@@ -0,0 +1,77 @@
+import os
+import time
+from typing import Dict, Tuple
+
+from . import metrics
+
+# event -> (tokens per second, burst). Anything that triggers a state
+# broadcast costs every client in the room, so the cheap-to-spam ones are tight.
+EVENT_LIMITS: Dict[str, Tuple[float, float]] = {
+    "test_resources": (0.5, 2),
+    "roll_dice": (2, 3),
+    "end_turn": (2, 3),
+    "apply_actions": (5, 10),
+    "state_hash": (2, 5),
+}
+DEFAULT_LIMIT = (10, 20)
+# All events of one connection together
+TOTAL_LIMIT = (20, 40)
+
+ENABLED = os.environ.get("CATAN_RATE_LIMIT", "1").lower() not in ("", "0", "false", "no")
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+
+    def refill(self, now: float):
+        # Lazily, for the time since the last call; no background timer
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+
+class RateLimiter:
+    """Token buckets per connection and event, plus one per connection overall.
+
+    Buckets are created on first use and dropped with `forget(sid)`, so the
+    cost is two dict lookups and a bit of arithmetic per event.
+    """
+
+    def __init__(self, limits=None, default=DEFAULT_LIMIT, total=TOTAL_LIMIT, clock=time.monotonic):
+        self.enabled = ENABLED
+        self.limits = EVENT_LIMITS if limits is None else limits
+        self.default = default
+        self.total = total
+        self.clock = clock
+        self.buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self.rejected = 0
+
+    def allow(self, sid, event: str) -> bool:
+        if not self.enabled:
+            return True
+        now = self.clock()
+        mine = self.buckets.get(sid)
+        if mine is None:
+            mine = self.buckets[sid] = {"*": TokenBucket(*self.total, now)}
+        bucket = mine.get(event)
+        if bucket is None:
+            bucket = mine[event] = TokenBucket(*self.limits.get(event, self.default), now)
+        total = mine["*"]
+        # Charge neither unless both have a token, so a rejected event costs nothing
+        bucket.refill(now)
+        total.refill(now)
+        if bucket.tokens >= 1 and total.tokens >= 1:
+            bucket.tokens -= 1
+            total.tokens -= 1
+            return True
+        self.rejected += 1
+        metrics.count("catan_rate_limited_total", event=event)
+        return False
+
+    def forget(self, sid):
+        self.buckets.pop(sid, None)
@@ -0,0 +1,120 @@
+"""Incremental multiplayer ratings for bot tournaments.
+
+Both systems take one finished game at a time as a list of (player, rank)
+per seat (0 = best, equal ranks are ties) and update in O(seats^2), so
+standings are current while results stream in. A player may hold several
+seats (e.g. two bot versions filling four seats); seats of the same player
+are not compared with each other and their updates add up.
+
+- Elo: every game is scored as all pairwise results between its players.
+- WengLin: Bayesian (mu, sigma) ratings in the style of TrueSkill, using
+  the closed-form Bradley-Terry "full pair" update from Weng & Lin (2011),
+  the same one OpenSkill uses. `conservative` (mu - 3 sigma) is what the
+  leaderboard sorts by, so players with few games don't jump to the top.
+"""
+import math
+from typing import Dict, Hashable, List, Tuple
+
+Result = List[Tuple[Hashable, int]]
+
+
+def pair_score(rank_a, rank_b) -> float:
+    """1 if a finished ahead of b, 0.5 for a tie, 0 otherwise."""
+    if rank_a < rank_b:
+        return 1.0
+    return 0.5 if rank_a == rank_b else 0.0
+
+
+class Elo:
+    def __init__(self, k: float = 16.0, initial: float = 1500.0):
+        self.k = k
+        self.initial = initial
+        self.ratings: Dict[Hashable, float] = {}
+        self.games: Dict[Hashable, int] = {}
+
+    def rating(self, player) -> float:
+        return self.ratings.get(player, self.initial)
+
+    def update(self, result: Result):
+        if len(result) < 2:
+            return
+        # K is split over the opponents so a 6-seat game doesn't move ratings 5x as much
+        k = self.k / (len(result) - 1)
+        before = {p: self.rating(p) for p, _ in result}
+        deltas = dict.fromkeys(before, 0.0)
+        for a, rank_a in result:
+            for b, rank_b in result:
+                if a == b:
+                    continue
+                expected = 1.0 / (1.0 + 10 ** ((before[b] - before[a]) / 400))
+                deltas[a] += pair_score(rank_a, rank_b) - expected
+        for p, delta in deltas.items():
+            self.ratings[p] = before[p] + k * delta
+            self.games[p] = self.games.get(p, 0) + 1
+
+
+class WengLin:
+    def __init__(self, mu: float = 25.0, sigma: float = 25.0 / 3, beta: float = 25.0 / 6, kappa: float = 1e-4):
+        self.mu0 = mu
+        self.sigma0 = sigma
+        self.beta_sq = beta * beta
+        self.kappa = kappa
+        self.ratings: Dict[Hashable, tuple] = {}  # player -> (mu, sigma)
+        self.games: Dict[Hashable, int] = {}
+
+    def rating(self, player):
+        return self.ratings.get(player, (self.mu0, self.sigma0))
+
+    def conservative(self, player) -> float:
+        mu, sigma = self.rating(player)
+        return mu - 3 * sigma
+
+    def update(self, result: Result):
+        if len(result) < 2:
+            return
+        before = {p: self.rating(p) for p, _ in result}
+        omegas = dict.fromkeys(before, 0.0)
+        deltas = dict.fromkeys(before, 0.0)
+        for a, rank_a in result:
+            mu_a, sigma_a = before[a]
+            var_a = sigma_a * sigma_a
+            for b, rank_b in result:
+                if a == b:
+                    continue
+                mu_b, sigma_b = before[b]
+                c = math.sqrt(var_a + sigma_b * sigma_b + 2 * self.beta_sq)
+                p = 1.0 / (1.0 + math.exp((mu_b - mu_a) / c))
+                omegas[a] += var_a / c * (pair_score(rank_a, rank_b) - p)
+                deltas[a] += (sigma_a / c) * var_a / (c * c) * p * (1 - p)
+        for p, (mu, sigma) in before.items():
+            self.ratings[p] = (mu + omegas[p], sigma * math.sqrt(max(1 - deltas[p], self.kappa)))
+            self.games[p] = self.games.get(p, 0) + 1
+
+
+class Ratings:
+    """Elo and WengLin side by side, fed the same results."""
+
+    def __init__(self):
+        self.elo = Elo()
+        self.wl = WengLin()
+        self.games = 0
+
+    def update(self, result: Result):
+        self.elo.update(result)
+        self.wl.update(result)
+        self.games += 1
+
+    def standings(self):
+        rows = []
+        for player in self.wl.ratings:
+            mu, sigma = self.wl.rating(player)
+            rows.append({
+                "player": player,
+                "games": self.wl.games[player],
+                "mu": mu,
+                "sigma": sigma,
+                "conservative": mu - 3 * sigma,
+                "elo": self.elo.rating(player),
+            })
+        rows.sort(key=lambda row: -row["conservative"])
+        return rows
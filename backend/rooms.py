@@ -0,0 +1,197 @@
+import time
+from typing import Dict, List, Optional
+
+from .game_logic import GameManager, BOARD_RADIUS, PLAYERS
+from .views import StateViews, BoardView
+from .forecast import Forecaster, models_for
+from .broadcast import SpectatorFanout
+
+DEFAULT_ROOM = "default"
+
+
+class PreparedGame:
+    """A game plus the per-game objects a room serves from it."""
+
+    def __init__(self, game: GameManager):
+        self.game = game
+        self.views = StateViews(game)
+        self.board_view = BoardView(game)
+        self.forecaster = Forecaster(game)
+
+    def prime(self) -> "PreparedGame":
+        """Do the per-game work up front: encode the board (socket frame and
+        gzipped HTTP body) and build the forecaster's payout and
+        affordability tables. Safe off the event loop."""
+        self.board_view.frame()
+        self.board_view.http()
+        self.forecaster.payouts()
+        models_for(self.game.rules)
+        return self
+
+
+def prepare_game(**kwargs) -> PreparedGame:
+    """A new GameManager(**kwargs), primed; the game pool's factory."""
+    return PreparedGame(GameManager(**kwargs)).prime()
+
+
+class Room:
+    """One game plus everything the socket layer keeps for it.
+
+    Socket.IO room names are prefixed with the room ID, so several games can
+    share one server:
+      <id>            every client of the game (logs)
+      <id>/table      hot-seat clients, full state (only when `hotseat` is on)
+      <id>/players    seated players, public state (+ private overlay per seat)
+      <id>/spectators read-only, rate limited
+    """
+
+    def __init__(self, room_id: str, prepared: PreparedGame, sio, spectator_rate: float, hotseat: bool = False,
+                 creator=None, now: float = 0.0):
+        self.id = room_id
+        # Whether anyone may join as the table and see every hand
+        self.hotseat = hotseat
+        self.use(prepared)
+        self.all = room_id
+        self.table = f"{room_id}/table"
+        self.players = f"{room_id}/players"
+        self.spectators = SpectatorFanout(sio, max_rate=spectator_rate, room=f"{room_id}/spectators")
+        # color -> sids seated as that color
+        self.seats: Dict[str, set] = {}
+        self.members = set()
+        # Client address that opened the room (counts against its room cap)
+        self.creator = creator
+        # When the last client left (or the room was opened); None while occupied
+        self.empty_since = now
+
+    def use(self, prepared: PreparedGame):
+        """Play `prepared.game` here: on creation, and for the next game once one ends."""
+        self.game = prepared.game
+        self.views = prepared.views
+        self.board_view = prepared.board_view
+        self.forecaster = prepared.forecaster
+        # Id in the game archive once the finished game is written
+        self.archive_id = None
+
+
+class RoomRegistry:
+    """Rooms hosted by this process and which room each sid belongs to.
+
+    Rooms nobody has been in for a while are dropped by `evict_idle`, and one
+    client address may only have `max_rooms_per_client` rooms open at a time
+    (0 = no cap), so made-up room IDs can't pile up games in memory.
+    """
+
+    def __init__(self, sio, spectator_rate: float = 10.0, pool=None, hotseat: bool = False,
+                 max_rooms_per_client: int = 0, clock=time.monotonic):
+        self.sio = sio
+        self.spectator_rate = spectator_rate
+        self.hotseat = hotseat
+        # GamePool of PreparedGames for new rooms (see pool.py), optional
+        self.pool = pool
+        self.max_rooms_per_client = max_rooms_per_client
+        self.clock = clock
+        self.rooms: Dict[str, Room] = {}
+        # client address -> rooms it opened that still exist
+        self.opened_by: Dict[str, int] = {}
+        self._room_of: Dict[str, Room] = {}
+        self.seat_of: Dict[str, str] = {}
+
+    def get(self, room_id: str) -> Optional[Room]:
+        return self.rooms.get(room_id)
+
+    def get_or_create(self, room_id: str, client=None) -> Optional[Room]:
+        """The room, opened for `client` if it doesn't exist yet. None when
+        `client` already has its cap of rooms open."""
+        room = self.rooms.get(room_id)
+        if room is None:
+            if client is not None and 0 < self.max_rooms_per_client <= self.opened_by.get(client, 0):
+                return None
+            room = self._add(room_id, self._new_game(room_id), creator=client)
+        return room
+
+    def _new_game(self, room_id: str) -> PreparedGame:
+        if room_id == DEFAULT_ROOM:
+            # Keep the module-level game so existing single-table setups are unchanged
+            from .game_logic import game_manager
+            return PreparedGame(game_manager)
+        return self._fresh_game()
+
+    def _fresh_game(self) -> PreparedGame:
+        if self.pool is not None:
+            prepared = self.pool.take()
+        else:
+            prepared = prepare_game(radius=BOARD_RADIUS, num_players=PLAYERS)
+        # It may have sat in the pool for a while
+        prepared.game.started_at = time.time()
+        return prepared
+
+    def next_game(self, room: Room):
+        """Replace a finished game with a new one; the room and its clients stay."""
+        room.use(self._fresh_game())
+
+    def adopt(self, room_id: str, game: GameManager) -> Room:
+        """Host an existing game (e.g. one handed over by another worker)."""
+        return self._add(room_id, PreparedGame(game))
+
+    def _add(self, room_id: str, prepared: PreparedGame, creator=None) -> Room:
+        room = Room(room_id, prepared, self.sio, self.spectator_rate, hotseat=self.hotseat,
+                    creator=creator, now=self.clock())
+        self.rooms[room_id] = room
+        if creator is not None:
+            self.opened_by[creator] = self.opened_by.get(creator, 0) + 1
+        return room
+
+    def drop(self, room_id: str) -> Optional[Room]:
+        room = self.rooms.pop(room_id, None)
+        if room is not None:
+            for sid in room.members:
+                self._room_of.pop(sid, None)
+                self.seat_of.pop(sid, None)
+            if room.creator is not None:
+                left = self.opened_by.pop(room.creator, 1) - 1
+                if left:
+                    self.opened_by[room.creator] = left
+        return room
+
+    def restore(self, room: Room):
+        """Put back a room taken out with `drop`, members and seats included."""
+        self.rooms[room.id] = room
+        for sid in room.members:
+            self._room_of[sid] = room
+        for color, sids in room.seats.items():
+            for sid in sids:
+                self.seat_of[sid] = color
+        if room.creator is not None:
+            self.opened_by[room.creator] = self.opened_by.get(room.creator, 0) + 1
+
+    def evict_idle(self, timeout: float) -> List[Room]:
+        """Drop rooms that have been empty for `timeout` seconds (never the
+        default room) and return them."""
+        cutoff = self.clock() - timeout
+        idle = [room for room in self.rooms.values()
+                if room.id != DEFAULT_ROOM and room.empty_since is not None and room.empty_since <= cutoff]
+        for room in idle:
+            self.drop(room.id)
+        return idle
+
+    def join(self, sid, room: Room, color=None):
+        self._room_of[sid] = room
+        room.members.add(sid)
+        room.empty_since = None
+        if color is not None:
+            room.seats.setdefault(color, set()).add(sid)
+            self.seat_of[sid] = color
+
+    def leave(self, sid) -> Optional[Room]:
+        room = self._room_of.pop(sid, None)
+        color = self.seat_of.pop(sid, None)
+        if room is not None:
+            room.members.discard(sid)
+            if color is not None:
+                room.seats.get(color, set()).discard(sid)
+            if not room.members:
+                room.empty_since = self.clock()
+        return room
+
+    def room_of(self, sid) -> Optional[Room]:
+        return self._room_of.get(sid)
@@ -0,0 +1,148 @@
+"""Rule sets: build costs, piece limits, VP target, discard threshold, bank trade ratios.
+
+A rule set is plain config (JSON, or a dict) that only needs the keys that
+differ from STANDARD:
+
+    {"name": "cheap-cities", "costs": {"city": {"grain": 1, "ore": 2}},
+     "limits": {"road": 20}, "victory_points": 8, "trade_ratio": {"default": 3, "ore": 2}}
+
+RuleSet compiles it once into tables indexed by build (BUILDS) and resource
+(RESOURCES). Costs are packed into one int with a 9-bit field per resource
+(8 bits of count + a guard bit), and so is a hand, so "can I afford X" is a
+single subtraction: any field where the hand is short borrows its guard
+bit. `affordable` checks every build type against one packed hand.
+
+CATAN_RULES (a JSON file) sets the rules for new games; STANDARD otherwise.
+"""
+import os
+import json
+from functools import lru_cache
+from typing import Dict, List
+
+from .models import ResourceType
+
+BUILDS = ("road", "settlement", "city")
+ROAD, SETTLEMENT, CITY = range(len(BUILDS))
+RESOURCES = [r for r in ResourceType if r != ResourceType.DESERT]
+
+FIELD = 9  # bits per resource: 8 for the count, 1 guard
+MAX_COUNT = (1 << (FIELD - 1)) - 1
+GUARDS = sum(1 << (i * FIELD + FIELD - 1) for i in range(len(RESOURCES)))
+
+STANDARD = {
+    "name": "standard",
+    "costs": {
+        "road": {"lumber": 1, "brick": 1},
+        "settlement": {"lumber": 1, "brick": 1, "wool": 1, "grain": 1},
+        "city": {"grain": 2, "ore": 3},
+    },
+    # None = no limit (settlements have never been capped here)
+    "limits": {"road": 15, "settlement": None, "city": 4},
+    "victory_points": 10,
+    # More cards than this when a 7 is rolled means discarding half (robber not implemented yet)
+    "discard_threshold": 7,
+    "trade_ratio": {"default": 4},
+}
+
+
+def pack(counts) -> int:
+    """Counts in RESOURCES order as one int, each capped at MAX_COUNT."""
+    packed = 0
+    for i, n in enumerate(counts):
+        packed |= min(n, MAX_COUNT) << (i * FIELD)
+    return packed
+
+
+class RuleSet:
+    def __init__(self, config: Dict = None):
+        config = config or {}
+        unknown = set(config) - set(STANDARD)
+        if unknown:
+            raise ValueError(f"unknown rule keys: {', '.join(sorted(unknown))}")
+        self.name = config.get("name", "custom")
+
+        costs = {**STANDARD["costs"], **config.get("costs", {})}
+        limits = {**STANDARD["limits"], **config.get("limits", {})}
+        for build in set(costs) | set(limits):
+            if build not in BUILDS:
+                raise ValueError(f"unknown build type {build!r}")
+        index = {r.value: i for i, r in enumerate(RESOURCES)}
+
+        # build index -> [count per resource index]
+        self.costs: List[List[int]] = []
+        for build in BUILDS:
+            row = [0] * len(RESOURCES)
+            for res, n in costs[build].items():
+                if res not in index:
+                    raise ValueError(f"unknown resource {res!r} in {build} cost")
+                if not 0 <= n <= MAX_COUNT:
+                    raise ValueError(f"{build} cost of {res} must be 0..{MAX_COUNT}")
+                row[index[res]] = n
+            self.costs.append(row)
+        self.packed_costs = [pack(row) for row in self.costs]
+        # (resource, count) pairs per build, for paying
+        self.cost_items = [[(RESOURCES[i], n) for i, n in enumerate(row) if n] for row in self.costs]
+        # Same thing as {resource name: count} dicts, for display and the forecaster
+        self.cost_dicts = {build: {r.value: n for r, n in items} for build, items in zip(BUILDS, self.cost_items)}
+
+        self.limits = [limits[build] for build in BUILDS]
+        self.victory_points = int(config.get("victory_points", STANDARD["victory_points"]))
+        self.discard_threshold = int(config.get("discard_threshold", STANDARD["discard_threshold"]))
+
+        ratios = {**STANDARD["trade_ratio"], **config.get("trade_ratio", {})}
+        default = ratios.pop("default")
+        for res in ratios:
+            if res not in index:
+                raise ValueError(f"unknown resource {res!r} in trade_ratio")
+        self.trade_ratio = [int(ratios.get(r.value, default)) for r in RESOURCES]
+        if min(self.trade_ratio) < 1:
+            raise ValueError("trade ratios must be at least 1")
+        self._ratio_of = dict(zip(RESOURCES, self.trade_ratio))
+
+        # Resolved config, so a game can be rebuilt elsewhere with the same rules
+        self.config = {
+            "name": self.name,
+            "costs": self.cost_dicts,
+            "limits": dict(zip(BUILDS, self.limits)),
+            "victory_points": self.victory_points,
+            "discard_threshold": self.discard_threshold,
+            "trade_ratio": {"default": default, **{r.value: n for r, n in zip(RESOURCES, self.trade_ratio)}},
+        }
+
+    def pack_hand(self, inventory) -> int:
+        return pack([inventory.get(r, 0) for r in RESOURCES])
+
+    def can_afford(self, inventory, build: int) -> bool:
+        return ((self.pack_hand(inventory) | GUARDS) - self.packed_costs[build]) & GUARDS == GUARDS
+
+    def affordable(self, inventory) -> int:
+        """Bit b set when the hand covers build b."""
+        hand = self.pack_hand(inventory) | GUARDS
+        mask = 0
+        for b, cost in enumerate(self.packed_costs):
+            if (hand - cost) & GUARDS == GUARDS:
+                mask |= 1 << b
+        return mask
+
+    def at_limit(self, build: int, count: int) -> bool:
+        limit = self.limits[build]
+        return limit is not None and count >= limit
+
+    def ratio(self, resource) -> int:
+        """Bank trade ratio for giving `resource` (a name or ResourceType); None if it isn't one."""
+        return self._ratio_of.get(resource)
+
+
+@lru_cache(maxsize=None)
+def load_rules(path: str = None) -> RuleSet:
+    """Rules from a JSON file (cached per path); STANDARD without one."""
+    if not path or path == "standard":
+        return RuleSet(STANDARD)
+    with open(path) as f:
+        config = json.load(f)
+    config.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return RuleSet(config)
+
+
+def default_rules() -> RuleSet:
+    return load_rules(os.environ.get("CATAN_RULES") or None)
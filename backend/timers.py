@@ -0,0 +1,186 @@
+"""Turn / trade timers for every room in the process, driven by one task.
+
+A per-turn `asyncio.sleep` task (or `call_later` handle) per game costs a
+heap entry, a coroutine frame and O(log n) scheduling per arm/cancel. Tables
+reset their clock on nearly every action, so instead all timers live in a
+hierarchical timing wheel: arm, cancel and reset are a couple of dict
+operations, and one asyncio task advances the wheel once per tick.
+"""
+import asyncio
+import inspect
+from typing import Callable, Dict, Hashable, List, Optional
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+class Timer:
+    __slots__ = ("key", "deadline", "callback", "slot")
+
+    def __init__(self, key, deadline: int, callback):
+        self.key = key
+        self.deadline = deadline  # absolute tick
+        self.callback = callback
+        self.slot: Optional[dict] = None  # wheel slot currently holding this timer
+
+
+class TimingWheel:
+    """Hierarchical timing wheel with `levels` wheels of 2**slot_bits slots.
+
+    Level 0 holds timers due within one rotation (2**slot_bits ticks), level 1
+    within 2**(2*slot_bits) ticks, and so on. When a lower wheel wraps, the
+    matching slot of the next wheel is cascaded down. Each slot is a dict, so
+    arm / cancel / reset never search.
+
+    Timers are keyed: arming an existing key replaces it (that's a reset).
+    The wheel only counts ticks; `advance()` is called by whoever owns the clock.
+    """
+
+    def __init__(self, tick: float = 0.1, slot_bits: int = 6, levels: int = 4):
+        self.tick = tick
+        self.now = 0
+        self._bits = slot_bits
+        self._mask = (1 << slot_bits) - 1
+        self._wheels = [[{} for _ in range(1 << slot_bits)] for _ in range(levels)]
+        # Longest delay (in ticks) each level can hold
+        self._spans = [1 << (slot_bits * (level + 1)) for level in range(levels)]
+        self.timers: Dict[Hashable, Timer] = {}
+
+    @property
+    def max_delay(self) -> float:
+        """Longer delays are clamped to this (~19 days with the defaults)."""
+        return (self._spans[-1] - 1) * self.tick
+
+    def __len__(self):
+        return len(self.timers)
+
+    def __contains__(self, key):
+        return key in self.timers
+
+    def _place(self, timer: Timer):
+        delta = timer.deadline - self.now
+        # Level = how many slot_bits-sized digits the delay needs, minus one
+        level = (delta.bit_length() - 1) // self._bits if delta > 0 else 0
+        slot = self._wheels[level][(timer.deadline >> (self._bits * level)) & self._mask]
+        slot[timer.key] = timer
+        timer.slot = slot
+
+    def arm(self, key, delay: float, callback: Callable) -> Timer:
+        """Fire `callback` after `delay` seconds (at least one tick), replacing any timer with this key."""
+        old = self.timers.get(key)
+        if old is not None:
+            del old.slot[key]
+        ticks = min(max(1, -int(-delay // self.tick)), self._spans[-1] - 1)
+        timer = Timer(key, self.now + ticks, callback)
+        self._place(timer)
+        self.timers[key] = timer
+        return timer
+
+    def reset(self, key, delay: float) -> bool:
+        """Restart an armed timer with the same callback. False if `key` isn't armed."""
+        timer = self.timers.get(key)
+        if timer is None:
+            return False
+        self.arm(key, delay, timer.callback)
+        return True
+
+    def cancel(self, key) -> bool:
+        timer = self.timers.pop(key, None)
+        if timer is None:
+            return False
+        del timer.slot[key]
+        timer.slot = None
+        return True
+
+    def remaining(self, key) -> Optional[float]:
+        """Seconds until `key` fires, or None if it isn't armed."""
+        timer = self.timers.get(key)
+        return None if timer is None else (timer.deadline - self.now) * self.tick
+
+    def advance(self) -> List[Timer]:
+        """Move one tick forward and return the timers that expired (already removed)."""
+        self.now += 1
+        now = self.now
+
+        # Lower wheel wrapped: spread the next wheel's current slot back down
+        for level in range(1, len(self._wheels)):
+            if now & ((1 << (self._bits * level)) - 1):
+                break
+            wheel = self._wheels[level]
+            idx = (now >> (self._bits * level)) & self._mask
+            slot, wheel[idx] = wheel[idx], {}
+            for timer in slot.values():
+                self._place(timer)
+
+        wheel = self._wheels[0]
+        idx = now & self._mask
+        slot = wheel[idx]
+        if not slot:
+            return []
+        wheel[idx] = {}
+        for key, timer in slot.items():
+            del self.timers[key]
+            timer.slot = None
+        return list(slot.values())
+
+
+class TimerService:
+    """Runs one TimingWheel off the event loop clock.
+
+    Callbacks may be plain functions or coroutine functions; they run in the
+    driver task, in expiry order. A failing callback is logged and skipped.
+    """
+
+    def __init__(self, tick: float = 0.1):
+        self.wheel = TimingWheel(tick=tick)
+        self._task: Optional[asyncio.Task] = None
+
+    def arm(self, key, delay: float, callback: Callable) -> Timer:
+        return self.wheel.arm(key, delay, callback)
+
+    def reset(self, key, delay: float) -> bool:
+        return self.wheel.reset(key, delay)
+
+    def cancel(self, key) -> bool:
+        return self.wheel.cancel(key)
+
+    def remaining(self, key) -> Optional[float]:
+        return self.wheel.remaining(key)
+
+    def __contains__(self, key):
+        return key in self.wheel
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        wheel = self.wheel
+        # Wheel tick N corresponds to `origin + N * tick` on the loop clock,
+        # so a slow callback makes us catch up rather than drift.
+        origin = loop.time() - wheel.now * wheel.tick
+        while True:
+            target = int((loop.time() - origin) / wheel.tick)
+            while wheel.now < target:
+                for timer in wheel.advance():
+                    await self._fire(timer)
+            await asyncio.sleep(max(0.0, origin + (wheel.now + 1) * wheel.tick - loop.time()))
+
+    async def _fire(self, timer: Timer):
+        try:
+            result = timer.callback()
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception("timer %r failed", timer.key)
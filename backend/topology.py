@@ -0,0 +1,103 @@
+import math
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+Coord = Tuple[int, int]
+Vertex = Tuple[int, int, int]
+Edge = Tuple[int, int, int]
+
+
+def hex_coords(radius: int) -> List[Coord]:
+    """Axial coordinates of a hexagon-shaped board, in the same order generate_board uses."""
+    coords = []
+    for q in range(-radius, radius + 1):
+        for r in range(-radius, radius + 1):
+            if -radius <= q + r <= radius:
+                coords.append((q, r))
+    return coords
+
+
+def hex_count(radius: int) -> int:
+    return 3 * radius * (radius + 1) + 1
+
+
+class BoardTopology:
+    """Precomputed vertex/edge adjacency for a board of a given radius.
+
+    Everything is derived from the canonical helpers in game_logic once, so
+    rule checks become dict lookups instead of re-normalizing coordinates on
+    every call. Built in O(hexes) for any radius.
+    """
+
+    def __init__(self, radius: int):
+        from .game_logic import normalize_vertex, normalize_edge, get_incident_edges
+
+        self.radius = radius
+        self.coords = hex_coords(radius)
+
+        self.hex_vertices: Dict[Coord, Tuple[Vertex, ...]] = {}
+        self.vertex_hexes: Dict[Vertex, List[Coord]] = {}
+        self.edges = set()
+
+        for (q, r) in self.coords:
+            corners = tuple(normalize_vertex(q, r, c) for c in range(6))
+            self.hex_vertices[(q, r)] = corners
+            for v in corners:
+                self.vertex_hexes.setdefault(v, []).append((q, r))
+            for e in range(6):
+                self.edges.add(normalize_edge(q, r, e))
+
+        self.vertices = set(self.vertex_hexes)
+
+        # Edge e of a hex runs from corner e to corner e+1
+        self.edge_vertices: Dict[Edge, Tuple[Vertex, Vertex]] = {}
+        for (q, r, e) in self.edges:
+            self.edge_vertices[(q, r, e)] = (normalize_vertex(q, r, e), normalize_vertex(q, r, (e + 1) % 6))
+
+        self.vertex_edges: Dict[Vertex, Tuple[Edge, ...]] = {}
+        self.vertex_adjacent: Dict[Vertex, Tuple[Vertex, ...]] = {}
+        for v in self.vertices:
+            incident = tuple(get_incident_edges(*v))
+            self.vertex_edges[v] = incident
+            adjacent = []
+            for e in incident:
+                a, b = self.edge_vertices.get(e) or (normalize_vertex(*e), normalize_vertex(e[0], e[1], (e[2] + 1) % 6))
+                adjacent.append(b if a == v else a)
+            self.vertex_adjacent[v] = tuple(adjacent)
+
+
+@lru_cache(maxsize=None)
+def get_topology(radius: int) -> BoardTopology:
+    """Topologies are immutable and shared by every game with the same radius."""
+    return BoardTopology(radius)
+
+
+@lru_cache(maxsize=None)
+def board_geometry(radius: int) -> Dict[str, list]:
+    """Render positions for a hex size of 1, pointy-top, board centre at (0, 0).
+
+    Same layout the frontend used to compute itself (Board.tsx): scale every
+    x / y by the hex size in pixels. Vertices and edges are listed once each
+    under their canonical (q, r, c) / (q, r, e) ID, sorted.
+
+      hexes:    [q, r, x, y]
+      vertices: [q, r, c, x, y]
+      edges:    [q, r, e, x, y, rotation in degrees]
+    """
+    topo = get_topology(radius)
+    sqrt3 = math.sqrt(3)
+
+    def center(q, r):
+        return sqrt3 * q + sqrt3 / 2 * r, 1.5 * r
+
+    def point(q, r, angle, dist):
+        x, y = center(q, r)
+        rad = math.radians(angle)
+        return round(x + dist * math.cos(rad), 4), round(y + dist * math.sin(rad), 4)
+
+    return {
+        "hexes": [[q, r, *(round(v, 4) for v in center(q, r))] for q, r in topo.coords],
+        # Corner c sits at -90 + 60c degrees, edge e's midpoint at -60 + 60e
+        "vertices": [[q, r, c, *point(q, r, -90 + c * 60, 1.0)] for q, r, c in sorted(topo.vertices)],
+        "edges": [[q, r, e, *point(q, r, -60 + e * 60, sqrt3 / 2), 30 + e * 60] for q, r, e in sorted(topo.edges)],
+    }
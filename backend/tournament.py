@@ -0,0 +1,336 @@
+"""Bot tournaments: many games between bots, played on a process pool.
+
+    python -m backend.tournament --bots random greedy --games 100000 --out runs/t1
+    python -m backend.tournament --bots random greedy my_bots:Clever --format swiss --out runs/t2
+
+Every game gets its own seed derived from --seed and the game's index, which
+fixes the board (generate_board), the dice and the bots' choices, so any
+single game can be replayed with `play_match`.
+
+Results are appended to <out>/results.jsonl as chunks finish. Running the
+same command again resumes: finished games are read back instead of
+replayed. Ratings (ratings.py) are applied strictly in game order, so a
+resumed or re-run tournament ends with exactly the same standings.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List, Optional
+
+from .ratings import Ratings
+
+RESULTS = "results.jsonl"
+CONFIG = "config.json"
+STANDINGS = "standings.json"
+
+
+def match_seed(seed, match_id: int) -> str:
+    # random.Random hashes str seeds with SHA-512: stable across runs and processes
+    return f"{seed}:{match_id}"
+
+
+def play_match(match_id: int, seed, seats: List[str], radius: int = 2, max_rounds: int = 100,
+               rules: Optional[str] = None) -> Dict:
+    """Play one game with the given bot specs in seat order and return its result row.
+
+    `rules` is a rule set JSON file (see rules.py); standard rules without one.
+    """
+    from .game_logic import GameManager
+    from .rules import load_rules
+    from .bots import load_bot
+
+    rng = random.Random(match_seed(seed, match_id))
+    gm = GameManager(radius=radius, num_players=len(seats), rng=rng, rules=load_rules(rules))
+    bots = [load_bot(spec)(color, rng) for spec, color in zip(seats, gm.state.players)]
+
+    def current():
+        return bots[gm.state.current_turn_index]
+
+    while gm.state.phase != "GAME_LOOP":
+        if not current().place_initial(gm):
+            break  # board too crowded for the draft; score what's there
+
+    turns = 0
+    if gm.state.phase == "GAME_LOOP":
+        while turns < max_rounds * len(bots):
+            current().play_turn(gm)
+            turns += 1
+            gm.pending_logs.clear()
+            if gm.winner() is not None:
+                break
+
+    points = [gm.victory_points(color) for color in gm.state.players]
+    # Rank = number of seats with more points; ties share a rank
+    ranks = [sum(other > p for other in points) for p in points]
+    return {
+        "id": match_id,
+        "seats": seats,
+        "points": points,
+        "ranks": ranks,
+        "turns": turns,
+        "won": max(points) >= gm.rules.victory_points,
+    }
+
+
+def play_chunk(jobs: List[tuple]) -> List[Dict]:
+    return [play_match(*job) for job in jobs]
+
+
+# --- Schedules -------------------------------------------------------------
+# A schedule yields rounds; each round is a list of (match_id, seats). A round
+# may depend on the ratings after every earlier round (Swiss), so the runner
+# finishes one round before asking for the next.
+
+def rotate(seats, shift):
+    shift %= len(seats)
+    return seats[shift:] + seats[:shift]
+
+
+def round_robin(entrants: List[str], seats: int, games: int) -> Iterator[List[tuple]]:
+    """Every group of `seats` entrants plays in turn, with seat order rotated
+    each cycle. With fewer entrants than seats, entrants fill several seats."""
+    if len(entrants) >= seats:
+        tables = [list(t) for t in itertools.combinations(entrants, seats)]
+    else:
+        tables = [[entrants[i % len(entrants)] for i in range(seats)]]
+    yield [
+        (i, rotate(tables[i % len(tables)], i // len(tables)))
+        for i in range(games)
+    ]
+
+
+def swiss(entrants: List[str], seats: int, games: int, ratings: Ratings, games_per_table: int = 10) -> Iterator[List[tuple]]:
+    """Each round, entrants sorted by current rating sit at tables of `seats`
+    neighbours; every table plays `games_per_table` games. Leftover entrants
+    sit out the round (the lowest rated ones move up next time)."""
+    if len(entrants) < seats:
+        raise ValueError("swiss needs at least as many entrants as seats")
+    match_id = 0
+    round_no = 0
+    while match_id < games:
+        order = sorted(entrants, key=lambda e: (-ratings.wl.conservative(e), entrants.index(e)))
+        if round_no % 2:
+            order.reverse()  # alternate who gets the bye
+        jobs = []
+        for t in range(len(order) // seats):
+            table = order[t * seats:(t + 1) * seats]
+            for g in range(games_per_table):
+                if match_id >= games:
+                    break
+                jobs.append((match_id, rotate(table, g)))
+                match_id += 1
+        yield jobs
+        round_no += 1
+
+
+# --- Runner ----------------------------------------------------------------
+
+def read_results(path: str) -> Dict[int, Dict]:
+    """Rows recorded so far. A torn tail from a crash (a partial or garbled
+    line, and anything after it) is cut off the file so new rows are
+    appended after the last good one; those games get replayed."""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, "r+b") as f:
+        good = 0
+        for line in f:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("partial line")
+                row = json.loads(line)
+            except ValueError:  # JSONDecodeError and UnicodeDecodeError included
+                f.truncate(good)
+                break
+            results[row["id"]] = row
+            good += len(line)
+    return results
+
+
+def write_json(path: str, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+class Tournament:
+    def __init__(self, out: str, entrants: List[str], games: int, seats: int = 4, fmt: str = "round-robin",
+                 seed=0, radius: int = 2, max_rounds: int = 100, games_per_table: int = 10, rules: str = None):
+        self.out = out
+        self.config = {
+            "entrants": entrants,
+            "games": games,
+            "seats": seats,
+            "format": fmt,
+            "seed": seed,
+            "radius": radius,
+            "max_rounds": max_rounds,
+            "games_per_table": games_per_table,
+        }
+        if rules:
+            # Only when set, so runs started before rule sets existed still resume
+            self.config["rules"] = rules
+        self.ratings = Ratings()
+        self.results: Dict[int, Dict] = {}
+        self.next_to_rate = 0  # results are rated in id order
+
+    def schedule(self) -> Iterator[List[tuple]]:
+        c = self.config
+        if c["format"] == "round-robin":
+            return round_robin(c["entrants"], c["seats"], c["games"])
+        if c["format"] == "swiss":
+            return swiss(c["entrants"], c["seats"], c["games"], self.ratings, c["games_per_table"])
+        raise ValueError(f"unknown format {c['format']!r}")
+
+    def validate(self):
+        """Raise ValueError for a tournament that can't be played, before
+        anything is written to the run directory."""
+        from .game_logic import MIN_PLAYERS
+        from .models import PlayerColor
+        from .bots import load_bot
+        c = self.config
+        if c["format"] not in ("round-robin", "swiss"):
+            raise ValueError(f"unknown format {c['format']!r}")
+        if not MIN_PLAYERS <= c["seats"] <= len(PlayerColor):
+            raise ValueError(f"seats must be between {MIN_PLAYERS} and {len(PlayerColor)}")
+        if not c["entrants"]:
+            raise ValueError("no entrants")
+        if c["format"] == "swiss" and len(c["entrants"]) < c["seats"]:
+            raise ValueError(f"swiss needs at least as many entrants as seats ({c['seats']})")
+        for spec in c["entrants"]:
+            try:
+                load_bot(spec)
+            except (ImportError, AttributeError) as exc:
+                raise ValueError(f"can't load bot {spec!r}: {exc}") from exc
+
+    def _prepare(self):
+        self.validate()
+        os.makedirs(self.out, exist_ok=True)
+        config_path = os.path.join(self.out, CONFIG)
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                saved = json.load(f)
+            if saved != self.config:
+                raise SystemExit(f"{self.out} holds a different tournament; use another --out")
+        else:
+            write_json(config_path, self.config)
+        self.results = read_results(os.path.join(self.out, RESULTS))
+
+    def _rate_ready(self):
+        while self.next_to_rate in self.results:
+            row = self.results[self.next_to_rate]
+            self.ratings.update(list(zip(row["seats"], row["ranks"])))
+            self.next_to_rate += 1
+
+    def run(self, workers: Optional[int] = None, chunk_size: int = 250, progress=None):
+        self._prepare()
+        c = self.config
+        workers = workers or os.cpu_count() or 1
+        job_args = (c["seed"],)
+        job_kwargs = (c["radius"], c["max_rounds"], c.get("rules"))
+        resumed = len(self.results)
+
+        with open(os.path.join(self.out, RESULTS), "a") as log, ProcessPoolExecutor(workers) as pool:
+            for round_jobs in self.schedule():
+                todo = [
+                    (match_id, *job_args, seats, *job_kwargs)
+                    for match_id, seats in round_jobs
+                    if match_id not in self.results
+                ]
+                chunks = iter([todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)])
+                pending = set()
+                # Keep a couple of chunks per worker in flight so memory stays flat
+                for chunk in itertools.islice(chunks, workers * 2):
+                    pending.add(pool.submit(play_chunk, chunk))
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        rows = future.result()
+                        log.write("".join(json.dumps(row) + "\n" for row in rows))
+                        log.flush()
+                        os.fsync(log.fileno())
+                        for row in rows:
+                            self.results[row["id"]] = row
+                        self._rate_ready()
+                        for chunk in itertools.islice(chunks, 1):
+                            pending.add(pool.submit(play_chunk, chunk))
+                        if progress is not None:
+                            progress(self)
+                    write_json(os.path.join(self.out, STANDINGS), self.summary())
+                # Swiss pairings need every result of this round rated
+                self._rate_ready()
+
+        write_json(os.path.join(self.out, STANDINGS), self.summary())
+        return resumed
+
+    def summary(self):
+        # Games an entrant won or shared the win in, once per game even when
+        # it held several of the winning seats
+        wins = {}
+        for row in self.results.values():
+            for seat in {seat for seat, rank in zip(row["seats"], row["ranks"]) if rank == 0}:
+                wins[seat] = wins.get(seat, 0) + 1
+        standings = self.ratings.standings()
+        for row in standings:
+            row["wins"] = wins.get(row["player"], 0)
+        return {"games_played": len(self.results), "games_rated": self.next_to_rate, "standings": standings}
+
+
+def print_standings(summary):
+    print(f"{'bot':<24} {'games':>8} {'wins':>8} {'mu':>7} {'sigma':>6} {'mu-3s':>7} {'elo':>7}")
+    for row in summary["standings"]:
+        print(f"{row['player']:<24} {row['games']:>8} {row['wins']:>8} {row['mu']:>7.2f} {row['sigma']:>6.2f} "
+              f"{row['conservative']:>7.2f} {row['elo']:>7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bots", nargs="+", required=True, help="bot names (see bots.BOTS) or module:Class")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seats", type=int, default=4)
+    parser.add_argument("--format", choices=["round-robin", "swiss"], default="round-robin")
+    parser.add_argument("--games-per-table", type=int, default=10, help="swiss: games per table per round")
+    parser.add_argument("--seed", default="0")
+    parser.add_argument("--radius", type=int, default=2)
+    parser.add_argument("--max-rounds", type=int, default=100, help="table rounds before a game is scored as is")
+    parser.add_argument("--rules", default=None, help="rule set JSON file (default: standard rules)")
+    parser.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    parser.add_argument("--chunk-size", type=int, default=250)
+    parser.add_argument("--out", required=True, help="directory for results, config and standings")
+    args = parser.parse_args()
+
+    os.environ.setdefault("CATAN_LOG_LEVEL", "WARNING")
+    tournament = Tournament(
+        args.out, args.bots, args.games, seats=args.seats, fmt=args.format, seed=args.seed,
+        radius=args.radius, max_rounds=args.max_rounds, games_per_table=args.games_per_table, rules=args.rules,
+    )
+    try:
+        tournament.validate()
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    start = time.perf_counter()
+    last = [start]
+
+    def progress(t):
+        now = time.perf_counter()
+        if now - last[0] >= 2:
+            last[0] = now
+            print(f"\r{len(t.results)}/{args.games} games", end="", file=sys.stderr, flush=True)
+
+    resumed = tournament.run(workers=args.workers, chunk_size=args.chunk_size, progress=progress)
+    elapsed = time.perf_counter() - start
+    played = len(tournament.results) - resumed
+    print(f"\r{played} games in {elapsed:.1f}s ({played / elapsed if elapsed else 0:.0f}/s), {resumed} resumed",
+          file=sys.stderr)
+    print_standings(tournament.summary())
+
+
+if __name__ == "__main__":
+    main()
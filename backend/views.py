@@ -0,0 +1,135 @@
+import gzip
+import json
+import hashlib
+from socketio import packet as sio_packet
+from engineio import packet as eio_packet
+from . import metrics
+from .topology import board_geometry
+
+
+def public_state(state) -> dict:
+    """State dump without hidden information: hands become card counts."""
+    data = state.model_dump(exclude={"inventories"})
+    data["card_counts"] = {p: sum(inv.values()) for p, inv in state.inventories.items()}
+    return data
+
+
+def private_state(state, color) -> dict:
+    """The part only `color` may see: their own hand."""
+    return {"color": color, "hand": dict(state.inventories.get(color, {}))}
+
+
+def encode_event(event: str, data, namespace: str = "/"):
+    """Encode a Socket.IO event into an Engine.IO packet that can be sent
+    as-is to any number of clients."""
+    pkt = sio_packet.Packet(sio_packet.EVENT, namespace=namespace, data=[event, data])
+    # Plain JSON payloads encode to a single string (binary ones would be a list)
+    frame = eio_packet.Packet(eio_packet.MESSAGE, pkt.encode())
+    # Engine.IO caches the encoded form on the packet, so priming it here means
+    # the transport layer reuses the same string for every recipient.
+    size = len(frame.encode())
+    return frame, size
+
+
+class StateViews:
+    """Encoded views of one game, cached per state version.
+
+    - public:  'game_state' without hands, shared by seated players and spectators
+    - private: 'private_state' with one player's hand (small overlay, one per color)
+    - full:    'game_state' with every hand, for the local hot-seat table
+
+    Each frame is built at most once per version no matter how many sockets
+    receive it.
+    """
+
+    def __init__(self, game_manager):
+        self.game_manager = game_manager
+        self._version = None
+        self._frames = {}
+
+    @property
+    def version(self):
+        return self.game_manager.version
+
+    def _cached(self, key, event, build):
+        if self._version != self.game_manager.version:
+            self._frames.clear()
+            self._version = self.game_manager.version
+        frame = self._frames.get(key)
+        if frame is None:
+            with metrics.timer("catan_serialize_seconds", event=key[0]):
+                frame, size = encode_event(event, build())
+            metrics.count("catan_emit_bytes_total", size, event=key[0])
+            self._frames[key] = frame
+        return frame
+
+    def public_frame(self):
+        gm = self.game_manager
+
+        def build():
+            data = public_state(gm.state)
+            # Hex string: 64 bits don't fit a JS number
+            data["hash"] = f"{gm.public_zobrist:016x}"
+            return data
+        return self._cached(("public_state",), "game_state", build)
+
+    def private_frame(self, color):
+        gm = self.game_manager
+
+        def build():
+            data = private_state(gm.state, color)
+            data["can_afford"] = gm.can_afford_all(color)
+            return data
+        return self._cached(("private_state", color), "private_state", build)
+
+    def full_frame(self):
+        gm = self.game_manager
+
+        def build():
+            data = gm.state.model_dump()
+            data["hash"] = f"{gm.zobrist:016x}"
+            return data
+        return self._cached(("full_state",), "game_state", build)
+
+
+class BoardView:
+    """One game's board as clients get it: the hexes plus render geometry
+    (topology.board_geometry), so the client doesn't compute positions.
+
+    A game's board never changes, so the 'board_state' frame and the HTTP
+    body (plain, gzipped, and its ETag) are each built once.
+    """
+
+    def __init__(self, game_manager):
+        self.board = game_manager.board
+        self._data = None
+        self._frame = None
+        self._http = None
+
+    def data(self) -> dict:
+        if self._data is None:
+            self._data = self.board.model_dump(mode="json")
+            self._data["geometry"] = board_geometry(self.board.radius)
+        return self._data
+
+    def frame(self):
+        if self._frame is None:
+            self._frame, _ = encode_event("board_state", self.data())
+        return self._frame
+
+    def http(self):
+        """(body, gzipped body, ETag)"""
+        if self._http is None:
+            body = json.dumps(self.data(), separators=(",", ":")).encode()
+            etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+            self._http = body, gzip.compress(body, 9, mtime=0), etag
+        return self._http
+
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match asks for
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
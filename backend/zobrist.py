@@ -0,0 +1,94 @@
+"""64-bit Zobrist hashing of a game position.
+
+A position hash is the XOR of one random 64-bit key per feature present:
+
+- a building: vertex (q, r, c), seat, settlement or city
+- a road: edge (q, r, e), seat
+- a hand: (seat, resource, count) for every non-zero count
+- the turn: (phase, sub-phase, current seat)
+
+GameManager keeps the XOR of the piece keys and of the hand keys up to date
+as pieces are placed, upgraded and cards change hands (two XORs per change),
+and mixes in the turn key when asked, so `GameManager.zobrist` is O(1). Logs,
+the last dice roll and trade offers are not part of the position.
+
+Hands are hidden and the hand space is small enough to brute-force, so the
+hash sent to other players (`public_zobrist`) leaves the hand keys out.
+
+Keys are splitmix64 chained over the feature's integer fields, so any
+client can derive the same keys (e.g. with BigInt in JS) and compare its
+hash with the server's to spot a desync. `position_hash` recomputes the
+hash from scratch; with CATAN_VERIFY_HASH=1 every action checks the two
+agree.
+"""
+import os
+from functools import lru_cache
+
+MASK = (1 << 64) - 1
+
+BUILDING, ROAD, CARDS, TURN = range(1, 5)
+BUILDING_TYPES = {"settlement": 0, "city": 1}
+PHASES = {"INITIAL_PLACEMENT_1": 0, "INITIAL_PLACEMENT_2": 1, "GAME_LOOP": 2, "GAME_OVER": 3}
+SUB_PHASES = {None: 0, "ROLL_DICE": 1, "BUILD_TRADE": 2}
+
+VERIFY = os.environ.get("CATAN_VERIFY_HASH", "").lower() in ("1", "true", "yes")
+
+
+def splitmix64(x: int) -> int:
+    x = (x + 0x9E3779B97F4A7C15) & MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK
+    return x ^ (x >> 31)
+
+
+@lru_cache(maxsize=None)
+def key(*fields: int) -> int:
+    """Key for a feature given as small ints (negatives wrap to 64 bits)."""
+    h = 0
+    for f in fields:
+        h = splitmix64(h ^ (f & MASK))
+    return h
+
+
+def building_key(vertex, seat: int, kind: str) -> int:
+    return key(BUILDING, *vertex, seat, BUILDING_TYPES[kind])
+
+
+def road_key(edge, seat: int) -> int:
+    return key(ROAD, *edge, seat)
+
+
+def cards_key(seat: int, resource: int, count: int) -> int:
+    # Zero cards is the starting hand and contributes nothing
+    return key(CARDS, seat, resource, count) if count else 0
+
+
+def turn_key(state) -> int:
+    return key(TURN, PHASES[state.phase], SUB_PHASES[state.turn_sub_phase], state.current_turn_index)
+
+
+def pieces_hash(state, seat) -> int:
+    """Buildings and roads, from scratch. `seat` maps color -> seat number."""
+    h = 0
+    for b in state.buildings:
+        loc = b.location
+        h ^= building_key((loc.q, loc.r, loc.corner), seat[b.owner], b.type)
+    for road in state.roads:
+        loc = road.location
+        h ^= road_key((loc.q, loc.r, loc.edge), seat[road.owner])
+    return h
+
+
+def hands_hash(state, seat, resource_index) -> int:
+    """Every hand, from scratch. `resource_index` maps resource -> index."""
+    h = 0
+    for color, inventory in state.inventories.items():
+        for res, count in inventory.items():
+            if res in resource_index:
+                h ^= cards_key(seat[color], resource_index[res], count)
+    return h
+
+
+def position_hash(game_manager) -> int:
+    gm = game_manager
+    return pieces_hash(gm.state, gm.seat) ^ hands_hash(gm.state, gm.seat, gm.resource_index) ^ turn_key(gm.state)
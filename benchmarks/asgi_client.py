@@ -0,0 +1,130 @@
+"""Minimal in-process Socket.IO client that talks to an ASGI app over
+Engine.IO v4 long-polling. No sockets, no network: every HTTP request is a
+direct call into the ASGI callable.
+"""
+import asyncio
+import json
+from urllib.parse import urlencode
+
+RECORD_SEPARATOR = "\x1e"
+
+
+async def asgi_request(app, method: str, path: str, query: dict, body: bytes = b""):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": urlencode(query).encode(),
+        "headers": [
+            (b"host", b"bench"),
+            (b"content-type", b"text/plain;charset=UTF-8"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    sent = False
+    never = asyncio.get_running_loop().create_future()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # the app should never need more than one event; wait like a live connection would
+        await never
+        return {"type": "http.disconnect"}
+
+    status = None
+    chunks = []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+class PollingClient:
+    """Socket.IO client on the default namespace. Received events are counted
+    and timestamped so benchmarks can measure fan-out latency."""
+
+    def __init__(self, app, path: str = "/socket.io/", query: dict = None):
+        self.app = app
+        self.path = path
+        self.extra_query = query or {}
+        self.sid = None
+        self.events = {}  # event name -> number received
+        self.bytes_received = 0
+        self.changed = asyncio.Event()
+        self._poller = None
+
+    def _query(self):
+        q = {"EIO": "4", "transport": "polling"}
+        q.update(self.extra_query)
+        if self.sid:
+            q["sid"] = self.sid
+        return q
+
+    async def connect(self):
+        status, body = await asgi_request(self.app, "GET", self.path, self._query())
+        if status != 200:
+            raise RuntimeError(f"handshake failed: {status} {body!r}")
+        handshake = json.loads(body.decode().split(RECORD_SEPARATOR)[0][1:])
+        self.sid = handshake["sid"]
+        await self._post("40")
+        self._poller = asyncio.create_task(self._poll())
+
+    async def emit(self, event: str, data=None):
+        payload = [event] if data is None else [event, data]
+        await self._post("42" + json.dumps(payload))
+
+    async def wait_for(self, event: str, count: int):
+        while self.events.get(event, 0) < count:
+            self.changed.clear()
+            await self.changed.wait()
+
+    async def close(self):
+        if self.sid is None:
+            return
+        try:
+            await self._post("1")
+        finally:
+            if self._poller:
+                self._poller.cancel()
+                try:
+                    await self._poller
+                except asyncio.CancelledError:
+                    pass
+            self.sid = None
+
+    async def _post(self, packet: str):
+        status, body = await asgi_request(self.app, "POST", self.path, self._query(), packet.encode())
+        if status != 200:
+            raise RuntimeError(f"POST failed: {status} {body!r}")
+
+    async def _poll(self):
+        while self.sid:
+            status, body = await asgi_request(self.app, "GET", self.path, self._query())
+            if status != 200:
+                return
+            self.bytes_received += len(body)
+            for packet in body.decode().split(RECORD_SEPARATOR):
+                await self._handle(packet)
+            self.changed.set()
+
+    async def _handle(self, packet: str):
+        if packet == "2":  # engine.io ping
+            await self._post("3")
+        elif packet.startswith("42"):
+            event = json.loads(packet[2:])[0]
+            self.events[event] = self.events.get(event, 0) + 1
@@ -0,0 +1,96 @@
+"""Microbenchmarks for board topology helpers and GameManager rule checks."""
+import itertools
+import random
+from backend.game_logic import (
+    GameManager,
+    generate_board,
+    normalize_vertex,
+    get_incident_edges,
+    get_adjacent_vertices,
+)
+from backend.forecast import Forecaster
+from backend.pool import GamePool
+from backend import zobrist
+from .harness import bench
+from .random_play import board_vertices, board_edges, play_random_game
+
+
+def _prepare_rule_check(gm: GameManager):
+    # Put the current player in the build phase with an empty hand, so every
+    # attempt runs all placement rules and then fails the cost check.
+    # Nothing is mutated, which keeps rounds comparable.
+    gm.state.phase = "GAME_LOOP"
+    gm.state.turn_sub_phase = "BUILD_TRADE"
+    player = gm.state.players[gm.state.current_turn_index]
+    for res, count in list(gm.state.inventories[player].items()):
+        gm._add_cards(player, res, -count)
+
+
+def run(quick: bool = False):
+    n = 200 if quick else 2000
+    results = []
+
+    coords = [(q, r, c) for q in range(-3, 4) for r in range(-3, 4) for c in range(6)]
+    cycle = itertools.cycle(coords).__next__
+
+    results.append(bench("normalize_vertex", lambda: normalize_vertex(*cycle()), number=n * 10))
+    results.append(bench("get_incident_edges", lambda: get_incident_edges(*cycle()), number=n * 10))
+    results.append(bench("get_adjacent_vertices", lambda: get_adjacent_vertices(*cycle()), number=n * 10))
+
+    random.seed(1)
+    results.append(bench("generate_board", generate_board, number=n // 2))
+
+    # Room creation: building a game inline vs taking a pre-built one
+    results.append(bench("new_game", GameManager, number=n // 2))
+    pool = GamePool(GameManager, max_size=n // 2)
+    pool.target = n // 2
+    taken = []  # keep them, or the timing includes freeing each game
+    results.append(bench("pool_take", lambda: taken.append(pool.take()), number=n // 2, setup=pool.fill))
+    taken.clear()
+
+    boards = {
+        "early": GameManager(),
+        "late": play_random_game(seed=1, rounds=10 if quick else 40),
+    }
+    for label, gm in boards.items():
+        _prepare_rule_check(gm)
+        verts = board_vertices(gm.board)
+        edges = board_edges(gm.board)
+
+        def check_settlements():
+            for v in verts:
+                gm.build_settlement(*v)
+
+        def check_roads():
+            for e in edges:
+                gm.build_road(*e)
+
+        results.append(bench(f"build_settlement_checks[{label}] (x{len(verts)})", check_settlements, number=max(1, n // 100)))
+        results.append(bench(f"build_road_checks[{label}] (x{len(edges)})", check_roads, number=max(1, n // 100)))
+        gm.drain_logs()
+
+        def distribute_all():
+            for number in (2, 3, 4, 5, 6, 8, 9, 10, 11, 12):
+                gm.distribute_resources(number)
+
+        results.append(bench(f"distribute_resources[{label}] (x10)", distribute_all, number=max(1, n // 10)))
+        gm.drain_logs()
+
+        player = gm.state.players[0]
+        results.append(bench(f"can_afford_all[{label}]", lambda: gm.can_afford_all(player), number=n * 10))
+
+        # Incremental hash vs recomputing it from the state
+        results.append(bench(f"zobrist[{label}]", lambda: gm.zobrist, number=n * 10))
+        results.append(bench(f"position_hash[{label}]", lambda: zobrist.position_hash(gm), number=n))
+
+        forecaster = Forecaster(gm)
+        color = gm.state.players[0].value
+
+        def forecast_cold():
+            gm.version += 1  # as if the state had just changed
+            forecaster.forecast(color)
+
+        results.append(bench(f"forecast_cold[{label}]", forecast_cold, number=max(1, n // 10)))
+        results.append(bench(f"forecast_cached[{label}]", lambda: forecaster.forecast(color), number=n * 10))
+
+    return results
@@ -0,0 +1,25 @@
+"""Macrobenchmark: complete random games played through GameManager."""
+import time
+from .harness import summarize
+from .random_play import play_random_game
+
+
+def run(quick: bool = False):
+    games = 5 if quick else 50
+    rounds = 20 if quick else 40
+
+    durations = []
+    actions = 0
+    for seed in range(games):
+        start = time.perf_counter()
+        gm = play_random_game(seed=seed, rounds=rounds)
+        durations.append(time.perf_counter() - start)
+        actions += len(gm.state.buildings) + len(gm.state.roads)
+
+    return [summarize(
+        f"random_game[{rounds} rounds]",
+        durations,
+        games=games,
+        pieces_placed=actions,
+        games_per_s=games / sum(durations),
+    )]
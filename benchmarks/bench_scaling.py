@@ -0,0 +1,48 @@
+"""How board setup, rule checks and resource distribution scale with board radius.
+
+Rule checks and distribution should stay flat as the radius grows: they only
+touch the pieces around the queried spot, not the whole board.
+"""
+import random
+from backend.topology import BoardTopology
+from backend.game_logic import generate_board
+from .harness import bench
+from .random_play import board_vertices, board_edges, play_random_game
+from .bench_engine import _prepare_rule_check
+
+PROBES = 48
+
+
+def run(quick: bool = False):
+    radii = (2, 6, 10) if quick else (2, 4, 6, 8, 10)
+    n = 20 if quick else 200
+    results = []
+
+    for radius in radii:
+        results.append(bench(f"topology_build[r={radius}]", lambda: BoardTopology(radius), number=max(1, n // 20), repeat=3))
+        results.append(bench(f"generate_board[r={radius}]", lambda: generate_board(radius), number=max(1, n // 10), repeat=3))
+
+        gm = play_random_game(seed=radius, rounds=10 if quick else 20, radius=radius)
+        _prepare_rule_check(gm)
+        rng = random.Random(radius)
+        verts = rng.sample(board_vertices(gm.board), PROBES)
+        edges = rng.sample(board_edges(gm.board), PROBES)
+
+        def check_settlements():
+            for v in verts:
+                gm.build_settlement(*v)
+
+        def check_roads():
+            for e in edges:
+                gm.build_road(*e)
+
+        def distribute_all():
+            for number in (2, 3, 4, 5, 6, 8, 9, 10, 11, 12):
+                gm.distribute_resources(number)
+
+        results.append(bench(f"build_settlement_checks[r={radius}] (x{PROBES})", check_settlements, number=n))
+        results.append(bench(f"build_road_checks[r={radius}] (x{PROBES})", check_roads, number=n))
+        results.append(bench(f"distribute_resources[r={radius}] (x10)", distribute_all, number=n))
+        gm.drain_logs()
+
+    return results
@@ -0,0 +1,71 @@
+"""Socket.IO load test against backend.main:app using in-process ASGI clients."""
+import asyncio
+import time
+from .asgi_client import PollingClient
+from .harness import summarize
+
+
+async def _fan_out(app, clients: int, actions: int, spectators: bool = False):
+    # Table clients see every hand; run() turns hot-seat on so they're allowed
+    listeners = [PollingClient(app, query={"role": "table"}) for _ in range(clients)]
+    if spectators:
+        # one driver at the table, everyone else watches read-only
+        listeners[1:] = [PollingClient(app, query={"role": "spectator"}) for _ in range(clients - 1)]
+    start = time.perf_counter()
+    await asyncio.gather(*(c.connect() for c in listeners))
+    connect_s = time.perf_counter() - start
+
+    # Every client receives one game_state on connect
+    await asyncio.gather(*(c.wait_for("game_state", 1) for c in listeners))
+    driver = listeners[0]
+
+    latencies = []
+    wall_start = time.perf_counter()
+    for i in range(actions):
+        t0 = time.perf_counter()
+        await driver.emit("end_turn")
+        await asyncio.gather(*(c.wait_for("game_state", i + 2) for c in listeners))
+        latencies.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - wall_start
+
+    received = sum(c.bytes_received for c in listeners)
+    await asyncio.gather(*(c.close() for c in listeners))
+    return connect_s, latencies, wall, received
+
+
+def run(quick: bool = False):
+    from backend.main import app, rooms, limiter
+
+    # Clients without a role are spectators, and spectators' actions are dropped
+    rooms.hotseat = True
+    # Measure raw fan-out cost, not the coalescing window or rate limits
+    rooms.get_or_create("default").spectators.interval = 0.0
+    limiter.enabled = False
+
+    results = []
+    sizes = (1, 10) if quick else (1, 10, 50, 200)
+    actions = 20 if quick else 100
+    for clients in sizes:
+        connect_s, latencies, wall, received = asyncio.run(_fan_out(app, clients, actions))
+        results.append(summarize(
+            f"socket_broadcast[{clients} clients]",
+            latencies,
+            clients=clients,
+            connect_all_s=connect_s,
+            actions_per_s=actions / wall,
+            deliveries_per_s=actions * clients / wall,
+            bytes_received=received,
+        ))
+
+    for clients in sizes[1:]:
+        connect_s, latencies, wall, received = asyncio.run(_fan_out(app, clients, actions, spectators=True))
+        results.append(summarize(
+            f"socket_spectators[{clients - 1} spectators]",
+            latencies,
+            clients=clients,
+            connect_all_s=connect_s,
+            actions_per_s=actions / wall,
+            deliveries_per_s=actions * clients / wall,
+            bytes_received=received,
+        ))
+    return results
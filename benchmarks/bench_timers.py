@@ -0,0 +1,97 @@
+"""Timing wheel vs asyncio call_later with 100k armed turn timers."""
+import asyncio
+import random
+import time
+import tracemalloc
+
+from backend.timers import TimingWheel
+from .harness import bench
+
+TIMERS = 100_000
+
+
+def _noop():
+    pass
+
+
+def _delays(n, seed=1):
+    # Turn clocks of 1-10 min at 100ms ticks, spread over a few wheel levels
+    rng = random.Random(seed)
+    return [rng.uniform(60, 600) for _ in range(n)]
+
+
+def _wheel_results(n, delays):
+    results = []
+    wheel = TimingWheel(tick=0.1)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for key, delay in enumerate(delays):
+        wheel.arm(key, delay, _noop)
+    arm_s = time.perf_counter() - start
+    mem = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    results.append({"name": f"wheel_arm[{n}]", "median_s": arm_s / n, "bytes_per_timer": mem / n})
+
+    # Reset = what every game action does to its room's turn clock
+    keys = random.Random(2).choices(range(n), k=n)
+    it = iter(zip(keys, delays))
+
+    def reset():
+        key, delay = next(it)
+        wheel.reset(key, delay)
+    results.append(bench(f"wheel_reset[{n} armed]", reset, number=n // 5, repeat=5))
+
+    # One tick with 100k armed timers and nothing due yet (the steady state);
+    # 500 ticks = 50s, shorter than the shortest delay
+    results.append(bench(f"wheel_idle_tick[{n} armed]", wheel.advance, number=100, repeat=5))
+
+    # Run the clock until every timer has fired
+    fired = 0
+    start = time.perf_counter()
+    while len(wheel):
+        fired += len(wheel.advance())
+    drain_s = time.perf_counter() - start
+    results.append({"name": f"wheel_expire_all[{n}]", "median_s": drain_s / fired, "fired": fired, "ticks": wheel.now})
+
+    for key, delay in enumerate(delays):
+        wheel.arm(key, delay, _noop)
+    keys = iter(range(n))
+    results.append(bench(f"wheel_cancel[{n} armed]", lambda: wheel.cancel(next(keys)), number=n // 5, repeat=5))
+    return results
+
+
+def _call_later_results(n, delays):
+    # Baseline: one loop.call_later handle per game, cancelled and re-armed on reset
+    loop = asyncio.new_event_loop()
+    try:
+        results = []
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        handles = [loop.call_later(delay, _noop) for delay in delays]
+        arm_s = time.perf_counter() - start
+        mem = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        results.append({"name": f"call_later_arm[{n}]", "median_s": arm_s / n, "bytes_per_timer": mem / n})
+
+        keys = random.Random(2).choices(range(n), k=n)
+        it = iter(zip(keys, delays))
+
+        def reset():
+            key, delay = next(it)
+            handles[key].cancel()
+            handles[key] = loop.call_later(delay, _noop)
+        results.append(bench(f"call_later_reset[{n} armed]", reset, number=n // 5, repeat=5))
+        for h in handles:
+            h.cancel()
+        return results
+    finally:
+        loop.close()
+
+
+def run(quick: bool = False):
+    n = TIMERS // 10 if quick else TIMERS
+    delays = _delays(n)
+    return _wheel_results(n, delays) + _call_later_results(n, delays)
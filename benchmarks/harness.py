@@ -0,0 +1,80 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from typing import Callable, Dict, List
+
+
+def bench(name: str, fn: Callable[[], object], number: int = 1000, repeat: int = 5, setup: Callable[[], object] = None) -> Dict:
+    """Time `fn` `number` times per round, `repeat` rounds. Reports per-call seconds."""
+    rounds: List[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number)
+
+    return {
+        "name": name,
+        "number": number,
+        "repeat": repeat,
+        "min_s": min(rounds),
+        "median_s": statistics.median(rounds),
+        "mean_s": statistics.fmean(rounds),
+        "ops_per_s": 1.0 / min(rounds) if min(rounds) > 0 else None,
+    }
+
+
+def summarize(name: str, samples: List[float], **extra) -> Dict:
+    """Summary for benchmarks that collect their own latency samples."""
+    ordered = sorted(samples)
+
+    def pct(p):
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    result = {
+        "name": name,
+        "samples": len(ordered),
+        "min_s": ordered[0] if ordered else None,
+        "p50_s": pct(0.50),
+        "p95_s": pct(0.95),
+        "p99_s": pct(0.99),
+        "max_s": ordered[-1] if ordered else None,
+        "mean_s": statistics.fmean(ordered) if ordered else None,
+    }
+    result.update(extra)
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(path: str, results: List[Dict]):
+    doc = {
+        "commit": git_revision(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=2)
+
+
+def print_results(results: List[Dict]):
+    for r in results:
+        if "median_s" in r:
+            print(f"{r['name']:<48} {r['median_s'] * 1e6:>12.2f} us/op")
+        else:
+            print(f"{r['name']:<48} p50 {r['p50_s'] * 1e3:>9.3f} ms  p99 {r['p99_s'] * 1e3:>9.3f} ms")
@@ -0,0 +1,41 @@
+import random
+from backend.bots import RandomBot
+from backend.game_logic import GameManager, normalize_vertex, normalize_edge
+
+
+def board_vertices(board):
+    """All canonical vertices on the board."""
+    seen = set()
+    for h in board.hexes:
+        for c in range(6):
+            seen.add(normalize_vertex(h.q, h.r, c))
+    return sorted(seen)
+
+
+def board_edges(board):
+    """All canonical edges on the board."""
+    seen = set()
+    for h in board.hexes:
+        for e in range(6):
+            seen.add(normalize_edge(h.q, h.r, e))
+    return sorted(seen)
+
+
+def play_random_game(seed: int, rounds: int = 40, radius: int = 2, num_players: int = 4) -> GameManager:
+    """Initial snake draft followed by up to `rounds` full table rounds of bots.RandomBot."""
+    # One seeded RNG drives the board, the dice and the bots
+    rng = random.Random(seed)
+    gm = GameManager(radius=radius, num_players=num_players, rng=rng)
+    bots = [RandomBot(color, rng) for color in gm.state.players]
+
+    while gm.state.phase != "GAME_LOOP":
+        if not bots[gm.state.current_turn_index].place_initial(gm):
+            break
+
+    for _ in range(rounds * len(bots)):
+        if gm.state.phase != "GAME_LOOP":
+            break
+        bots[gm.state.current_turn_index].play_turn(gm)
+
+    gm.drain_logs()
+    return gm
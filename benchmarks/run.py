@@ -0,0 +1,46 @@
+"""Run the benchmark suite and write results to JSON.
+
+    python -m benchmarks.run                      # everything
+    python -m benchmarks.run --only engine games  # a subset
+    python -m benchmarks.run --quick -o bench.json
+"""
+import argparse
+import importlib
+import os
+
+# Connect/disconnect logging from hundreds of simulated clients is just noise here
+os.environ.setdefault("CATAN_LOG_LEVEL", "WARNING")
+
+from .harness import print_results, write_results
+
+SUITES = {
+    "engine": "benchmarks.bench_engine",
+    "games": "benchmarks.bench_games",
+    "scaling": "benchmarks.bench_scaling",
+    "socket": "benchmarks.bench_socket",
+    "timers": "benchmarks.bench_timers",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITES), help="suites to run")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for smoke runs")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="JSON output path")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.only or SUITES:
+        print(f"== {name}")
+        suite_results = importlib.import_module(SUITES[name]).run(quick=args.quick)
+        for r in suite_results:
+            r["suite"] = name
+        print_results(suite_results)
+        results.extend(suite_results)
+
+    write_results(args.output, results)
+    print(f"wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
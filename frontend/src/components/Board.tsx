@@ -1,7 +1,7 @@
 
 import React, { useEffect, useState, useRef } from 'react';
 import { io } from 'socket.io-client';
-import type { BoardData, GameState as GameStateType } from '../types';
+import type { BoardData, GameLog, GameState as GameStateType, PrivateState, RoleInfo } from '../types';
 import { Hexagon } from './Hexagon';
 import { VertexNode } from './VertexNode';
 import { EdgeLine } from './EdgeLine';
@@ -11,11 +11,23 @@ import { Controls } from './Controls';
 import { normalizeVertex, normalizeEdge } from '../utils/coords';
 
 const SOCKET_URL = 'http://localhost:8000'; // Or generic / if proxied
+const MAX_LOGS = 50; // Same as backend MAX_LOGS
+const PARAMS = new URLSearchParams(window.location.search);
+const ROOM = PARAMS.get('room') || 'default';
+// The table (every hand visible) needs a hot-seat server or ?token=<admin token>;
+// otherwise the server demotes us to spectator
+const ROLE = PARAMS.get('role') || 'table';
 
 export const Board: React.FC = () => {
     const [boardData, setBoardData] = useState<BoardData | null>(null);
     const [gameState, setGameState] = useState<GameStateType | null>(null);
+    // Our own hand when seated as a player (the public game_state has card counts only)
+    const [privateState, setPrivateState] = useState<PrivateState | null>(null);
+    const [role, setRole] = useState<RoleInfo | null>(null);
+    const [logs, setLogs] = useState<GameLog[]>([]);
     const [connectionStatus, setConnectionStatus] = useState('Connecting...');
+    // Worker hosting our room; changes when a cluster redirects us
+    const [serverUrl, setServerUrl] = useState(SOCKET_URL);
     const [containerWidth, setContainerWidth] = useState(window.innerWidth);
     const [buildMode, setBuildMode] = useState<'road' | 'settlement' | 'city' | null>(null);
 
@@ -23,8 +35,9 @@ export const Board: React.FC = () => {
     const socketRef = useRef<any>(null);
 
     useEffect(() => {
-        const socket = io(SOCKET_URL, {
-            transports: ['websocket', 'polling']
+        const socket = io(serverUrl, {
+            transports: ['websocket', 'polling'],
+            query: { room: ROOM, role: ROLE, ...(PARAMS.get('color') ? { color: PARAMS.get('color') } : {}), ...(PARAMS.get('token') ? { token: PARAMS.get('token') } : {}) }
         });
         socketRef.current = socket;
 
@@ -33,24 +46,54 @@ export const Board: React.FC = () => {
             setConnectionStatus('Connected!');
         });
 
-        socket.on('connect_error', (err) => {
+        socket.on('connect_error', (err: any) => {
+            // Sharded server: the room lives on another worker
+            if (err.data?.redirect) {
+                setServerUrl(err.data.redirect);
+                return;
+            }
             console.error('Connection error:', err);
             setConnectionStatus(`Error: ${err.message} `);
         });
 
+        socket.on('room_moved', (data: { room: string, url: string }) => {
+            setConnectionStatus('Moving room...');
+            setServerUrl(data.url);
+        });
+
         socket.on('board_state', (data: BoardData) => {
             setBoardData(data);
         });
 
+        socket.on('role', (data: RoleInfo) => {
+            setRole(data);
+            if (data.role !== 'player') {
+                setPrivateState(null);
+            }
+        });
+
         socket.on('game_state', (data: GameStateType) => {
             console.log('Game State:', data);
             setGameState(data);
         });
 
+        socket.on('private_state', (data: PrivateState) => {
+            setPrivateState(data);
+        });
+
+        // Full backlog on (re)connect, then only new entries
+        socket.on('log_history', (entries: GameLog[]) => {
+            setLogs(entries);
+        });
+
+        socket.on('game_log', (entries: GameLog[]) => {
+            setLogs(prev => [...prev, ...entries].slice(-MAX_LOGS));
+        });
+
         return () => {
             socket.disconnect();
         };
-    }, []);
+    }, [serverUrl]);
 
     useEffect(() => {
         const handleResize = () => setContainerWidth(window.innerWidth);
@@ -76,9 +119,11 @@ export const Board: React.FC = () => {
 
     // Let's assume I replace the imports and the handle functions first.
 
+    // Board radius (2 for the standard board); larger custom maps scale down
+    const radius = boardData.radius ?? 2;
     const displayWidth = Math.min(containerWidth, 800) * 0.95;
-    const hexSize = displayWidth / (5 * Math.sqrt(3));
-    const boardHeight = 6 * hexSize + 2 * hexSize;
+    const hexSize = displayWidth / ((2 * radius + 1) * Math.sqrt(3));
+    const boardHeight = (3 * radius + 2) * hexSize;
 
     // Helper to get pixel coordinates of a hex center
     const getHexCenter = (q: number, r: number) => {
@@ -91,7 +136,15 @@ export const Board: React.FC = () => {
     const uniqueVertices = new Map<string, { q: number, r: number, c: number, x: number, y: number }>();
     const uniqueEdges = new Map<string, { q: number, r: number, e: number, x: number, y: number, rotation: number }>();
 
-    if (boardData) {
+    if (boardData.geometry) {
+        // Positions come precomputed from the server; just scale them
+        for (const [q, r, c, x, y] of boardData.geometry.vertices) {
+            uniqueVertices.set(`${q},${r},${c}`, { q, r, c, x: x * hexSize, y: y * hexSize });
+        }
+        for (const [q, r, e, x, y, rotation] of boardData.geometry.edges) {
+            uniqueEdges.set(`${q},${r},${e}`, { q, r, e, x: x * hexSize, y: y * hexSize, rotation });
+        }
+    } else {
         boardData.hexes.forEach(hex => {
             const center = getHexCenter(hex.q, hex.r);
 
@@ -208,6 +261,15 @@ export const Board: React.FC = () => {
                                 {gameState.players[gameState.current_turn_index]}
                             </span></div>
                             <div>Phase: {gameState.phase}</div>
+                            {role?.role === 'player' && (
+                                <div>You: <span className="font-bold capitalize">{role.color}</span></div>
+                            )}
+                        </div>
+                    )}
+                    {role && role.role !== role.requested && (
+                        <div className="mt-2 text-sm text-red-700 max-w-xs">
+                            Watching as a spectator: the {role.requested} view needs a hot-seat server
+                            (CATAN_HOTSEAT=1) or an admin token. Use ?role=player&amp;color=red to take a seat.
                         </div>
                     )}
                 </div>
@@ -217,12 +279,14 @@ export const Board: React.FC = () => {
                 <>
                     <Controls
                         gameState={gameState}
+                        privateState={privateState}
+                        readOnly={role?.role === 'spectator'}
                         onRollDice={handleRollDice}
                         onEndTurn={handleEndTurn}
                         onSetBuildMode={setBuildMode}
                         onTestResources={handleTestResources}
                     />
-                    <PlayerInfo gameState={gameState} />
+                    <PlayerInfo gameState={gameState} privateState={privateState} />
 
 
 
@@ -230,7 +294,7 @@ export const Board: React.FC = () => {
 
                     {/* Game Logs */}
                     <div className="absolute top-20 left-4 z-40 bg-black/50 text-white p-2 rounded max-h-48 overflow-y-auto w-64 text-xs pointer-events-none">
-                        {gameState.logs && gameState.logs.slice().reverse().map((log, i) => (
+                        {logs.slice().reverse().map((log, i) => (
                             <div key={i} className="mb-1 border-b border-white/20 pb-1">
                                 <span className="font-bold capitalize text-yellow-300">{log.player_color || 'System'}: </span>
                                 <span>{log.message}</span>
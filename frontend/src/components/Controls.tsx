@@ -1,8 +1,12 @@
 import React from 'react';
-import type { GameState } from '../types';
+import type { GameState, PrivateState } from '../types';
 
 interface ControlsProps {
     gameState: GameState;
+    // Set when seated as a player: our hand and what it affords
+    privateState?: PrivateState | null;
+    // Spectators can't act
+    readOnly?: boolean;
     onRollDice: () => void;
     onEndTurn?: () => void;
     onSetBuildMode?: (mode: 'road' | 'settlement' | 'city' | null) => void;
@@ -10,18 +14,25 @@ interface ControlsProps {
 }
 
 export const Controls: React.FC<ControlsProps> = (props) => {
-    const { gameState, onRollDice } = props;
+    const { gameState, privateState, readOnly, onRollDice } = props;
+    const currentColor = gameState.players[gameState.current_turn_index];
+    // A seated player only acts on their own turn; the table plays every seat
+    const myTurn = !readOnly && (!privateState || privateState.color === currentColor);
     // Determine if actions are allowed
-    const isGameLoop = gameState.phase === "GAME_LOOP";
+    const isGameLoop = gameState.phase === "GAME_LOOP" && myTurn;
     const subPhase = gameState.turn_sub_phase;
     const canRoll = isGameLoop && (subPhase === "ROLL_DICE" || !subPhase); // Default to roll if null for safety
 
-    const myColor = gameState.players[gameState.current_turn_index]; // Assumption: client will identify itself later. For now, strictly UI based.
-    const myInventory = gameState.inventories[myColor] || {};
-
-    const canBuildRoad = (myInventory['lumber'] >= 1 && myInventory['brick'] >= 1);
-    const canBuildSettlement = (myInventory['lumber'] >= 1 && myInventory['brick'] >= 1 && myInventory['wool'] >= 1 && myInventory['grain'] >= 1);
-    const canBuildCity = (myInventory['grain'] >= 2 && myInventory['ore'] >= 3);
+    let canBuildRoad: boolean, canBuildSettlement: boolean, canBuildCity: boolean;
+    if (privateState) {
+        // The server checks the hand against the room's rules
+        ({ road: canBuildRoad, settlement: canBuildSettlement, city: canBuildCity } = privateState.can_afford);
+    } else {
+        const myInventory = gameState.inventories?.[currentColor] || {};
+        canBuildRoad = (myInventory['lumber'] >= 1 && myInventory['brick'] >= 1);
+        canBuildSettlement = (myInventory['lumber'] >= 1 && myInventory['brick'] >= 1 && myInventory['wool'] >= 1 && myInventory['grain'] >= 1);
+        canBuildCity = (myInventory['grain'] >= 2 && myInventory['ore'] >= 3);
+    }
 
     return (
         <div className="absolute top-4 right-4 z-50 flex flex-col items-end gap-2">
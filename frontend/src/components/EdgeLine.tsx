@@ -16,6 +16,8 @@ const playerColors: Record<PlayerColor, string> = {
     [PlayerColor.BLUE]: '#3B82F6',
     [PlayerColor.ORANGE]: '#F97316',
     [PlayerColor.WHITE]: '#F8FAFC',
+    [PlayerColor.GREEN]: '#22C55E',
+    [PlayerColor.BROWN]: '#92400E',
 };
 
 export const EdgeLine: React.FC<EdgeLineProps> = ({ x, y, rotation, length, road, onClick }) => {
@@ -1,10 +1,11 @@
 import React from 'react';
 import { PlayerColor, ResourceType } from '../types';
-import type { GameState } from '../types';
+import type { GameState, PrivateState } from '../types';
 
 interface PlayerInfoProps {
     gameState: GameState;
-    myColor?: PlayerColor; // Future use if we identify 'me'
+    // Our own hand when seated; other players only show card counts
+    privateState?: PrivateState | null;
 }
 
 const playerHexColors: Record<PlayerColor, string> = {
@@ -12,14 +13,16 @@ const playerHexColors: Record<PlayerColor, string> = {
     [PlayerColor.BLUE]: '#3B82F6',
     [PlayerColor.ORANGE]: '#F97316',
     [PlayerColor.WHITE]: '#F8FAFC',
+    [PlayerColor.GREEN]: '#22C55E',
+    [PlayerColor.BROWN]: '#92400E',
 };
 
-export const PlayerInfo: React.FC<PlayerInfoProps> = ({ gameState }) => {
+export const PlayerInfo: React.FC<PlayerInfoProps> = ({ gameState, privateState }) => {
     return (
         <div className="absolute bottom-4 left-4 right-4 z-50 flex justify-between gap-4 pointer-events-none">
             {gameState.players.map(p => {
-                const inv = gameState.inventories[p] || {};
-                const totalCards = Object.values(inv).reduce((a, b) => a + b, 0);
+                const inv = gameState.inventories?.[p] || (privateState?.color === p ? privateState.hand : {});
+                const totalCards = gameState.card_counts?.[p] ?? Object.values(inv).reduce((a, b) => a + b, 0);
                 const isCurrentTurn = p === gameState.players[gameState.current_turn_index];
 
                 return (
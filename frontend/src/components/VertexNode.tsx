@@ -14,6 +14,8 @@ const playerColors: Record<PlayerColor, string> = {
     [PlayerColor.BLUE]: '#3B82F6',
     [PlayerColor.ORANGE]: '#F97316',
     [PlayerColor.WHITE]: '#F8FAFC',
+    [PlayerColor.GREEN]: '#22C55E',
+    [PlayerColor.BROWN]: '#92400E',
 };
 
 export const VertexNode: React.FC<VertexNodeProps> = ({ x, y, building, onClick }) => {
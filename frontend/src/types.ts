@@ -22,6 +22,9 @@ export const PlayerColor = {
     BLUE: "blue",
     ORANGE: "orange",
     WHITE: "white",
+    // 5-6 player extension
+    GREEN: "green",
+    BROWN: "brown",
 } as const;
 
 export type PlayerColor = typeof PlayerColor[keyof typeof PlayerColor];
@@ -61,13 +64,40 @@ export interface GameState {
     phase: string;
     buildings: Building[];
     roads: Road[];
-    inventories: Record<PlayerColor, Record<ResourceType, number>>;
+    // Only in the full (table) view; players and spectators get card_counts
+    inventories?: Record<PlayerColor, Record<ResourceType, number>>;
+    card_counts?: Record<PlayerColor, number>;
     last_dice_result: number | null;
     turn_sub_phase: string | null;
-    logs: GameLog[];
+    // 64-bit Zobrist hash as 16 hex digits (backend/zobrist.py); compare with the 'state_hash' ack
+    hash?: string;
+    // logs are streamed separately via 'log_history' / 'game_log'
     // active_trade removed for revert
 }
 
+// 'private_state': a seated player's own hand (backend/views.py private_frame)
+export interface PrivateState {
+    color: PlayerColor;
+    hand: Record<ResourceType, number>;
+    can_afford: Record<'road' | 'settlement' | 'city', boolean>;
+}
+
+// 'role': what the server granted; `requested` differs when a table request was demoted
+export interface RoleInfo {
+    role: 'table' | 'player' | 'spectator';
+    requested: string;
+    color: PlayerColor | null;
+}
+
+// Render positions for a hex size of 1 (backend/topology.py board_geometry)
+export interface BoardGeometry {
+    hexes: [number, number, number, number][]; // q, r, x, y
+    vertices: [number, number, number, number, number][]; // q, r, c, x, y
+    edges: [number, number, number, number, number, number][]; // q, r, e, x, y, rotation
+}
+
 export interface BoardData {
     hexes: Hex[];
+    radius?: number;
+    geometry?: BoardGeometry;
 }
@@ -0,0 +1,42 @@
+"""Crash recovery and concurrent reads of the game archive."""
+from backend.archive import GameArchive
+
+
+def record(i, players=("alice", "bob")):
+    return {"room": None, "started_at": i, "finished_at": float(i), "colors": ["red", "blue"],
+            "players": list(players), "winner": "red", "actions": [], "final": {}}
+
+
+def test_torn_player_name_is_cut_off(tmp_path):
+    archive = GameArchive(str(tmp_path), fsync=False)
+    archive.append(record(0))
+    archive.close()
+    # Crash after writing part of a new name, before its index entry
+    with open(tmp_path / "players.txt", "a", encoding="utf-8") as f:
+        f.write("car")
+
+    archive = GameArchive(str(tmp_path), fsync=False)
+    assert len(archive) == 1 and archive.names == ["alice", "bob"]
+    archive.append(record(1, ("carol", "bob")))
+    assert archive.query(player="carol")["games"][0]["players"] == ["carol", "bob"]
+    archive.close()
+    assert (tmp_path / "players.txt").read_text() == "alice\nbob\ncarol\n"
+
+
+def test_remap_keeps_maps_that_readers_hold(tmp_path):
+    archive = GameArchive(str(tmp_path), fsync=False)
+    archive.append(record(0))
+    segment, offset, length = archive.entries[0][:3]
+    held = archive._view(segment, offset, length)  # a reader still decompressing
+    before = bytes(held)
+
+    archive.append(record(1))
+    assert archive.read(1)["started_at"] == 1  # remaps the grown segment
+    assert bytes(held) == before
+    assert len(archive._retired) == 1
+
+    held.release()
+    archive.append(record(2))
+    assert archive.read(2)["started_at"] == 2
+    assert archive._retired == []  # closed once nobody held it
+    archive.close()
@@ -0,0 +1,28 @@
+import random
+
+from backend.bots import GreedyBot
+from backend.game_logic import GameManager
+
+
+def game_in_loop(seed=2):
+    gm = GameManager(rng=random.Random(seed))
+    bots = [GreedyBot(c, gm.rng) for c in gm.state.players]
+    while gm.state.phase != "GAME_LOOP":
+        bots[gm.state.current_turn_index].place_initial(gm)
+    return gm
+
+
+def test_roll_must_end_the_batch():
+    gm = game_in_loop()
+    rng, version = gm.rng.getstate(), gm.version
+    ok, results = gm.apply_actions([{"type": "roll_dice"}, {"type": "build_city", "q": 0, "r": 0, "corner": 0}])
+    assert (ok, results) == (False, [])
+    # Nothing ran, so the dice can't be re-rolled by retrying
+    assert gm.rng.getstate() == rng and gm.version == version
+
+
+def test_roll_as_last_action_commits():
+    gm = game_in_loop()
+    ok, results = gm.apply_actions([{"type": "roll_dice"}])
+    assert ok and 2 <= results[0] <= 12
+    assert gm.state.turn_sub_phase == "BUILD_TRADE"
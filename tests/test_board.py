@@ -0,0 +1,45 @@
+"""GET /api/board: conditional requests, gzip, and a new board per game."""
+import asyncio
+import json
+import random
+
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.game_logic import GameManager
+
+PLAIN = {"Accept-Encoding": "identity"}
+
+
+def test_board_is_served_cached_and_compressed():
+    room = main.rooms.adopt("board-http", GameManager(rng=random.Random(3)))
+    client = TestClient(main.fastapi_app)
+    url = "/api/board?room=board-http"
+
+    plain = client.get(url, headers=PLAIN)
+    assert plain.status_code == 200
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["cache-control"] == "no-cache" and "Accept-Encoding" in plain.headers["vary"]
+    assert plain.json() == room.board_view.data()
+    assert plain.json()["hexes"] == json.loads(room.game.board.model_dump_json())["hexes"]
+    etag = plain.headers["etag"]
+
+    assert client.get(url, headers={**PLAIN, "If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={**PLAIN, "If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get(url, headers={**PLAIN, "If-None-Match": '"stale"'}).status_code == 200
+
+    gzipped = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert int(gzipped.headers["content-length"]) < len(plain.content)
+    assert gzipped.json() == plain.json() and gzipped.headers["etag"] == etag
+
+    asyncio.run(main.next_game(room))
+    fresh = client.get(url, headers={**PLAIN, "If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert fresh.json() == room.board_view.data()
+    main.rooms.drop("board-http")
+
+
+def test_unknown_room_is_404():
+    assert TestClient(main.fastapi_app).get("/api/board?room=nowhere").status_code == 404
@@ -0,0 +1,181 @@
+"""Shared frames for spectators, and per-client queues that hold back
+frames for clients that fall behind."""
+import asyncio
+
+from backend.broadcast import HIGH_WATER, ClientQueues, SpectatorFanout
+
+
+class FakeSocket:
+    def __init__(self):
+        self.closed = False
+        self.queue = asyncio.Queue()
+
+
+class FakeEio:
+    def __init__(self):
+        self.sockets = {}
+
+    async def send_packet(self, eio_sid, frame):
+        self.sockets[eio_sid].queue.put_nowait(frame)
+
+
+class FakeManager:
+    def __init__(self):
+        self.rooms = {}
+
+    def get_participants(self, namespace, room):
+        return [(sid, f"eio-{sid}") for sid in self.rooms.get(room, ())]
+
+    def eio_sid_from_sid(self, sid, namespace):
+        return f"eio-{sid}"
+
+
+class FakeSio:
+    def __init__(self):
+        self.eio = FakeEio()
+        self.manager = FakeManager()
+
+    def connect(self, sid):
+        self.eio.sockets[f"eio-{sid}"] = FakeSocket()
+
+    async def enter_room(self, sid, room):
+        self.manager.rooms.setdefault(room, set()).add(sid)
+
+
+class FakeGame:
+    def __init__(self):
+        self.version = 0
+
+
+class FakeViews:
+    """One encoded public frame per (game, version), like StateViews."""
+
+    def __init__(self, game):
+        self.game_manager = game
+
+    @property
+    def version(self):
+        return self.game_manager.version
+
+    def public_frame(self):
+        return (id(self.game_manager), self.version)
+
+
+def received(sio, sid):
+    sock = sio.eio.sockets[f"eio-{sid}"]
+    frames = []
+    while not sock.queue.empty():
+        frames.append(sock.queue.get_nowait())
+        sock.queue.task_done()
+    return frames
+
+
+def test_spectators_share_one_frame_per_version():
+    async def run():
+        sio = FakeSio()
+        fanout = SpectatorFanout(sio, max_rate=0)
+        game = FakeGame()
+        views = FakeViews(game)
+        for sid in ("a", "b"):
+            sio.connect(sid)
+            await fanout.add(sid, views)
+        assert fanout.is_spectator("a") and received(sio, "a") == [(id(game), 0)]
+        received(sio, "b")
+
+        game.version = 1
+        await fanout.publish(views)
+        # Nothing new: no second copy
+        await fanout.publish(views)
+        assert received(sio, "a") == received(sio, "b") == [(id(game), 1)]
+
+    asyncio.run(run())
+
+
+def test_spectator_rate_limit_sends_only_the_latest():
+    async def run():
+        sio = FakeSio()
+        fanout = SpectatorFanout(sio, max_rate=20)
+        sio.connect("a")
+        game = FakeGame()
+        views = FakeViews(game)
+        await fanout.add("a", views)
+        received(sio, "a")
+
+        game.version = 1
+        await fanout.publish(views)
+        # Inside the window: held back and coalesced into one flush
+        for version in (2, 3, 4):
+            game.version = version
+            await fanout.publish(views)
+        assert received(sio, "a") == [(id(game), 1)]
+        await asyncio.sleep(fanout.interval * 2)
+        assert received(sio, "a") == [(id(game), 4)]
+
+    asyncio.run(run())
+
+
+def test_spectators_get_the_next_game_even_at_the_same_version():
+    async def run():
+        sio = FakeSio()
+        fanout = SpectatorFanout(sio, max_rate=0)
+        sio.connect("a")
+        old = FakeGame()
+        old.version = 3
+        await fanout.add("a", FakeViews(old))
+        await fanout.publish(FakeViews(old))
+        received(sio, "a")
+
+        # A new game in the room starts over at version 0..3
+        new = FakeGame()
+        new.version = 3
+        await fanout.publish(FakeViews(new))
+        assert received(sio, "a") == [(id(new), 3)]
+
+    asyncio.run(run())
+
+
+def test_clients_below_high_water_are_sent_to_directly():
+    async def run():
+        sio = FakeSio()
+        sio.connect("c")
+        queues = ClientQueues(sio)
+        for i in range(HIGH_WATER):
+            await queues.send("eio-c", f"log{i}")
+        assert not queues.outboxes
+        # One more than the transport may hold: the client is behind
+        await queues.send("eio-c", "late")
+        assert "eio-c" in queues.outboxes
+        assert received(sio, "c") == [f"log{i}" for i in range(HIGH_WATER)]
+        await asyncio.sleep(0)
+        assert received(sio, "c") == ["late"]
+
+    asyncio.run(run())
+
+
+def test_keyed_frames_coalesce_per_key():
+    async def run():
+        sio = FakeSio()
+        sio.connect("c")
+        queues = ClientQueues(sio, high_water=0)
+        for i in range(3):
+            await queues.send("eio-c", f"state{i}", key="game_state")
+            await queues.send("eio-c", f"private{i}", key="private_state")
+        assert queues.coalesced == 4 and queues.dropped == 0
+        await asyncio.sleep(0)
+        assert received(sio, "c") == ["state2", "private2"]
+
+    asyncio.run(run())
+
+
+def test_keyless_frames_are_capped_oldest_first():
+    async def run():
+        sio = FakeSio()
+        sio.connect("c")
+        queues = ClientQueues(sio, max_depth=3, high_water=0)
+        for i in range(5):
+            await queues.send("eio-c", f"log{i}")
+        assert queues.dropped == 2 and queues.coalesced == 0
+        await asyncio.sleep(0)
+        assert received(sio, "c") == ["log2", "log3", "log4"]
+
+    asyncio.run(run())
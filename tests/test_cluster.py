@@ -0,0 +1,222 @@
+"""Two cluster workers in one process, talking over a shared LocalHub."""
+import asyncio
+
+import pytest
+
+from backend.bus import LocalBus, LocalHub
+from backend.cluster import ClusterNode, create_router
+from backend.game_logic import GameManager
+from backend.rooms import RoomRegistry
+from backend.sharding import HashRing
+
+ROOMS = [f"room-{i}" for i in range(40)]
+ADMIN = {"Authorization": "Bearer secret"}
+
+
+class FakeSio:
+    """Records what a worker would tell its clients."""
+
+    def __init__(self):
+        self.emitted = []
+        self.disconnected = []
+
+    async def emit(self, event, data=None, to=None):
+        self.emitted.append((event, data, to))
+
+    async def disconnect(self, sid):
+        self.disconnected.append(sid)
+
+
+def make_node(worker_id, workers, hub):
+    sio = FakeSio()
+    registry = RoomRegistry(sio)
+    node = ClusterNode(worker_id, workers, LocalBus(worker_id, hub), registry, sio)
+    asyncio.run(node.start())
+    return node
+
+
+def test_routing_agrees_between_workers():
+    workers = {"w0": "http://w0", "w1": "http://w1"}
+    hub = LocalHub()
+    a, b = make_node("w0", workers, hub), make_node("w1", workers, hub)
+    for room_id in ROOMS:
+        assert a.owns(room_id) != b.owns(room_id)
+        assert a.url_for(room_id) == b.url_for(room_id) == workers[a.owner(room_id)]
+
+
+def test_join_hands_rooms_over_and_redirects_clients():
+    hub = LocalHub()
+    a = make_node("w0", {"w0": "http://w0"}, hub)
+    games = {}
+    for room_id in ROOMS:
+        room = a.registry.get_or_create(room_id)
+        room.game.build_settlement(0, 0, 0)
+        a.registry.join(f"sid-{room_id}", room)
+        games[room_id] = (room.game.version, room.game.zobrist)
+
+    both = {"w0": "http://w0", "w1": "http://w1"}
+    b = make_node("w1", both, hub)
+    asyncio.run(a.handle({"type": "join", "worker": "w1", "url": "http://w1"}))
+
+    moved = [r for r in ROOMS if a.owner(r) == "w1"]
+    assert moved and len(moved) < len(ROOMS)
+    for room_id in ROOMS:
+        owner, other = (b, a) if room_id in moved else (a, b)
+        assert owner.registry.get(room_id) is not None
+        assert other.registry.get(room_id) is None
+        # Same game on the new owner
+        game = owner.registry.get(room_id).game
+        assert (game.version, game.zobrist) == games[room_id]
+
+    assert sorted(to for event, _, to in a.sio.emitted if event == "room_moved") == sorted(moved)
+    assert all(data["url"] == "http://w1" for event, data, _ in a.sio.emitted if event == "room_moved")
+    assert sorted(a.sio.disconnected) == sorted(f"sid-{r}" for r in moved)
+    assert all(a.registry.room_of(f"sid-{r}") is None for r in moved)
+
+
+def test_leave_moves_rooms_back():
+    both = {"w0": "http://w0", "w1": "http://w1"}
+    hub = LocalHub()
+    a, b = make_node("w0", both, hub), make_node("w1", both, hub)
+    for room_id in ROOMS:
+        (a if a.owns(room_id) else b).registry.get_or_create(room_id)
+
+    for node in (b, a):  # the leaving worker first, as the router does
+        asyncio.run(node.handle({"type": "leave", "worker": "w1"}))
+
+    assert sorted(a.registry.rooms) == sorted(ROOMS)
+    assert not b.registry.rooms
+    assert all(isinstance(room.game, GameManager) for room in a.registry.rooms.values())
+
+
+class ActingBus(LocalBus):
+    """Lets a client try a move while a room transfer is on the wire."""
+
+    def __init__(self, worker_id, hub, during_send):
+        super().__init__(worker_id, hub)
+        self.during_send = during_send
+
+    async def send(self, worker_id, message):
+        if message["type"] == "room_transfer":
+            self.during_send()
+        await super().send(worker_id, message)
+
+
+class FailingBus(LocalBus):
+    async def send(self, worker_id, message):
+        raise ConnectionError("bus down")
+
+
+def test_moves_during_hand_over_are_not_lost():
+    hub = LocalHub()
+    both = {"w0": "http://w0", "w1": "http://w1"}
+    room_id = next(r for r in ROOMS if HashRing(both).owner(r) == "w1")
+    sio = FakeSio()
+    registry = RoomRegistry(sio)
+    room = registry.get_or_create(room_id)
+    registry.join("sid-a", room)
+    accepted = []
+
+    def act():
+        # What players_only does: only sids that still have a room may act
+        acting = registry.room_of("sid-a")
+        if acting is not None:
+            accepted.append(acting.game.build_settlement(0, 0, 0))
+
+    a = ClusterNode("w0", {"w0": "http://w0"}, ActingBus("w0", hub, act), registry, sio)
+    asyncio.run(a.start())
+    b = make_node("w1", both, hub)
+    asyncio.run(a.handle({"type": "join", "worker": "w1", "url": "http://w1"}))
+
+    moved = b.registry.get(room_id)
+    assert moved is not None and registry.get(room_id) is None
+    # Either the move was refused, or the new owner has it
+    assert (moved.game.version, moved.game.zobrist) == (room.game.version, room.game.zobrist)
+    assert accepted == []
+
+
+def test_failed_hand_over_keeps_the_room():
+    hub = LocalHub()
+    sio = FakeSio()
+    registry = RoomRegistry(sio)
+    a = ClusterNode("w0", {"w0": "http://w0"}, FailingBus("w0", hub), registry, sio)
+    asyncio.run(a.start())
+    room_id = next(r for r in ROOMS if HashRing({"w0": "", "w1": ""}).owner(r) == "w1")
+    room = registry.get_or_create(room_id, client="1.2.3.4")
+    registry.join("sid-a", room, color="Red")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(a.handle({"type": "join", "worker": "w1", "url": "http://w1"}))
+
+    assert registry.get(room_id) is room
+    assert registry.room_of("sid-a") is room and registry.seat_of["sid-a"] == "Red"
+    assert registry.opened_by["1.2.3.4"] == 1
+    assert a.workers == {"w0": "http://w0"} and a.owns(room_id)
+    assert not sio.emitted and not sio.disconnected
+
+
+def router_client(hub, workers, token="secret"):
+    from fastapi.testclient import TestClient
+    return TestClient(create_router(workers, LocalBus("router", hub), admin_token=token))
+
+
+def test_router_membership_needs_the_admin_token():
+    hub = LocalHub()
+    make_node("w0", {"w0": "http://w0"}, hub)
+    client = router_client(hub, {"w0": "http://w0"})
+    worker = {"id": "w1", "url": "http://w1"}
+    assert client.post("/api/cluster/workers", json=worker).status_code == 401
+    assert client.post("/api/cluster/workers", json=worker, headers={"Authorization": "Bearer nope"}).status_code == 401
+    assert client.delete("/api/cluster/workers/w0").status_code == 401
+    assert router_client(hub, {"w0": "http://w0"}, token="").delete("/api/cluster/workers/w0").status_code == 404
+    assert client.get("/api/cluster").json() == {"workers": {"w0": "http://w0"}}
+
+
+def test_router_rejects_worker_ids_unfit_for_a_socket_path():
+    hub = LocalHub()
+    make_node("w0", {"w0": "http://w0"}, hub)
+    client = router_client(hub, {"w0": "http://w0"})
+    for bad in ["../../etc/evil", "a/b", "", "x" * 65]:
+        response = client.post("/api/cluster/workers", json={"id": bad, "url": "http://x"}, headers=ADMIN)
+        assert response.status_code == 422, bad
+    assert client.get("/api/cluster").json() == {"workers": {"w0": "http://w0"}}
+
+
+def test_router_adds_and_removes_workers():
+    hub = LocalHub()
+    both = {"w0": "http://w0", "w1": "http://w1"}
+    a = make_node("w0", {"w0": "http://w0"}, hub)
+    b = make_node("w1", both, hub)
+    for room_id in ROOMS:
+        a.registry.get_or_create(room_id)
+    client = router_client(hub, {"w0": "http://w0"})
+
+    assert client.post("/api/cluster/workers", json={"id": "w1", "url": "http://w1"}, headers=ADMIN).json() == {"workers": both}
+    moved = [r for r in ROOMS if client.get(f"/api/rooms/{r}/route").json()["worker"] == "w1"]
+    assert moved and sorted(b.registry.rooms) == sorted(moved)
+
+    assert client.delete("/api/cluster/workers/w1", headers=ADMIN).json() == {"workers": {"w0": "http://w0"}}
+    assert sorted(a.registry.rooms) == sorted(ROOMS) and not b.registry.rooms
+
+
+def test_router_rolls_back_a_join_that_fails():
+    hub = LocalHub()
+    nodes = [make_node(w, {"w0": "http://w0", "w1": "http://w1"}, hub) for w in ("w0", "w1")]
+    for room_id in ROOMS:
+        (nodes[0] if nodes[0].owns(room_id) else nodes[1]).registry.get_or_create(room_id)
+    before = {node.worker_id: sorted(node.registry.rooms) for node in nodes}
+    three = {"w0": "http://w0", "w1": "http://w1", "w2": "http://w2"}
+    newcomer = make_node("w2", three, hub)
+
+    async def broken(message):
+        raise ConnectionError("w1 is down")
+    hub.handlers["w1"] = broken  # w0 hands its rooms over, then w1 fails
+
+    client = router_client(hub, {"w0": "http://w0", "w1": "http://w1"})
+    response = client.post("/api/cluster/workers", json={"id": "w2", "url": "http://w2"}, headers=ADMIN)
+    assert response.status_code == 502
+    assert client.get("/api/cluster").json() == {"workers": {"w0": "http://w0", "w1": "http://w1"}}
+    # Whatever w2 got went back to w0, and w0 is back on the old ring
+    assert not newcomer.registry.rooms
+    assert sorted(nodes[0].registry.rooms) == before["w0"]
+    assert nodes[0].workers == {"w0": "http://w0", "w1": "http://w1"}
@@ -0,0 +1,90 @@
+"""Forecasts against numbers worked out by hand."""
+import random
+from fractions import Fraction
+
+import pytest
+
+from backend.forecast import DICE_PROB, MODELS, AffordabilityModel, Forecaster, models_for
+from backend.game_logic import GameManager, normalize_vertex
+from backend.models import ResourceType
+from backend.rules import RuleSet
+
+
+def per_roll(by_number):
+    """[(probability, cards)] for every dice total, as Forecaster passes it."""
+    return [(DICE_PROB[n], by_number.get(n, {})) for n in DICE_PROB]
+
+
+# 6 pays lumber and brick, 8 pays lumber, 5 pays brick
+PAYOUTS = per_roll({6: {"lumber": 1, "brick": 1}, 8: {"lumber": 1}, 5: {"brick": 1}})
+
+
+def one_settlement(rules=None):
+    """A game whose only building is red's settlement on an 8 ore, an 8 grain
+    and a 5 lumber hex; every other hex pays nothing."""
+    gm = GameManager(rng=random.Random(0), rules=rules)
+    v = normalize_vertex(0, 0, 0)
+    for h in gm.board.hexes:
+        h.number = None
+    for (q, r), (res, number) in zip(gm.topology.vertex_hexes[v], [("ore", 8), ("grain", 8), ("lumber", 5)]):
+        gm.hex_at[(q, r)].resource, gm.hex_at[(q, r)].number = ResourceType(res), number
+    assert gm.build_settlement(*v)
+    return gm, gm.state.players[0].value
+
+
+def test_payouts_of_a_single_settlement():
+    gm, red = one_settlement()
+    forecaster = Forecaster(gm)
+    assert forecaster.payouts()[red] == {8: {"ore": 1, "grain": 1}, 5: {"lumber": 1}}
+    assert all(not table for color, table in forecaster.payouts().items() if color != red)
+
+    result = forecaster.forecast(red, turns=1)
+    assert result["income_per_roll"]["ore"] == pytest.approx(5 / 36)
+    assert result["income_per_roll"]["lumber"] == pytest.approx(4 / 36)
+    assert result["income_per_roll"]["brick"] == 0
+    # Four players, so a turn is four rolls
+    assert result["income_per_turn"]["grain"] == pytest.approx(4 * 5 / 36)
+
+
+def test_road_curve_matches_the_hand_computed_odds():
+    road = AffordabilityModel({"lumber": 1, "brick": 1})
+    # Nothing in hand: afford after one roll only on a 6; after two, also 8 then 5 or 5 then 8
+    none = Fraction(31, 36)
+    expected = [Fraction(5, 36), 1 - none ** 2 + 2 * Fraction(5, 36) * Fraction(4, 36)]
+    assert road.curve({}, PAYOUTS, 1, 2) == pytest.approx([float(p) for p in expected])
+    # Holding a lumber, any brick (a 6 or a 5) will do
+    assert road.curve({"lumber": 1}, PAYOUTS, 1, 3) == pytest.approx([1 - (27 / 36) ** k for k in (1, 2, 3)])
+    assert road.curve({"lumber": 1, "brick": 5}, PAYOUTS, 1, 1) == pytest.approx([1.0])
+
+
+def test_city_curve_counts_cards_per_roll():
+    city = AffordabilityModel({"grain": 2, "ore": 3})
+    # A city on the 8 pays two of each, so one 8 finishes the hand
+    payouts = per_roll({8: {"grain": 2, "ore": 2}})
+    assert city.curve({"grain": 1, "ore": 1}, payouts, 1, 2) == pytest.approx([5 / 36, 1 - (31 / 36) ** 2])
+    # Two rounds of two rolls: needs two 8s out of four rolls
+    p = 5 / 36
+    at_least_two = 1 - (1 - p) ** 4 - 4 * p * (1 - p) ** 3
+    assert city.curve({}, payouts, 2, 2)[1] == pytest.approx(at_least_two)
+
+
+def test_forecast_uses_the_games_costs():
+    cheap = RuleSet({"costs": {"road": {"lumber": 2}, "city": {"grain": 1, "ore": 1}}})
+    gm, red = one_settlement(cheap)
+    gm.state.inventories[red].update({ResourceType.LUMBER: 2, ResourceType.GRAIN: 1, ResourceType.ORE: 1})
+    afford = Forecaster(gm).forecast(red, turns=1)["afford"]
+    assert afford["road"] == pytest.approx([1.0]) and afford["city"] == pytest.approx([1.0])
+
+    models = models_for(cheap)
+    for name, model in models.items():
+        assert dict(zip(model.resources, model.caps)) == cheap.cost_dicts[name]
+    # Standard costs would still need a brick, which this settlement never gets
+    gm, red = one_settlement()
+    gm.state.inventories[red][ResourceType.LUMBER] = 2
+    assert Forecaster(gm).forecast(red, turns=1)["afford"]["road"] == pytest.approx([0.0])
+
+
+def test_models_are_shared_by_equal_rule_sets():
+    config = {"costs": {"road": {"lumber": 3}}}
+    assert models_for(RuleSet(config)) is models_for(RuleSet(config))
+    assert models_for(RuleSet()) is MODELS
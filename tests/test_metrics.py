@@ -0,0 +1,92 @@
+"""Histograms and counters in the Prometheus text output, and metrics
+costing nothing when they are off."""
+import asyncio
+
+import pytest
+
+from backend import metrics
+from backend.metrics import BUCKETS, Registry
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    registry = Registry()
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "registry", registry)
+    return registry
+
+
+def samples(text):
+    """{'name{labels}': value} for every sample line."""
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+            for line in text.splitlines() if line and not line.startswith("#")}
+
+
+def le(bound):
+    return metrics._fmt_value(bound)
+
+
+def test_histogram_buckets_sum_count_and_quantiles(enabled):
+    hist = enabled.histogram("catan_test_seconds", (("event", "x"),))
+    for value in (3e-6, 3e-6, 100e-6):
+        hist.observe(value)
+    enabled.describe("catan_test_seconds", "A test histogram.")
+    text = enabled.render()
+    got = samples(text)
+
+    assert "# HELP catan_test_seconds A test histogram." in text
+    assert "# TYPE catan_test_seconds histogram" in text
+    series = 'catan_test_seconds_bucket{event="x",le="%s"}'
+    # 3us lands in the 4us bucket, 100us in the 128us one; buckets are cumulative
+    assert got[series % le(BUCKETS[1])] == 0
+    assert got[series % le(BUCKETS[2])] == 2
+    assert got[series % le(BUCKETS[6])] == 2
+    assert got[series % le(BUCKETS[7])] == 3
+    assert got['catan_test_seconds_bucket{event="x",le="+Inf"}'] == 3
+    assert got['catan_test_seconds_sum{event="x"}'] == pytest.approx(106e-6)
+    assert got['catan_test_seconds_count{event="x"}'] == 3
+
+    assert "# TYPE catan_test_seconds_quantile gauge" in text
+    # Median: rank 1.5 of the 2 samples in (2us, 4us]
+    assert got['catan_test_seconds_quantile{event="x",quantile="0.5"}'] == pytest.approx(3.5e-6)
+    # p99: rank 2.97, the one sample in (64us, 128us]
+    assert got['catan_test_seconds_quantile{event="x",quantile="0.99"}'] == pytest.approx(64e-6 + 64e-6 * 0.97)
+
+
+def test_timed_timer_and_count_record_when_enabled(enabled):
+    @metrics.timed("catan_test_seconds", action="sync")
+    def work():
+        return 1
+
+    @metrics.timed("catan_test_seconds", action="async")
+    async def async_work():
+        return 2
+
+    assert work() == 1 and work() == 1
+    assert asyncio.run(async_work()) == 2
+    with metrics.timer("catan_test_seconds", action="block"):
+        pass
+    metrics.count("catan_test_total", 3, event="x")
+    metrics.count("catan_test_total", event="x")
+
+    got = samples(enabled.render())
+    assert got['catan_test_seconds_count{action="sync"}'] == 2
+    assert got['catan_test_seconds_count{action="async"}'] == 1
+    assert got['catan_test_seconds_count{action="block"}'] == 1
+    assert got['catan_test_total{event="x"}'] == 4
+
+
+def test_disabled_metrics_are_a_no_op(monkeypatch):
+    registry = Registry()
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    monkeypatch.setattr(metrics, "registry", registry)
+
+    def work():
+        return 1
+
+    # The function itself, not a wrapper
+    assert metrics.timed("catan_test_seconds")(work) is work
+    assert metrics.timer("catan_test_seconds") is metrics._NULL_TIMER
+    metrics.count("catan_test_total")
+    assert not registry.histograms and not registry.counters
+    assert registry.render() == "\n"
@@ -0,0 +1,88 @@
+"""Profile captures end to end, and the admin endpoints that start them."""
+import asyncio
+import os
+import pstats
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.profiling import Profiler
+
+
+async def roll_dice(sid):
+    return sum(range(100))
+
+
+def make_profiler(tmp_path):
+    return Profiler(str(tmp_path), handlers=lambda: {"roll_dice": roll_dice}, room_of=lambda sid: "default")
+
+
+def test_cprofile_capture_counts_handler_calls(tmp_path):
+    async def run():
+        profiler = make_profiler(tmp_path)
+        capture = profiler.start("cprofile", seconds=0.05)
+        assert profiler.current is capture and capture.status()["running"]
+        await asyncio.sleep(0)  # the capture task turns cProfile on
+        for _ in range(3):
+            await roll_dice("sid")
+        await asyncio.sleep(0.1)
+        return profiler, capture
+
+    profiler, capture = asyncio.run(run())
+    assert profiler.current is None and profiler.last is capture
+    status = capture.status()
+    assert "running" not in status and "error" not in status
+    assert status["handlers"]["roll_dice"]["calls"] == 3
+    [name] = status["files"]
+    assert name.endswith(".pstats")
+    path = profiler.file(name)
+    assert path == os.path.join(str(tmp_path), name)
+    assert any(func == "roll_dice" for _, _, func in pstats.Stats(path).stats)
+
+
+def test_stopping_a_capture_leaves_nothing_running(tmp_path):
+    async def run():
+        profiler = make_profiler(tmp_path)
+        capture = profiler.start("cprofile", seconds=60)
+        with pytest.raises(RuntimeError):
+            profiler.start("cprofile", seconds=1)
+        await asyncio.sleep(0)
+        profiler.stop()
+        await asyncio.sleep(0.01)
+        return profiler, capture
+
+    profiler, capture = asyncio.run(run())
+    assert profiler.current is None
+    assert capture.status()["error"] == "cancelled"
+
+
+def test_capture_files_stay_inside_the_output_dir(tmp_path):
+    profiler = make_profiler(tmp_path)
+    (tmp_path / "x.folded").write_text("")
+    assert profiler.file("x.folded") is not None
+    assert profiler.file("../x.folded") is None and profiler.file(".hidden") is None
+
+
+@pytest.mark.parametrize("method, url", [
+    ("post", "/admin/profile"),
+    ("get", "/admin/profile"),
+    ("delete", "/admin/profile"),
+    ("get", "/admin/profile/files/x.folded"),
+])
+def test_admin_endpoints_need_the_token(monkeypatch, method, url):
+    client = TestClient(main.fastapi_app)
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "")
+    assert client.request(method, url, headers={"Authorization": "Bearer "}).status_code == 404
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    assert client.request(method, url).status_code == 401
+    assert client.request(method, url, headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.request(method, url, headers={"Authorization": "Basic secret"}).status_code == 401
+
+
+def test_admin_token_opens_the_status(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    response = TestClient(main.fastapi_app).get("/admin/profile", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert set(response.json()) == {"current", "last"}
@@ -0,0 +1,122 @@
+"""Token buckets per connection, and coalescing for clients that fall behind."""
+import asyncio
+
+from backend.broadcast import ClientQueues
+from backend.ratelimit import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_up_to_burst():
+    bucket = TokenBucket(rate=2, burst=3, now=0)
+    assert bucket.tokens == 3
+    bucket.tokens = 0
+    bucket.refill(0.25)
+    assert bucket.tokens == 0.5
+    bucket.refill(0.5)
+    assert bucket.tokens == 1
+    bucket.refill(100)
+    assert bucket.tokens == 3
+
+
+def test_event_and_total_limits():
+    clock = FakeClock()
+    limiter = RateLimiter(limits={"roll_dice": (1, 2)}, default=(100, 100), total=(1, 3), clock=clock)
+    limiter.enabled = True
+    assert limiter.allow("a", "roll_dice") and limiter.allow("a", "roll_dice")
+    assert not limiter.allow("a", "roll_dice")
+    # Other connections have their own buckets
+    assert limiter.allow("b", "roll_dice")
+    # The total bucket has one token left for "a"
+    assert limiter.allow("a", "end_turn")
+    assert not limiter.allow("a", "end_turn")
+    assert limiter.rejected == 2
+
+
+def test_rejection_charges_neither_bucket():
+    clock = FakeClock()
+    limiter = RateLimiter(limits={"build_road": (1, 5)}, default=(100, 100), total=(1, 1), clock=clock)
+    limiter.enabled = True
+    assert limiter.allow("a", "end_turn")
+    # Refused by the total bucket: build_road keeps all its tokens
+    for _ in range(3):
+        assert not limiter.allow("a", "build_road")
+    assert limiter.buckets["a"]["build_road"].tokens == 5
+    clock.now = 1
+    assert limiter.allow("a", "build_road")
+    limiter.forget("a")
+    assert "a" not in limiter.buckets
+
+
+class FakeSocket:
+    def __init__(self):
+        self.closed = False
+        self.queue = asyncio.Queue()
+
+
+class FakeEio:
+    def __init__(self):
+        self.sockets = {"c": FakeSocket()}
+
+    async def send_packet(self, eio_sid, frame):
+        self.sockets[eio_sid].queue.put_nowait(frame)
+
+
+class FakeSio:
+    def __init__(self):
+        self.eio = FakeEio()
+
+
+def transport_takes_all(sock):
+    frames = []
+    while not sock.queue.empty():
+        frames.append(sock.queue.get_nowait())
+        sock.queue.task_done()
+    return frames
+
+
+def test_slow_client_gets_latest_state_and_capped_logs():
+    async def run():
+        sio = FakeSio()
+        queues = ClientQueues(sio, max_depth=2, high_water=2)
+        sock = sio.eio.sockets["c"]
+        # Keeping up: straight to the transport
+        await queues.send("c", "s0", key="game_state")
+        await queues.send("c", "log0")
+        assert "c" not in queues.outboxes
+
+        # Behind: states collapse to the latest, logs keep the newest max_depth
+        for i in range(1, 4):
+            await queues.send("c", f"s{i}", key="game_state")
+        for i in range(1, 4):
+            await queues.send("c", f"log{i}")
+        await queues.send("c", "p1", key="private_state")
+        assert queues.coalesced == 2 and queues.dropped == 1
+
+        assert transport_takes_all(sock) == ["s0", "log0"]
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert transport_takes_all(sock) == ["s3", "p1", "log2", "log3"]
+        await asyncio.sleep(0)
+        assert "c" not in queues.outboxes
+
+    asyncio.run(run())
+
+
+def test_forget_cancels_the_drain():
+    async def run():
+        sio = FakeSio()
+        queues = ClientQueues(sio, high_water=0)
+        await queues.send("c", "s0", key="game_state")
+        task = queues.outboxes["c"].task
+        queues.forget("c")
+        await asyncio.sleep(0)
+        assert task.cancelled() and not queues.outboxes
+
+    asyncio.run(run())
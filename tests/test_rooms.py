@@ -0,0 +1,100 @@
+"""Room lifecycle: finished games are replaced, idle rooms evicted, and
+clients capped in how many rooms they open."""
+import asyncio
+import random
+
+from backend import main
+from backend.archive import GameArchive
+from backend.bots import GreedyBot
+from backend.game_logic import GameManager
+from backend.pool import GamePool
+from backend.rooms import DEFAULT_ROOM, RoomRegistry, prepare_game
+from backend.rules import RuleSet
+
+
+def finished_game(seed=1):
+    # Bots without trading stall short of 10 points; a short game ends for sure
+    gm = GameManager(rng=random.Random(seed), rules=RuleSet({"victory_points": 3}))
+    bots = [GreedyBot(c, gm.rng) for c in gm.state.players]
+    while gm.state.phase != "GAME_LOOP":
+        bots[gm.state.current_turn_index].place_initial(gm)
+    while gm.state.phase != "GAME_OVER":
+        bots[gm.state.current_turn_index].play_turn(gm)
+    return gm
+
+
+def test_finished_game_is_archived_and_replaced(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "archive", GameArchive(str(tmp_path), fsync=False))
+    room = main.rooms.adopt("finished", finished_game())
+    old = room.game
+    # A finished game refuses everything
+    assert not old.build_settlement(0, 0, 0)
+
+    asyncio.run(main.broadcast(room))
+
+    assert len(main.archive) == 1
+    assert main.archive.read(0)["winner"] == old.winner().value
+    assert room.game is not old and room.game.state.phase != "GAME_OVER"
+    assert room.archive_id is None
+    assert room.views.game_manager is room.game and room.board_view.board is room.game.board
+    # The new game plays
+    assert room.game.build_settlement(0, 0, 0)
+    main.rooms.drop("finished")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_idle_rooms_are_evicted():
+    clock = FakeClock()
+    registry = RoomRegistry(sio=None, clock=clock)
+    for room_id in (DEFAULT_ROOM, "busy", "left", "never-joined"):
+        registry.get_or_create(room_id)
+    registry.join("a", registry.get("busy"))
+    registry.join("b", registry.get("left"))
+    clock.now = 50
+    registry.leave("b")
+
+    clock.now = 100
+    assert [r.id for r in registry.evict_idle(60)] == ["never-joined"]
+    clock.now = 110
+    assert [r.id for r in registry.evict_idle(60)] == ["left"]
+    # Occupied rooms and the default room stay however long it's been
+    clock.now = 10_000
+    assert registry.evict_idle(60) == []
+    assert sorted(registry.rooms) == ["busy", DEFAULT_ROOM]
+
+
+def test_rooms_per_client_are_capped():
+    clock = FakeClock()
+    registry = RoomRegistry(sio=None, max_rooms_per_client=2, clock=clock)
+    assert registry.get_or_create("a1", client="1.2.3.4")
+    assert registry.get_or_create("a2", client="1.2.3.4")
+    assert registry.get_or_create("a3", client="1.2.3.4") is None
+    # Joining an existing room isn't opening one, and other clients have their own cap
+    assert registry.get_or_create("a1", client="1.2.3.4")
+    assert registry.get_or_create("b1", client="5.6.7.8")
+
+    clock.now = 1000
+    registry.evict_idle(60)
+    assert registry.get_or_create("a3", client="1.2.3.4")
+
+
+def test_pooled_games_arrive_with_board_and_forecaster_built():
+    pool = GamePool(prepare_game, min_size=2)
+    pool.fill()
+    ready = list(pool.ready)
+    # Built on the pool thread, not when the room opens
+    assert all(p.board_view._frame is not None and p.board_view._http is not None for p in ready)
+    assert all(p.forecaster._payouts is not None for p in ready)
+
+    registry = RoomRegistry(sio=None, pool=pool)
+    room = registry.get_or_create("pooled")
+    assert room.board_view is ready[0].board_view and room.forecaster is ready[0].forecaster
+    registry.next_game(room)
+    assert room.game is ready[1].game and room.views.game_manager is room.game
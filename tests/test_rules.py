@@ -0,0 +1,108 @@
+"""Rule sets: validation, the packed affordability check, and each rule
+switched on and off in a real game."""
+import json
+import random
+
+import pytest
+
+from backend.bots import GreedyBot
+from backend.game_logic import GameManager
+from backend.rules import BUILDS, CITY, MAX_COUNT, RESOURCES, ROAD, RuleSet, STANDARD, load_rules
+
+
+def game_in_loop(rules=None, seed=2):
+    gm = GameManager(rng=random.Random(seed), rules=RuleSet(rules or STANDARD))
+    bots = [GreedyBot(c, gm.rng) for c in gm.state.players]
+    while gm.state.phase != "GAME_LOOP":
+        bots[gm.state.current_turn_index].place_initial(gm)
+    gm.roll_dice()
+    return gm, bots[gm.state.current_turn_index]
+
+
+def hand(gm):
+    return gm.state.inventories[gm.state.players[gm.state.current_turn_index]]
+
+
+@pytest.mark.parametrize("config, message", [
+    ({"robber": True}, "unknown rule keys"),
+    ({"costs": {"bridge": {"lumber": 1}}}, "unknown build type"),
+    ({"limits": {"knight": 3}}, "unknown build type"),
+    ({"costs": {"road": {"gold": 1}}}, "unknown resource"),
+    ({"costs": {"city": {"ore": MAX_COUNT + 1}}}, "must be 0.."),
+    ({"trade_ratio": {"default": 0}}, "at least 1"),
+    ({"trade_ratio": {"desert": 2}}, "unknown resource"),
+])
+def test_invalid_rules(config, message):
+    with pytest.raises(ValueError, match=message):
+        RuleSet(config)
+
+
+def test_packed_affordability_matches_a_plain_check():
+    rules = RuleSet({"costs": {"city": {"grain": 1, "ore": 4}, "road": {"lumber": 2}}})
+    rng = random.Random(0)
+    for _ in range(500):
+        inventory = {r: rng.choice([0, 1, 2, 3, 4, 5, 300]) for r in RESOURCES}
+        for b, build in enumerate(BUILDS):
+            expected = all(inventory[r] >= n for r, n in rules.cost_items[b])
+            assert rules.can_afford(inventory, b) == expected
+            assert bool(rules.affordable(inventory) >> b & 1) == expected
+
+
+def test_only_the_given_keys_change():
+    rules = RuleSet({"costs": {"city": {"ore": 2}}, "trade_ratio": {"ore": 2}})
+    assert rules.cost_dicts["city"] == {"ore": 2}
+    assert rules.cost_dicts["road"] == STANDARD["costs"]["road"]
+    assert rules.limits == [15, None, 4]
+    assert rules.ratio("ore") == 2 and rules.ratio("wool") == 4
+    assert rules.victory_points == 10
+
+
+@pytest.mark.parametrize("rules, ok", [(None, False), ({"costs": {"city": {"grain": 1, "ore": 1}}}, True)])
+def test_city_cost(rules, ok):
+    gm, bot = game_in_loop(rules)
+    for res in RESOURCES:
+        hand(gm)[res] = 0
+    hand(gm)["grain"], hand(gm)["ore"] = 1, 1
+    assert gm.can_afford_all(bot.color)["city"] == ok
+    v = next(v for v, b in gm.building_at.items() if b.owner == bot.color)
+    assert gm.build_city(*v) == ok
+    if ok:
+        assert hand(gm)["grain"] == hand(gm)["ore"] == 0
+
+
+@pytest.mark.parametrize("rules, ok", [(None, True), ({"limits": {"road": 2}}, False)])
+def test_road_limit(rules, ok):
+    gm, bot = game_in_loop(rules)
+    gm.cheat_resources()
+    assert bot.can_afford(gm, ROAD)
+    assert gm.build_road(*bot.road_options(gm)[0]) == ok
+
+
+@pytest.mark.parametrize("rules, ratio", [(None, 4), ({"trade_ratio": {"default": 3, "ore": 2}}, 2)])
+def test_trade_ratio(rules, ratio):
+    gm, _ = game_in_loop(rules)
+    hand(gm)["ore"], hand(gm)["wool"] = ratio, 0
+    assert gm.bank_trade("ore", "wool")
+    assert (hand(gm)["ore"], hand(gm)["wool"]) == (0, 1)
+    assert not gm.bank_trade("ore", "wool")
+
+
+@pytest.mark.parametrize("rules, over", [(None, False), ({"victory_points": 3}, True)])
+def test_victory_points(rules, over):
+    gm, bot = game_in_loop(rules)
+    gm.cheat_resources()
+    assert bot.can_afford(gm, CITY)
+    v = next(v for v, b in gm.building_at.items() if b.owner == bot.color)
+    assert gm.build_city(*v)
+    assert (gm.state.phase == "GAME_OVER") == over
+    assert (gm.winner() == bot.color) == over
+
+
+def test_rules_file_and_snapshot(tmp_path):
+    path = tmp_path / "quick.json"
+    path.write_text(json.dumps({"victory_points": 6, "limits": {"city": 2}}))
+    rules = load_rules(str(path))
+    assert rules.name == "quick" and rules.victory_points == 6 and rules.limits[CITY] == 2
+    gm = GameManager(rng=random.Random(0), rules=rules)
+    copy = GameManager.from_snapshot(json.loads(json.dumps(gm.snapshot())))
+    assert copy.rules.config == rules.config
@@ -0,0 +1,101 @@
+"""Timing wheel driven tick by tick: timers fire on their tick at every
+level, through cascades, and never after being cancelled."""
+import asyncio
+import random
+
+from backend.timers import TimerService, TimingWheel
+
+
+def run_until(wheel, tick):
+    """Advance to `tick`; returns {key: tick it fired on}."""
+    fired = {}
+    while wheel.now < tick:
+        for timer in wheel.advance():
+            assert timer.key not in fired
+            fired[timer.key] = wheel.now
+    return fired
+
+
+def small_wheel():
+    # 4 slots per level, so delays past 4, 16 and 64 ticks cascade
+    return TimingWheel(tick=1.0, slot_bits=2, levels=4)
+
+
+def test_each_delay_fires_on_its_tick():
+    for start in range(0, 20):
+        wheel = small_wheel()
+        run_until(wheel, start)
+        for delay in range(1, 256):
+            wheel.arm(delay, delay, None)
+        fired = run_until(wheel, start + 300)
+        assert fired == {delay: start + delay for delay in range(1, 256)}
+        assert len(wheel) == 0
+
+
+def test_randomized_against_a_plain_schedule():
+    rng = random.Random(7)
+    wheel = small_wheel()
+    expected = {}
+    fired = 0
+    for _ in range(3000):
+        op = rng.random()
+        key = rng.randrange(40)
+        if op < 0.5:
+            delay = rng.choice([rng.randint(1, 5), rng.randint(1, 70), rng.randint(1, 255)])
+            wheel.arm(key, delay, None)  # re-arming a key is a reset
+            expected[key] = wheel.now + delay
+        elif op < 0.7:
+            assert wheel.cancel(key) == (key in expected)
+            expected.pop(key, None)
+        else:
+            for timer in wheel.advance():
+                assert expected.pop(timer.key) == wheel.now
+                fired += 1
+        assert set(wheel.timers) == set(expected)
+        for k, deadline in expected.items():
+            assert wheel.remaining(k) == deadline - wheel.now
+    assert fired
+
+
+def test_cancel_and_reset():
+    wheel = small_wheel()
+    wheel.arm("turn", 40, None)
+    wheel.arm("trade", 3, None)
+    run_until(wheel, 2)
+    assert wheel.cancel("trade") and not wheel.cancel("trade")
+    assert wheel.reset("turn", 10) and not wheel.reset("trade", 10)
+    assert "turn" in wheel and "trade" not in wheel
+    assert run_until(wheel, 100) == {"turn": 12}
+    assert wheel.remaining("turn") is None
+
+
+def test_delays_round_up_and_clamp():
+    wheel = TimingWheel(tick=0.1, slot_bits=2, levels=2)
+    wheel.arm("short", 0, None)
+    wheel.arm("fraction", 0.25, None)
+    wheel.arm("long", 1e9, None)
+    assert wheel.remaining("short") == 0.1
+    assert wheel.remaining("fraction") == 0.1 * 3
+    assert wheel.remaining("long") == wheel.max_delay
+    assert run_until(wheel, 15) == {"short": 1, "fraction": 3, "long": 15}
+
+
+def test_service_runs_sync_and_async_callbacks_and_survives_failures():
+    calls = []
+
+    async def later():
+        calls.append("async")
+
+    def broken():
+        raise RuntimeError("boom")
+
+    async def run():
+        service = TimerService(tick=0.01)
+        service.arm("a", 0.01, broken)
+        service.arm("b", 0.01, lambda: calls.append("sync"))
+        service.arm("c", 0.02, later)
+        for timer in service.wheel.advance() + service.wheel.advance():
+            await service._fire(timer)
+
+    asyncio.run(run())
+    assert calls == ["sync", "async"]
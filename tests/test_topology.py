@@ -0,0 +1,45 @@
+"""The precomputed BoardTopology agrees with the on-the-fly helpers in
+game_logic (what rule checks called before it existed) and with geometry."""
+import math
+
+import pytest
+
+from backend.game_logic import get_adjacent_vertices, get_incident_edges, normalize_edge, normalize_vertex
+from backend.topology import BoardTopology, board_geometry, hex_coords, hex_count
+
+RADII = range(1, 11)
+
+
+@pytest.mark.parametrize("radius", RADII)
+def test_matches_on_the_fly_adjacency(radius):
+    topo = BoardTopology(radius)
+    assert len(topo.coords) == hex_count(radius)
+    # Hexagonal board: 6(R+1)^2 corners and 3(R+1)(3R+2) sides
+    assert len(topo.vertices) == 6 * (radius + 1) ** 2
+    assert len(topo.edges) == 3 * (radius + 1) * (3 * radius + 2)
+
+    for q, r in hex_coords(radius):
+        assert topo.hex_vertices[(q, r)] == tuple(normalize_vertex(q, r, c) for c in range(6))
+        for c in range(6):
+            v = normalize_vertex(q, r, c)
+            # Any alias of a corner gives the same answers
+            assert set(topo.vertex_edges[v]) == set(get_incident_edges(q, r, c))
+            assert set(topo.vertex_adjacent[v]) == set(get_adjacent_vertices(q, r, c))
+            assert (q, r) in topo.vertex_hexes[v]
+        for e in range(6):
+            edge = normalize_edge(q, r, e)
+            assert set(topo.edge_vertices[edge]) == {normalize_vertex(q, r, e), normalize_vertex(q, r, (e + 1) % 6)}
+
+    for v in topo.vertices:
+        assert len(topo.vertex_edges[v]) == 3 and len(set(topo.vertex_adjacent[v])) == 3
+        assert 1 <= len(topo.vertex_hexes[v]) <= 3
+
+
+@pytest.mark.parametrize("radius", [1, 2, 5])
+def test_adjacent_vertices_are_one_side_apart(radius):
+    topo = BoardTopology(radius)
+    pos = {(q, r, c): (x, y) for q, r, c, x, y in board_geometry(radius)["vertices"]}
+    for v, (x, y) in pos.items():
+        near = {u for u, (ux, uy) in pos.items() if u != v and math.isclose(math.hypot(ux - x, uy - y), 1, abs_tol=1e-3)}
+        # Border corners have a neighbour off the board
+        assert near == set(topo.vertex_adjacent[v]) & set(pos)
@@ -0,0 +1,91 @@
+"""Tournament runner: validation, resume after a crash, and the ratings."""
+import pytest
+
+from backend.ratings import Elo, Ratings, WengLin
+from backend.tournament import RESULTS, Tournament, read_results
+
+
+def tournament(out, **kwargs):
+    kwargs = {"games": 12, "seats": 2, "max_rounds": 5, **kwargs}
+    return Tournament(str(out), ["random", "greedy"], **kwargs)
+
+
+def test_swiss_needs_enough_entrants_before_writing_anything(tmp_path):
+    out = tmp_path / "run"
+    with pytest.raises(ValueError, match="entrants"):
+        tournament(out, seats=3, fmt="swiss").run(workers=1)
+    assert not out.exists()
+
+
+def test_resume_after_torn_tail_matches_a_clean_run(tmp_path):
+    clean = tournament(tmp_path / "clean")
+    assert clean.run(workers=1, chunk_size=4) == 0
+
+    path = tmp_path / "crashed" / RESULTS
+    crashed = tournament(tmp_path / "crashed")
+    crashed.run(workers=1, chunk_size=4)
+    lines = path.read_bytes().splitlines(keepends=True)
+    # Crash halfway through writing row 7
+    path.write_bytes(b"".join(lines[:7]) + lines[7][:10])
+
+    resumed = tournament(tmp_path / "crashed")
+    assert resumed.run(workers=1, chunk_size=4) == 7
+    assert sorted(read_results(str(path))) == list(range(12))
+    assert resumed.summary() == clean.summary()
+
+
+def test_read_results_truncates_garbage(tmp_path):
+    path = tmp_path / RESULTS
+    path.write_bytes(b'{"id": 0}\n{"id": 1}\n\xff\xfe{"id": 2}\n{"id": 3}\n')
+    assert sorted(read_results(str(path))) == [0, 1]
+    assert path.read_bytes() == b'{"id": 0}\n{"id": 1}\n'
+    assert read_results(str(tmp_path / "missing.jsonl")) == {}
+
+
+def test_shared_wins_count_once_per_game(tmp_path):
+    t = tournament(tmp_path)
+    t.results = {0: {"id": 0, "seats": ["random", "random", "greedy"], "ranks": [0, 0, 0]}}
+    t.ratings.update([("random", 0), ("random", 0), ("greedy", 0)])
+    wins = {row["player"]: row["wins"] for row in t.summary()["standings"]}
+    assert wins == {"random": 1, "greedy": 1}
+
+
+def test_elo():
+    elo = Elo(k=16)
+    elo.update([("a", 0), ("b", 1)])
+    assert elo.rating("a") == pytest.approx(1508) and elo.rating("b") == pytest.approx(1492)
+    elo.update([("c", 0), ("d", 0)])
+    assert elo.rating("c") == elo.rating("d") == 1500
+    # K is split over the opponents; rating points are conserved
+    elo = Elo(k=16)
+    elo.update([("a", 0), ("b", 1), ("c", 1), ("d", 3)])
+    assert sum(elo.ratings.values()) == pytest.approx(4 * 1500)
+    assert elo.rating("a") == pytest.approx(1500 + 16 / 3 * 1.5)
+    assert elo.rating("b") == elo.rating("c")
+
+
+def test_elo_ignores_seats_of_the_same_player():
+    elo = Elo()
+    elo.update([("a", 0), ("a", 1)])
+    assert elo.rating("a") == 1500 and elo.games["a"] == 1
+
+
+def test_weng_lin():
+    wl = WengLin()
+    wl.update([("a", 0), ("b", 1)])
+    (mu_a, sigma_a), (mu_b, sigma_b) = wl.rating("a"), wl.rating("b")
+    assert mu_a - 25 == pytest.approx(25 - mu_b) and mu_a > 25
+    assert sigma_a == sigma_b < 25 / 3
+    # Closed form for two fresh players: c = sqrt(2 sigma^2 + 2 beta^2), p = 1/2
+    c = ((25 / 3) ** 2 * 2 + 2 * (25 / 6) ** 2) ** 0.5
+    assert mu_a == pytest.approx(25 + (25 / 3) ** 2 / c * 0.5)
+
+
+def test_standings_sort_by_conservative_rating():
+    ratings = Ratings()
+    for _ in range(5):
+        ratings.update([("strong", 0), ("weak", 1)])
+    ratings.update([("new", 0), ("weak", 1)])
+    order = [row["player"] for row in ratings.standings()]
+    assert order[0] == "strong" and order[-1] == "weak"
+    assert ratings.games == 6
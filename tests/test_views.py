@@ -0,0 +1,57 @@
+"""What each state frame reveals, and when frames are rebuilt."""
+import json
+import random
+
+from backend.game_logic import GameManager
+from backend.views import StateViews
+
+
+def payload(frame):
+    """(event, data) of an encoded Socket.IO event frame ('42[event, data]')."""
+    return tuple(json.loads(frame.encode()[2:]))
+
+
+def dealt_game():
+    gm = GameManager(rng=random.Random(4))
+    for i, color in enumerate(gm.state.players):
+        for j, res in enumerate(["brick", "lumber", "wool", "grain", "ore"]):
+            gm.state.inventories[color][res] = i + j
+    return gm
+
+
+def test_public_frame_has_card_counts_only():
+    gm = dealt_game()
+    event, data = payload(StateViews(gm).public_frame())
+    assert event == "game_state"
+    assert "inventories" not in data
+    assert data["card_counts"] == {c.value: sum(gm.state.inventories[c].values()) for c in gm.state.players}
+    assert data["hash"] == f"{gm.public_zobrist:016x}"
+
+
+def test_private_frames_hold_one_hand_each():
+    gm = dealt_game()
+    views = StateViews(gm)
+    for color in gm.state.players:
+        event, data = payload(views.private_frame(color))
+        assert event == "private_state"
+        assert set(data) == {"color", "hand", "can_afford"}
+        assert data["color"] == color.value
+        assert data["hand"] == {r.value: n for r, n in gm.state.inventories[color].items()}
+        assert data["can_afford"] == gm.can_afford_all(color)
+    # The full frame (hot-seat table) is the only one with every hand
+    _, full = payload(views.full_frame())
+    assert set(full["inventories"]) == {c.value for c in gm.state.players}
+
+
+def test_frames_are_reused_until_the_version_changes():
+    gm = GameManager(rng=random.Random(4))
+    views = StateViews(gm)
+    red = gm.state.players[0]
+    public, private = views.public_frame(), views.private_frame(red)
+    assert views.public_frame() is public and views.private_frame(red) is private
+
+    assert gm.build_settlement(0, 0, 0)
+    assert views.version == 1
+    assert views.public_frame() is not public and views.private_frame(red) is not private
+    _, data = payload(views.public_frame())
+    assert len(data["buildings"]) == 1
@@ -0,0 +1,83 @@
+"""The incremental Zobrist hash always equals a full recompute."""
+import random
+
+import pytest
+
+from backend import zobrist
+from backend.bots import GreedyBot, RandomBot
+from backend.game_logic import GameManager
+from backend.rules import ROAD, RuleSet
+
+
+@pytest.fixture(autouse=True)
+def verify(monkeypatch):
+    # Every state-changing action recomputes the hash and raises on drift
+    monkeypatch.setattr(zobrist, "VERIFY", True)
+
+
+def assert_consistent(gm):
+    gm.verify_hash()
+    assert gm.zobrist == zobrist.position_hash(gm)
+
+
+def play(gm, bot_type, turns):
+    bots = [bot_type(c, gm.rng) for c in gm.state.players]
+    while gm.state.phase != "GAME_LOOP":
+        if not bots[gm.state.current_turn_index].place_initial(gm):
+            return
+    for _ in range(turns):
+        if gm.state.phase == "GAME_OVER":
+            break
+        bots[gm.state.current_turn_index].play_turn(gm)
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("bot_type", [RandomBot, GreedyBot])
+@pytest.mark.parametrize("radius, players", [(2, 4), (3, 6)])
+def test_bot_games(seed, bot_type, radius, players):
+    # Low VP target so some games reach GAME_OVER too
+    gm = GameManager(radius=radius, num_players=players, rng=random.Random(seed),
+                     rules=RuleSet({"victory_points": 5}))
+    play(gm, bot_type, 200)
+    assert gm.version > 0
+    assert_consistent(gm)
+
+
+def game_in_loop(seed=2):
+    gm = GameManager(rng=random.Random(seed))
+    bots = [GreedyBot(c, gm.rng) for c in gm.state.players]
+    while gm.state.phase != "GAME_LOOP":
+        bots[gm.state.current_turn_index].place_initial(gm)
+    return gm, bots
+
+
+def test_rolled_back_batch():
+    gm, bots = game_in_loop()
+    gm.roll_dice()
+    gm.cheat_resources()
+    before = gm.zobrist
+    bot = bots[gm.state.current_turn_index]
+    assert bot.can_afford(gm, ROAD)
+    q, r, edge = bot.road_options(gm)[0]
+    # The road is built and paid for, then the bad city undoes both
+    ok, results = gm.apply_actions([
+        {"type": "build_road", "q": q, "r": r, "edge": edge},
+        {"type": "build_city", "q": 99, "r": 99, "corner": 0},
+    ])
+    assert (ok, results[0]) == (False, True)
+    assert gm.zobrist == before
+    assert_consistent(gm)
+
+
+def test_snapshot_round_trip():
+    gm, bots = game_in_loop()
+    for _ in range(12):
+        bots[gm.state.current_turn_index].play_turn(gm)
+    copy = GameManager.from_snapshot(gm.snapshot())
+    assert copy.zobrist == gm.zobrist and copy.public_zobrist == gm.public_zobrist
+    assert_consistent(copy)
+    # and it keeps tracking from there
+    copy.rng = random.Random(0)
+    for _ in range(12):
+        bots[copy.state.current_turn_index].play_turn(copy)
+    assert_consistent(copy)